@@ -0,0 +1,189 @@
+"""
+Select, rank and pack repository files into the context of AI analysis requests.
+
+Files are packed into as few batches as possible within a token budget, so that large repositories need fewer
+requests (and fewer summaries of per-batch answers). Within each batch, and across batches, the files that are
+most relevant for the question come first: the top-level README for documentation questions, module
+entry points and module logic classes for source code questions. Vendored and generated files, and files
+that are larger than a size limit, are not sent at all.
+
+Only file metadata is kept in memory: files are read when they are ranked and again when a batch is sent
+(see :meth:`FileBatch.read`), therefore memory usage is bounded by the size of the batches that are in use,
+not by the size of the repository.
+"""
+
+import fnmatch
+import re
+
+from inference_client import estimate_tokens
+
+# Path components of third-party and build output folders, matched case-insensitively
+VENDORED_FOLDER_PATTERNS = [
+    "third_party", "thirdparty", "3rdparty", "vendor", "vendored", "external", "externals", "extern",
+    "site-packages", "node_modules", "build", "_build", "dist", ".venv", "venv", "__pycache__",
+    ]
+
+# File names of generated files
+GENERATED_FILE_PATTERNS = ["*_pb2.py", "*_pb2_grpc.py", "*_rc.py", "ui_*.py", "*_ui.py", "versioneer.py", "_version.py"]
+
+# Markers of generated source files, searched in the beginning of the file
+GENERATED_CONTENT_PATTERN = re.compile(
+    r"(generated by|auto-?generated|do not edit|automatically generated)", re.IGNORECASE)
+
+# Files that the questions are about, never skipped as generated (relative paths, lowercase)
+MAIN_FILES = ["cmakelists.txt", "readme.md"]
+
+LOGIC_CLASS_PATTERN = re.compile(r"^class\s+\w+Logic\b", re.MULTILINE)
+MODULE_CLASS_PATTERN = re.compile(r"^class\s+\w+\(\s*ScriptedLoadableModule\s*\)", re.MULTILINE)
+
+
+class AnalyzedFile:
+    """A repository file that may be sent for analysis. The content is not kept in memory.
+
+    :param path: Path of the file.
+    :param relative_path: Path relative to the repository root, with ``/`` separators.
+    :param category: Category of questions that the file is relevant for (doc, source, cmake).
+    :param size: Size of the file in bytes.
+    :param max_bytes: Only the first ``max_bytes`` bytes of the file are read. Not limited if None.
+    """
+
+    def __init__(self, path, relative_path, category, size, max_bytes=None):
+        self.path = path
+        self.relative_path = relative_path
+        self.category = category
+        self.size = size
+        self.max_bytes = max_bytes
+        self.tokens = None  # estimated number of tokens of the file block, set when the file is ranked
+
+    @property
+    def truncated(self):
+        return self.max_bytes is not None and self.size > self.max_bytes
+
+    def read(self):
+        """Read the file content as text. Invalid UTF-8 sequences are replaced, so that any file can be read.
+        :raises OSError: if the file cannot be read.
+        """
+        with open(self.path, "rb") as f:
+            content = f.read(self.max_bytes if self.max_bytes is not None else -1)
+        text = content.decode("utf-8", errors="replace")
+        if self.truncated:
+            text += f"\n... (truncated, the file has {self.size} bytes)"
+        return text
+
+
+class FileBatch:
+    """Files that are sent together in the context of a request."""
+
+    def __init__(self, files):
+        self.files = files
+
+    def read(self):
+        """Get the text of the batch: the files with delimiter lines."""
+        return "".join(file_block(analyzed_file.relative_path, analyzed_file.read()) for analyzed_file in self.files)
+
+
+def file_block(filename, content):
+    """Get the text of a file as it is included in the context, with delimiter lines."""
+    return f"\n=== FILE: {filename} ===\n" + content + f"\n=== END FILE: {filename} ===\n"
+
+
+def is_vendored_path(relative_path):
+    folders = relative_path.lower().split("/")[:-1]
+    return any(folder in VENDORED_FOLDER_PATTERNS for folder in folders)
+
+
+def is_generated_file(relative_path, content, category):
+    """Check if a file is generated. The content is only checked for markers in source files,
+    as documentation and CMake files often mention generated files or tools.
+    """
+    if relative_path.lower() in MAIN_FILES:
+        return False
+    filename = relative_path.rsplit("/", 1)[-1]
+    if any(fnmatch.fnmatch(filename, pattern) for pattern in GENERATED_FILE_PATTERNS):
+        return True
+    return category == "source" and GENERATED_CONTENT_PATTERN.search(content[:500]) is not None
+
+
+def file_relevance(relative_path, content, category):
+    """Get a score of how relevant a file is for questions about its category. Higher is more relevant."""
+    parts = relative_path.split("/")
+    filename = parts[-1]
+    score = 0
+    if category == "doc":
+        if filename.lower() == "readme.md":
+            score += 100 if len(parts) == 1 else 50
+        if any(folder.lower() in ("doc", "docs", "documentation") for folder in parts[:-1]):
+            score += 30
+        score -= 5 * (len(parts) - 1)
+    elif category == "source":
+        # Scripted module entry point: ModuleName/ModuleName.py
+        if len(parts) >= 2 and filename == parts[-2] + ".py":
+            score += 100
+        if MODULE_CLASS_PATTERN.search(content):
+            score += 50
+        if LOGIC_CLASS_PATTERN.search(content):
+            score += 50
+        if any(folder.lower() in ("testing", "test", "tests") for folder in parts[:-1]) or filename.lower().startswith("test"):
+            score -= 50
+    return score
+
+
+def select_files(files, categories, max_file_tokens=None):
+    """Get the files of the given categories that are worth sending, most relevant first.
+
+    Each file is read once, for ranking, and its content is released right after.
+    :param files: Iterable of :class:`AnalyzedFile`.
+    :param max_file_tokens: Files with more (estimated) tokens than this are skipped, unless they are truncated.
+    :return: Tuple of list of :class:`AnalyzedFile` and list of ``(relative path, reason)`` of skipped files.
+    """
+    selected_files = []
+    skipped_files = []
+    ranked_files_by_category = {category: [] for category in categories}
+    for analyzed_file in files:
+        if analyzed_file.category not in ranked_files_by_category:
+            continue
+        relative_path = analyzed_file.relative_path
+        if is_vendored_path(relative_path):
+            skipped_files.append((relative_path, "vendored"))
+            continue
+        try:
+            content = analyzed_file.read()
+        except OSError as e:
+            skipped_files.append((relative_path, f"cannot be read: {e}"))
+            continue
+        if is_generated_file(relative_path, content, analyzed_file.category):
+            skipped_files.append((relative_path, "generated"))
+        elif max_file_tokens is not None and not analyzed_file.truncated and estimate_tokens(content) > max_file_tokens:
+            skipped_files.append((relative_path, f"larger than {max_file_tokens} tokens"))
+        else:
+            analyzed_file.tokens = estimate_tokens(file_block(relative_path, content))
+            ranked_files_by_category[analyzed_file.category].append(
+                (-file_relevance(relative_path, content, analyzed_file.category), relative_path, analyzed_file))
+    for category in categories:
+        # Stable order for equally relevant files, so that batches (and cached answers) do not depend on directory order
+        ranked_files = sorted(ranked_files_by_category[category], key=lambda ranked_file: ranked_file[:2])
+        selected_files.extend(analyzed_file for _, _, analyzed_file in ranked_files)
+    return selected_files, skipped_files
+
+
+def pack_files(ranked_files, max_batch_tokens):
+    """Pack files into as few batches as possible (first-fit decreasing by size).
+
+    :param ranked_files: List of :class:`AnalyzedFile` returned by :func:`select_files`, most relevant first.
+    :param max_batch_tokens: Token budget of a batch. A file that does not fit in an empty batch gets its own batch.
+    :return: List of :class:`FileBatch`. Files keep their relevance order within each batch and the batch that
+      contains the most relevant file comes first.
+    """
+    batches = []  # list of [used tokens, list of (rank, file)]
+    for rank, analyzed_file in sorted(enumerate(ranked_files), key=lambda ranked_file: -ranked_file[1].tokens):
+        for batch in batches:
+            if batch[0] + analyzed_file.tokens <= max_batch_tokens:
+                batch[0] += analyzed_file.tokens
+                batch[1].append((rank, analyzed_file))
+                break
+        else:
+            batches.append([analyzed_file.tokens, [(rank, analyzed_file)]])
+    for batch in batches:
+        batch[1].sort(key=lambda ranked_file: ranked_file[0])
+    batches.sort(key=lambda batch: batch[1][0][0])
+    return [FileBatch([analyzed_file for _, analyzed_file in batch_files]) for _, batch_files in batches]
@@ -5,9 +5,14 @@ Python 3.x CLI for validating extension description files with enhanced reportin
 """
 
 import argparse
+import concurrent.futures
+import hashlib
+import io
 import json
 import os
+import queue
 import stat
+import sys
 import tempfile
 import textwrap
 import time
@@ -15,10 +20,21 @@ import urllib.parse as urlparse
 import subprocess
 import re
 import shutil
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from functools import wraps
 from pathlib import Path
 
+from check_results import (STATUS_FAILED, STATUS_PASSED, STATUS_SKIPPED, CheckReport, CheckResult, ExtensionResult,
+                           render_markdown_check, write_json_lines, write_junit_xml)
+from dependency_graph import DependencyGraph, format_cycle
+from folder_size import FolderSizeScan
+from git_refs import GitRefResolveError, GitRefResolver
+from github_metadata import GitHubMetadataError, GitHubMetadataFetcher, parse_github_repository
+from repository_cache import DEFAULT_CACHE_SIZE_MB, RepositoryCache, clone_revision
+from run_profile import RunProfiler, add_counter, bind_span
+
 # Import optional dependencies for JSON schema validation
 jsonschema = None
 requests = None
@@ -61,6 +77,21 @@ class ExtensionCheckError(RuntimeError):
         return self.details
 
 
+class ExtensionCheckSkipped(RuntimeError):
+    """Exception raised when a particular extension check could not be performed, for a known reason.
+    The check is reported as skipped, not as failed.
+    If ``output`` is specified then it explains the skip in the Markdown report, before the result line of the check.
+    """
+    def __init__(self, extension_name, check_name, reason, output=None):
+        self.extension_name = extension_name
+        self.check_name = check_name
+        self.reason = reason
+        self.output = output
+
+    def __str__(self):
+        return self.reason
+
+
 def require_metadata_key(metadata_key, value_required=True):
     check_name = "require_metadata_key"
 
@@ -78,42 +109,213 @@ def require_metadata_key(metadata_key, value_required=True):
     return dec
 
 
-def parse_json(extension_file_path):
+def repository_files(*paths):
+    """Declare the files of the extension repository that a check reads.
+    Paths are specified as gitignore patterns (for example ``/CMakeLists.txt``). They are used for determining
+    which files need to be checked out when sparse checkout is enabled.
+    """
+    def dec(fun):
+        fun.repository_files = list(paths)
+        return fun
+    return dec
+
+
+def repository_content_check(fun):
+    """Declare that the result of a check only depends on the extension name and the repository content.
+    Results of these checks are reused for the same repository commit (see :class:`RepositoryCheckCache`).
+    """
+    fun.repository_content_check = True
+    return fun
+
+
+def parse_json(extension_file_path, extension_file_content=None):
     """Parse a Slicer extension description file.
     :param extension_file_path: Path to a Slicer extension description file (.json).
+    :param extension_file_content: Content of the file (bytes), if it is already available.
     :return: Dictionary of extension metadata.
     """
-    with open(extension_file_path) as input_file:
-        try:
+    try:
+        if extension_file_content is not None:
+            return json.loads(extension_file_content.decode('utf-8'))
+        with open(extension_file_path) as input_file:
             return json.load(input_file)
-        except json.JSONDecodeError as exc:
-            extension_name = os.path.splitext(os.path.basename(extension_file_path))[0]
-            raise ExtensionParseError(
-                extension_name,
-                textwrap.dedent("""
-                Failed to parse '%s': %s
-                """ % (extension_file_path, exc)))
-
-def check_json_file_format(extension_name, metadata, extension_file_path):
-    """Check if the JSON file is properly formatted."""
+    except (json.JSONDecodeError, UnicodeDecodeError) as exc:
+        extension_name = os.path.splitext(os.path.basename(extension_file_path))[0]
+        raise ExtensionParseError(
+            extension_name,
+            textwrap.dedent("""
+            Failed to parse '%s': %s
+            """ % (extension_file_path, exc)))
+
+def check_json_file_format(extension_name, metadata, extension_file_path, extension_file_content=None):
+    """Check if the JSON file is properly formatted.
+    If the file content (bytes) is already available then it can be provided in ``extension_file_content``
+    to avoid reading the file again.
+    """
     check_name = "check_json_file_format"
+    # Must read in binary mode to detect line endings
+    content = extension_file_content
+    if content is None:
+        with open(extension_file_path, 'rb') as f:
+            content = f.read()
     try:
-        with open(extension_file_path, 'r', encoding='utf-8') as f:
-            json.load(f)
-    except json.JSONDecodeError as e:
+        json.loads(content.decode('utf-8'))
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
         raise ExtensionCheckError(
             extension_name, check_name,
             f"Invalid JSON format: {str(e)}")
     # Force using LF-only line endings
-    # Must open in binary mode to detect line endings
-    with open(extension_file_path, 'rb') as f:
-        content = f.read()
     if b'\r\n' in content or b'\r' in content:
         raise ExtensionCheckError(
             extension_name, check_name,
             "File contains non-LF line endings (CR or CRLF). Please convert to LF-only line endings.")
 
-def check_json_schema(extension_name, metadata):
+# Folder of the schemas that are stored in this repository
+SCHEMAS_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "schemas")
+
+
+class SchemaStore:
+    """Provides JSON schemas and compiled schema validators for extension description files.
+
+    Schemas that are stored in the ``schemas`` folder of this repository are looked up by their ``$id``,
+    therefore most extension description files can be validated without network access.
+    Other schemas are downloaded. If ``cache_dir`` is specified then downloaded schemas are stored there and
+    later they are only revalidated using a conditional request (ETag/Last-Modified).
+    Each schema is downloaded and its validator is compiled at most once per run.
+    If ``offline`` is True then schemas are never downloaded, only local and previously cached schemas are used.
+    """
+    def __init__(self, local_schemas_folder=SCHEMAS_FOLDER, cache_dir=None, offline=False):
+        self.local_schemas_folder = local_schemas_folder
+        self.cache_dir = os.path.join(cache_dir, "schemas") if cache_dir else None
+        self.offline = offline
+        self._local_schema_paths = None
+        self._schemas = {}
+        self._download_errors = {}
+        self._validators = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize_url(schema_url):
+        """Remove fragment identifier (e.g., #/ at the end) from the schema URL."""
+        return schema_url.split("#")[0]
+
+    def local_schema_paths(self):
+        """Get dictionary of schema URL -> path of the schema file stored in this repository."""
+        if self._local_schema_paths is None:
+            local_schema_paths = {}
+            if os.path.isdir(self.local_schemas_folder):
+                for filename in sorted(os.listdir(self.local_schemas_folder)):
+                    if not filename.endswith(".json"):
+                        continue
+                    schema_path = os.path.join(self.local_schemas_folder, filename)
+                    try:
+                        with open(schema_path, encoding="utf-8") as schema_file:
+                            schema_id = json.load(schema_file).get("$id")
+                    except (OSError, json.JSONDecodeError):
+                        continue
+                    if schema_id:
+                        local_schema_paths[self.normalize_url(schema_id)] = schema_path
+            self._local_schema_paths = local_schema_paths
+        return self._local_schema_paths
+
+    def _cache_file_path(self, schema_url):
+        return os.path.join(self.cache_dir, hashlib.sha1(schema_url.encode("utf-8")).hexdigest() + ".json")
+
+    def _download_schema(self, schema_url):
+        """Download schema, using the on-disk cache if available.
+        :raises requests.RequestException: if the schema could not be downloaded.
+        :raises json.JSONDecodeError: if the downloaded schema is not valid JSON.
+        """
+        cached = None
+        headers = {}
+        if self.cache_dir:
+            try:
+                with open(self._cache_file_path(schema_url), encoding="utf-8") as cache_file:
+                    cached = json.load(cache_file)
+            except (OSError, json.JSONDecodeError):
+                cached = None
+            if cached:
+                if cached.get("etag"):
+                    headers["If-None-Match"] = cached["etag"]
+                if cached.get("last_modified"):
+                    headers["If-Modified-Since"] = cached["last_modified"]
+
+        if self.offline:
+            if cached:
+                return cached["schema"]
+            raise requests.ConnectionError("schema is not stored locally and downloading is disabled in offline mode")
+
+        try:
+            response = requests.get(schema_url, headers=headers, timeout=30)
+        except requests.RequestException:
+            if cached:
+                # Server is not reachable, use the previously downloaded schema
+                return cached["schema"]
+            raise
+        add_counter("http_requests")
+        if cached and response.status_code == 304:
+            return cached["schema"]
+        response.raise_for_status()
+        add_counter("bytes_downloaded", len(response.content))
+        schema = response.json()
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            cache_file_path = self._cache_file_path(schema_url)
+            with open(cache_file_path + ".tmp", "w", encoding="utf-8") as cache_file:
+                json.dump({
+                    "url": schema_url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "schema": schema,
+                    }, cache_file)
+            os.replace(cache_file_path + ".tmp", cache_file_path)
+
+        return schema
+
+    def get_schema(self, schema_url):
+        """Get the schema referenced by ``schema_url``.
+        :raises requests.RequestException: if the schema could not be downloaded.
+        :raises json.JSONDecodeError: if the schema is not valid JSON.
+        """
+        schema_url = self.normalize_url(schema_url)
+        with self._lock:
+            if schema_url in self._schemas:
+                return self._schemas[schema_url]
+            if schema_url in self._download_errors:
+                # Do not retry failed downloads in the same run
+                raise self._download_errors[schema_url]
+        local_schema_path = self.local_schema_paths().get(schema_url)
+        if local_schema_path:
+            with open(local_schema_path, encoding="utf-8") as schema_file:
+                schema = json.load(schema_file)
+        else:
+            try:
+                schema = self._download_schema(schema_url)
+            except (requests.RequestException, json.JSONDecodeError) as e:
+                with self._lock:
+                    self._download_errors[schema_url] = e
+                raise
+        with self._lock:
+            return self._schemas.setdefault(schema_url, schema)
+
+    def get_validator(self, schema_url):
+        """Get a compiled validator for the schema referenced by ``schema_url``.
+        :raises jsonschema.SchemaError: if the schema itself is invalid.
+        """
+        schema_url = self.normalize_url(schema_url)
+        with self._lock:
+            if schema_url in self._validators:
+                return self._validators[schema_url]
+        schema = self.get_schema(schema_url)
+        validator_class = jsonschema.validators.validator_for(schema)
+        validator_class.check_schema(schema)
+        validator = validator_class(schema)
+        with self._lock:
+            return self._validators.setdefault(schema_url, validator)
+
+
+def check_json_schema(extension_name, metadata, settings=None):
     """Validate extension description JSON against its referenced schema."""
     check_name = "check_json_schema"
 
@@ -135,15 +337,17 @@ def check_json_schema(extension_name, metadata):
             "$schema field is empty")
 
     # Remove fragment identifier if present (e.g., #/ at the end)
-    if "#" in schema_url:
-        schema_url = schema_url.split("#")[0]
+    schema_url = SchemaStore.normalize_url(schema_url)
 
+    schema_store = settings.schema_store if settings else SchemaStore()
     try:
-        # Download the schema
-        response = requests.get(schema_url, timeout=30)
-        response.raise_for_status()
-        schema = response.json()
+        schema_store.get_schema(schema_url)
     except requests.RequestException as e:
+        if schema_store.offline:
+            # Schemas that are not stored in this repository cannot be checked without network access
+            raise ExtensionCheckSkipped(
+                extension_name, check_name,
+                f"schema {schema_url} is not available offline")
         raise ExtensionCheckError(
             extension_name, check_name,
             f"Failed to download schema from {schema_url}: {str(e)}")
@@ -154,7 +358,9 @@ def check_json_schema(extension_name, metadata):
 
     try:
         # Validate the extension metadata against the schema
-        jsonschema.validate(metadata, schema)
+        error = jsonschema.exceptions.best_match(schema_store.get_validator(schema_url).iter_errors(metadata))
+        if error is not None:
+            raise error
     except jsonschema.ValidationError as e:
         raise ExtensionCheckError(
             extension_name, check_name,
@@ -234,8 +440,11 @@ def check_git_repository_name(extension_name, metadata):
             """))
 
 @require_metadata_key("scm_url")
-def check_git_repository_topics(extension_name, metadata):
+def check_git_repository_topics(extension_name, metadata, settings=None):
     """See https://www.slicer.org/wiki/Documentation/Nightly/Developers/FAQ#Should_the_name_of_the_source_repository_match_the_name_of_the_extension_.3F
+
+    Repository topics are read from the :class:`GitHubMetadataFetcher` of ``settings``, which may have
+    already retrieved them for all checked extensions in a single request.
     """
     check_name = "check_git_repository_topics"
 
@@ -245,24 +454,25 @@ def check_git_repository_topics(extension_name, metadata):
     parsed_url = urlparse.urlsplit(scm_url)
     if parsed_url.netloc.lower() != "github.com":
         # Only GitHub repositories are required to use the slicer-extension topic
-        print("Skipping repository topics check for non-GitHub repository:", scm_url)
-        return
+        raise ExtensionCheckSkipped(
+            extension_name, check_name,
+            f"repository topics are only checked for GitHub repositories: {scm_url}",
+            output=f"Skipping repository topics check for non-GitHub repository: {scm_url}\n")
 
-    owner = parsed_url.path.split("/")[1]
-    repo = os.path.splitext(parsed_url.path.split("/")[-1])[0]
+    owner, repo = parse_github_repository(scm_url)
 
-    import requests
-    url = f"https://api.github.com/repos/{owner}/{repo}/topics"
-    headers = {
-        "Accept": "application/vnd.github+json"
-    }
-    response = requests.get(url, headers=headers)
-    topics = []
-    if response.status_code == 200:
-        data = response.json()
-        topics = data.get("names", [])
-    else:
-        raise ValueError(f"Failed to get github topics for {owner}/{repo}: Error {response.status_code}: {response.text}")
+    github_metadata = settings.github_metadata if settings and settings.github_metadata else GitHubMetadataFetcher()
+    try:
+        repository_metadata = github_metadata.get_repository_metadata(scm_url)
+    except GitHubMetadataError as exc:
+        raise ExtensionCheckError(
+            extension_name, check_name,
+            f"Failed to get github topics for {owner}/{repo}: {exc}")
+    if repository_metadata is None:
+        raise ExtensionCheckError(
+            extension_name, check_name,
+            f"Failed to get github topics for {owner}/{repo}: Repository not found")
+    topics = repository_metadata["topics"]
 
     if "3d-slicer-extension" not in topics:
         raise ExtensionCheckError(
@@ -271,27 +481,206 @@ def check_git_repository_topics(extension_name, metadata):
             GitHub repository does not have the '3d-slicer-extension' topic. Please, add it to the repository topics.
             """))
 
-def validate_image_url(url, url_type, extension_name, check_name):
-    """Validate that a URL points to a valid image file."""
+# First bytes of supported image file formats
+IMAGE_MAGIC_NUMBERS = {
+    b"\x89PNG\r\n\x1a\n": "image/png",
+    b"\xff\xd8\xff": "image/jpeg",
+    b"GIF87a": "image/gif",
+    b"GIF89a": "image/gif",
+    }
+
+
+def sniff_image_type(content):
+    """Get image type from the first bytes of a file, or None if it is not a supported image."""
+    for magic_number, image_type in IMAGE_MAGIC_NUMBERS.items():
+        if content.startswith(magic_number):
+            return image_type
+    return None
+
+
+# URLs that refer to a file at a specific commit. Content at these URLs never changes.
+IMMUTABLE_URL_PATTERNS = [
+    re.compile(r"^https://raw\.githubusercontent\.com/[^/]+/[^/]+/[0-9a-fA-F]{40}/"),
+    re.compile(r"^https://github\.com/[^/]+/[^/]+/(raw|blob)/[0-9a-fA-F]{40}/"),
+    ]
+
+
+class ImageUrlValidator:
+    """Checks image URLs concurrently using a shared HTTP session.
+
+    The session keeps connections alive, so requests to the same host (typically raw.githubusercontent.com)
+    reuse connections. The number of concurrent requests sent to the same host is limited.
+    Image content is not downloaded: a HEAD request is used first and if that is not conclusive then only
+    the first few bytes are requested, to check the content type and the image file signature.
+
+    Only results of successful checks are cached, so that fixed images are picked up in the next check.
+    URLs that are pinned to a commit are never checked again.
+    Other URLs are checked again after ``cache_ttl`` seconds, using a conditional request (ETag/Last-Modified).
+    If ``cache_dir`` is specified then the cache is loaded from there and :meth:`save_cache`
+    stores it, so that the cache can be used in later runs.
+    """
+    SNIFF_BYTES = 16
+    CACHE_FILENAME = "url-checks.json"
+    CACHE_VERSION = 1
+    DEFAULT_CACHE_TTL = 24 * 60 * 60
+
+    def __init__(self, max_workers=16, max_requests_per_host=6, timeout=10, cache_dir=None, cache_ttl=DEFAULT_CACHE_TTL):
+        self.timeout = timeout
+        self.max_requests_per_host = max_requests_per_host
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self._host_semaphores = {}
+        self._lock = threading.Lock()
+        self.cache_file_path = os.path.join(cache_dir, self.CACHE_FILENAME) if cache_dir else None
+        self.cache_ttl = cache_ttl
+        self.cache = self._load_cache()
+        self.cache_hits = 0  # result is used from the cache without any request
+        self.cache_revalidations = 0  # result is confirmed by a conditional request
+        self.cache_misses = 0  # URL has to be checked
+
+    def _load_cache(self):
+        if not self.cache_file_path:
+            return {}
+        try:
+            with open(self.cache_file_path, encoding="utf-8") as cache_file:
+                cache = json.load(cache_file)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        if cache.get("version") != self.CACHE_VERSION:
+            return {}
+        return {url: cached for url, cached in cache.get("urls", {}).items() if cached.get("valid")}
+
+    def save_cache(self):
+        """Save cached URL check results to the cache file."""
+        if not self.cache_file_path:
+            return
+        with self._lock:
+            cache = {"version": self.CACHE_VERSION, "urls": dict(self.cache)}
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_file_path)), exist_ok=True)
+        with open(self.cache_file_path + ".tmp", "w", encoding="utf-8") as cache_file:
+            json.dump(cache, cache_file, indent=1)
+        os.replace(self.cache_file_path + ".tmp", self.cache_file_path)
+
+    def cache_statistics(self):
+        return f"{self.cache_hits} hits, {self.cache_revalidations} revalidated, {self.cache_misses} misses"
+
+    @staticmethod
+    def is_immutable_url(url):
+        return any(pattern.match(url) for pattern in IMMUTABLE_URL_PATTERNS)
+
+    def submit(self, fn, *args, **kwargs):
+        """Run a function that validates URLs in the worker pool of the validator."""
+        return self.executor.submit(bind_span(fn), *args, **kwargs)
+
+    def _host_semaphore(self, url):
+        host = urlparse.urlsplit(url).netloc.lower()
+        with self._lock:
+            if host not in self._host_semaphores:
+                self._host_semaphores[host] = threading.BoundedSemaphore(self.max_requests_per_host)
+            return self._host_semaphores[host]
+
+    def probe(self, url):
+        """Get the content type of the file at ``url`` without downloading it.
+        :return: Tuple of ``(content_type, image_type)``. ``image_type`` is determined from the file signature,
+          it is None if it is not checked (HEAD request was conclusive) or the file is not a supported image.
+        :raises requests.RequestException: if the URL is not accessible.
+        """
+        with self._lock:
+            cached = self.cache.get(url)
+            if cached and (cached.get("immutable") or time.time() - cached.get("checked", 0) < self.cache_ttl):
+                self.cache_hits += 1
+                add_counter("cache_hits")
+                return cached["content_type"], cached.get("image_type")
+
+        conditional_headers = {}
+        if cached:
+            if cached.get("etag"):
+                conditional_headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                conditional_headers["If-Modified-Since"] = cached["last_modified"]
+
+        with self._host_semaphore(url):
+            image_type = None
+            size = None
+            response = self.session.head(url, headers=conditional_headers, allow_redirects=True, timeout=self.timeout)
+            add_counter("http_requests")
+            content_type = response.headers.get('Content-Type', '').lower()
+            if cached and response.status_code == 304:
+                return self._revalidated(url, cached)
+            if response.ok and is_valid_image_content_type(content_type):
+                size = response.headers.get("Content-Length")
+            else:
+                # HEAD is not supported or not conclusive, get the first few bytes of the file
+                headers = dict(conditional_headers)
+                headers["Range"] = f"bytes=0-{self.SNIFF_BYTES - 1}"
+                with self.session.get(url, headers=headers, stream=True, allow_redirects=True, timeout=self.timeout) as response:
+                    add_counter("http_requests")
+                    if cached and response.status_code == 304:
+                        return self._revalidated(url, cached)
+                    response.raise_for_status()
+                    content_type = response.headers.get('Content-Type', '').lower()
+                    content = next(response.iter_content(self.SNIFF_BYTES), b"")
+                    add_counter("bytes_downloaded", len(content))
+                image_type = sniff_image_type(content)
+                # Content-Range format: "bytes 0-15/12345"
+                size = response.headers.get("Content-Range", "").rpartition("/")[2] or response.headers.get("Content-Length")
+
+        valid = bool(is_valid_image_content_type(content_type) or image_type)
+        with self._lock:
+            self.cache_misses += 1
+            if valid:
+                self.cache[url] = {
+                    "content_type": content_type,
+                    "image_type": image_type,
+                    "size": int(size) if size and size.isdigit() else None,
+                    "valid": valid,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "immutable": self.is_immutable_url(url),
+                    "checked": time.time(),
+                    }
+            else:
+                # The image may be fixed without changing the URL, check it again next time
+                self.cache.pop(url, None)
+        return content_type, image_type
+
+    def _revalidated(self, url, cached):
+        with self._lock:
+            self.cache_revalidations += 1
+            self.cache[url] = dict(cached, checked=time.time())
+        return cached["content_type"], cached.get("image_type")
+
+
+def is_valid_image_content_type(content_type):
+    valid_image_types = ['image/png', 'image/jpeg', 'image/gif']
+    return any(img_type in content_type for img_type in valid_image_types)
+
+
+def validate_image_url(url, url_type, extension_name, check_name, url_validator=None):
+    """Validate that a URL points to a valid image file.
+    :param url_validator: :class:`ImageUrlValidator` used for accessing the URL. A new one is created if not specified.
+    """
     try:
         if not url.startswith("http"):
             raise ExtensionCheckError(
                 extension_name, check_name,
                 f"{url_type} '{url}' should be a valid URL starting with 'http'")
 
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        content_type = response.headers.get('Content-Type', '').lower()
+        if url_validator is None:
+            url_validator = ImageUrlValidator()
+        content_type, image_type = url_validator.probe(url)
 
         # Check if it's a valid image content type or if the URL suggests it's an image
-        valid_image_types = ['image/png', 'image/jpeg', 'image/gif']
-        is_valid_content_type = any(img_type in content_type for img_type in valid_image_types)
+        is_valid_content_type = is_valid_image_content_type(content_type)
 
-        # Allow application/octet-stream only if the URL ends with an image extension
+        # Allow application/octet-stream only if the URL ends with an image extension or the file is an image
         if not is_valid_content_type:
             if 'application/octet-stream' in content_type:
                 # Check if URL has image file extension
-                if not any(url.lower().endswith(ext) for ext in ['.png', '.jpg', '.jpeg', '.gif']):
+                if not any(url.lower().endswith(ext) for ext in ['.png', '.jpg', '.jpeg', '.gif']) and not image_type:
                     raise ExtensionCheckError(
                         extension_name, check_name,
                         f"{url_type} '{url}' returns 'application/octet-stream' but URL doesn't have an image file extension")
@@ -304,6 +693,7 @@ def validate_image_url(url, url_type, extension_name, check_name):
             extension_name, check_name,
             f"Failed to download {url_type.lower()} from {url_type} '{url}': {str(e)}")
 
+
 def safe_cleanup_directory(directory_path, max_attempts=3):
     """Safely remove a directory with retries and permission handling."""
     if not directory_path or not os.path.exists(directory_path):
@@ -336,38 +726,56 @@ def safe_cleanup_directory(directory_path, max_attempts=3):
             return False
 
 
-def check_clone_repository(extension_name, metadata, cloned_repository_folder):
-    """Clone a git repository to a temporary directory."""
+def check_clone_repository(extension_name, metadata, cloned_repository_folder, settings=None, sparse_paths=None,
+                           commit_sha=None):
+    """Clone a git repository to a temporary directory.
+    If a repository cache is set in ``settings`` then the working copy is created from a local mirror of the repository,
+    otherwise only the requested revision is downloaded.
+    If ``sparse_paths`` is specified then only the matching files are checked out.
+    If ``commit_sha`` is specified (``scm_revision`` resolved to a commit) then that commit is checked out,
+    so that the checked content is consistent with the commit that the results are stored for.
+    """
     scm_url = metadata.get("scm_url")
     scm_revision = metadata.get("scm_revision")
+    repository_cache = settings.repository_cache if settings else None
+    clone_filter = settings.clone_filter if settings else None
 
     print(f"Repository URL: {scm_url}\n")
     if scm_revision:
         print(f"Repository revision: {scm_revision}\n")
+    if commit_sha and commit_sha != scm_revision:
+        print(f"Repository commit: {commit_sha}\n")
+        scm_revision = commit_sha
 
+    start_time = time.perf_counter()
     try:
-        if scm_revision:
-            subprocess.run(
-                ['git', 'clone', scm_url, cloned_repository_folder],
-                check=True, capture_output=True, text=True, timeout=300)
-            subprocess.run(
-                ['git', 'checkout', scm_revision],
-                cwd=cloned_repository_folder,
-                check=True, capture_output=True, text=True, timeout=300)
+        if repository_cache:
+            repository_cache.checkout(scm_url, scm_revision, cloned_repository_folder, sparse_paths=sparse_paths)
+            clone_strategy = "mirror cache"
         else:
-            subprocess.run(
-                ['git', 'clone', '--depth', '1', scm_url, cloned_repository_folder],
-                check=True, capture_output=True, text=True, timeout=600)
+            clone_strategy = clone_revision(
+                scm_url, scm_revision, cloned_repository_folder,
+                clone_filter=clone_filter, sparse_paths=sparse_paths)
     except subprocess.TimeoutExpired as e:
         raise ExtensionCheckError(extension_name, "clone_repository", f"Git clone operation timed out: {e}")
     except subprocess.CalledProcessError as e:
         raise ExtensionCheckError(extension_name, "clone_repository", f"Failed to clone repository: {e.stderr.strip() if e.stderr else 'Unknown git error'}")
     except FileNotFoundError:
         raise ExtensionCheckError(extension_name, "clone_repository", "Git command not found. Please ensure git is installed and in PATH")
+    clone_time = time.perf_counter() - start_time
+
+    if sparse_paths is not None:
+        clone_strategy += ", sparse checkout"
+    return f"- Repository cloned in {clone_time:.1f} s ({clone_strategy})\n"
 
 
-def check_cmakelists_content(extension_name, metadata, cloned_repository_folder=None):
-    """Check if the top-level CMakeLists.txt file project name matches the extension name."""
+@repository_content_check
+@repository_files("/CMakeLists.txt")
+def check_cmakelists_content(extension_name, metadata, cloned_repository_folder=None, settings=None):
+    """Check if the top-level CMakeLists.txt file project name matches the extension name.
+    Icon and screenshot URLs are validated concurrently, using the image URL validator of ``settings``.
+    The validated URLs are reported before the result of the check and the CMakeLists.txt content after it.
+    """
     check_name = "check_cmakelists_content"
 
     # Look for CMakeLists.txt in the cloned repository
@@ -418,33 +826,50 @@ def check_cmakelists_content(extension_name, metadata, cloned_repository_folder=
     else:
         errors.append(f"No project() declaration found in CMakeLists.txt")
 
-    # Check extension icon URL
+    # Find extension icon URL
     # set(EXTENSION_ICONURL "https://raw.githubusercontent.com/jamesobutler/ModelClip/main/Resources/Icons/ModelClip.png")
     extension_icon_url = None
     icon_url_pattern = r'set\s*\(EXTENSION_ICONURL\s*"([^"]+)"[ ]*\)'
     icon_url_matches = re.findall(icon_url_pattern, cmake_content, re.IGNORECASE | re.MULTILINE)
     if icon_url_matches:
         extension_icon_url = icon_url_matches[0].strip()
-        # Validate the icon URL
+
+    # Find screenshot URLS
+    # set(EXTENSION_SCREENSHOTURLS "https://raw.githubusercontent.com/SlicerProstate/SlicerZFrameRegistration/master/Screenshots/1.png https://raw.githubusercontent.com/SlicerProstate/SlicerZFrameRegistration/master/Screenshots/2.png")
+    extension_screenshot_urls = []
+    screenshot_urls_pattern = r'set\s*\(EXTENSION_SCREENSHOTURLS\s*"([^"]+)"\)'
+    screenshot_urls_matches = re.findall(screenshot_urls_pattern, cmake_content, re.IGNORECASE | re.MULTILINE)
+    if screenshot_urls_matches:
+        extension_screenshot_urls = [url.strip() for url in screenshot_urls_matches[0].split()]
+
+    # Validate all the URLs concurrently
+    url_validator = settings.image_url_validator if settings and settings.image_url_validator else ImageUrlValidator()
+    icon_url_validation = None
+    if icon_url_matches:
+        icon_url_validation = url_validator.submit(
+            validate_image_url, extension_icon_url, "EXTENSION_ICONURL", extension_name, check_name, url_validator)
+    screenshot_url_validations = [
+        url_validator.submit(validate_image_url, url, "EXTENSION_SCREENSHOTURLS", extension_name, check_name, url_validator)
+        for url in extension_screenshot_urls]
+
+    validated_urls = []
+
+    # Check extension icon URL
+    if icon_url_matches:
         try:
-            validate_image_url(extension_icon_url, "EXTENSION_ICONURL", extension_name, check_name)
-            print(f"- :white_check_mark: Extension icon URL: {extension_icon_url}\n")
+            icon_url_validation.result()
+            validated_urls.append(f"- :white_check_mark: Extension icon URL: {extension_icon_url}\n\n")
         except ExtensionCheckError as e:
             errors.append(str(e))
     else:
         errors.append("No EXTENSION_ICONURL found in CMakeLists.txt.")
 
     # Check screenshot URLS
-    # set(EXTENSION_SCREENSHOTURLS "https://raw.githubusercontent.com/SlicerProstate/SlicerZFrameRegistration/master/Screenshots/1.png https://raw.githubusercontent.com/SlicerProstate/SlicerZFrameRegistration/master/Screenshots/2.png")
-    extension_screenshot_urls = []
-    screenshot_urls_pattern = r'set\s*\(EXTENSION_SCREENSHOTURLS\s*"([^"]+)"\)'
-    screenshot_urls_matches = re.findall(screenshot_urls_pattern, cmake_content, re.IGNORECASE | re.MULTILINE)
     if screenshot_urls_matches:
-        extension_screenshot_urls = [url.strip() for url in screenshot_urls_matches[0].split()]
-        for url in extension_screenshot_urls:
+        for url, screenshot_url_validation in zip(extension_screenshot_urls, screenshot_url_validations):
             try:
-                validate_image_url(url, "EXTENSION_SCREENSHOTURLS", extension_name, check_name)
-                print(f"- :white_check_mark: Extension screenshot URL: {url}")
+                screenshot_url_validation.result()
+                validated_urls.append(f"- :white_check_mark: Extension screenshot URL: {url}\n")
             except ExtensionCheckError as e:
                 errors.append(str(e))
     else:
@@ -456,46 +881,92 @@ def check_cmakelists_content(extension_name, metadata, cloned_repository_folder=
             extension_name, check_name,
             " ".join(errors))
 
-    # Log the top-level CMakeLists.txt file content
-    return f"\nTop-level CMakeLists.txt content:\n```\n{cmake_content}\n```\n"
+    # Log the validated URLs and the top-level CMakeLists.txt file content
+    return CheckReport(
+        output="".join(validated_urls),
+        details=f"\nTop-level CMakeLists.txt content:\n```\n{cmake_content}\n```\n")
+
+
+def repository_tree_size(repository_folder):
+    """Get size of all files in the checked out revision from git tree object metadata.
+    Files do not need to be present in the working tree (for example, in a sparse checkout), and the result
+    does not depend on how much history the clone has.
+    :return: :class:`folder_size.FolderSizeScan`
+    """
+    result = subprocess.run(
+        ['git', 'ls-tree', '-r', '-l', '-z', 'HEAD'],
+        cwd=repository_folder,
+        check=True, capture_output=True, text=True, timeout=300)
+    scan = FolderSizeScan()
+    for line in result.stdout.split("\0"):
+        # Format: <mode> SP <type> SP <object> SP+ <size> TAB <path>
+        object_info, _, path = line.partition("\t")
+        object_info = object_info.split()
+        if len(object_info) == 4 and object_info[1] == "blob":
+            scan.add_file(path, int(object_info[3]))
+    return scan
+
+
+def repository_head_sha(repository_folder):
+    """Get the SHA of the checked out commit, or None if it cannot be determined."""
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=repository_folder,
+            check=True, capture_output=True, text=True, timeout=60)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
+        return None
+    return result.stdout.strip() or None
 
 
+@repository_content_check
 def check_repository_size(extension_name, _metadata, cloned_repository_folder=None):
-    """Check that the total checked-out repository size does not exceed the limit."""
+    """Check that the total size of the files of the checked out revision does not exceed the limit.
+
+    The size is computed from git tree metadata, so it is the same for every way of cloning the repository
+    (mirror cache, shallow fetch, full clone, sparse checkout) and does not depend on the size of the history.
+    If the limit is exceeded then the largest files and folders are reported.
+    """
     check_name = "check_repository_size"
     size_limit_mb = 100
 
     if not cloned_repository_folder:
         raise ExtensionCheckError(extension_name, check_name, "Repository is not available.")
 
-    total_bytes = sum(
-        f.stat().st_size
-        for f in Path(cloned_repository_folder).rglob('*')
-        if f.is_file()
-    )
-    total_mb = total_bytes / (1024 * 1024)
+    try:
+        scan = repository_tree_size(cloned_repository_folder)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        raise ExtensionCheckError(extension_name, check_name, f"Failed to list repository files: {e}")
+    total_mb = scan.total_bytes / (1024 * 1024)
 
     if total_mb > size_limit_mb:
         raise ExtensionCheckError(
             extension_name, check_name,
-            f"Repository size {total_mb:.1f} MB exceeds the {size_limit_mb} MB limit.")
+            f"Repository size {total_mb:.1f} MB exceeds the {size_limit_mb} MB limit.\n{scan.summary()}")
+
+    return CheckReport(output=f"- :white_check_mark: Repository size: {total_mb:.1f} MB (limit: {size_limit_mb} MB)\n\n")
 
-    print(f"- :white_check_mark: Repository size: {total_mb:.1f} MB (limit: {size_limit_mb} MB)\n")
 
+LICENSE_FILE_NAMES = ["LICENSE", "LICENCE", "License.txt", "license.txt", "LICENSE.txt", "COPYING", "COPYING.txt"]
 
+
+@repository_content_check
+@repository_files(*[f"/{license_file_name}" for license_file_name in LICENSE_FILE_NAMES])
 def check_license_file(extension_name, metadata, cloned_repository_folder):
     # Find license file
     license_file_path = None
-    license_file_names = ["LICENSE", "LICENCE", "License.txt", "license.txt", "LICENSE.txt", "COPYING", "COPYING.txt"]
-    for license_file_name in license_file_names:
+    for license_file_name in LICENSE_FILE_NAMES:
         potential_path = os.path.join(cloned_repository_folder, license_file_name)
         if os.path.isfile(potential_path):
             license_file_path = potential_path
             break
     if not license_file_path:
         if extension_name in LICENSE_CHECK_EXCEPTIONS:
-            print(f"- :warning: No license file found in {extension_name} repository root. This is a known issue - skipping check.")
-            return
+            raise ExtensionCheckSkipped(
+                extension_name, "check_license_file",
+                "no license file found in repository root. This is a known issue.",
+                output=f"- :warning: No license file found in {extension_name} repository root. "
+                       "This is a known issue - skipping check.\n")
         raise ExtensionCheckError(
             extension_name, "check_license_file",
             "No license file found in repository root.")
@@ -507,68 +978,868 @@ def check_license_file(extension_name, metadata, cloned_repository_folder):
     return f"\nLicense file ({os.path.basename(license_file_path)}) content:\n```\n{license_content}\n```\n"
 
 
-def check_dependencies(directory):
-    import os
-    required_extensions = {}  # for each extension it contains a list of extensions that require it
-    available_extensions = []
-    for filename in os.listdir(directory):
-        f = os.path.join(directory, filename)
-        if not os.path.isfile(f) or not filename.endswith(".json"):
-            continue
-        extension_name, extension = os.path.splitext(os.path.basename(filename))
-        if extension != ".json":
-            continue
+class CatalogIndex:
+    """In-memory index of all extension description files in the extension descriptions folder.
+
+    The index is built from a single directory scan and each description file is parsed only once.
+    Checks and reports query the index instead of reading the files again.
+
+    If ``cache_dir`` is specified then the parsed metadata is also saved to disk, keyed by file modification time
+    and size, so that later runs only parse the description files that have changed since then.
+    If ``keep_file_contents`` is True then the content of the parsed files is kept, so that checks that need
+    the file content (see :meth:`read_file`) do not read the files again.
+    """
+    CACHE_FILENAME = "catalog-index.json"
+    CACHE_VERSION = 1
+
+    def __init__(self, extension_descriptions_folder, cache_dir=None, keep_file_contents=False):
+        self.extension_descriptions_folder = extension_descriptions_folder
+        self.cache_file_path = os.path.join(cache_dir, self.CACHE_FILENAME) if cache_dir else None
+        self.keep_file_contents = keep_file_contents
+        self.file_contents = {}  # extension name -> content of the description file (bytes)
+        self.metadata = {}  # extension name -> metadata
+        self.parse_errors = {}  # extension name -> ExtensionParseError
+        self.dependents = {}  # extension name -> list of extensions that require it
+        self.categories = {}  # category -> list of extensions
+        self.parsed_files_count = 0
+        self._load()
+
+    def extension_names(self):
+        """Get sorted list of names of all extensions that have a valid description file."""
+        return sorted(self.metadata.keys())
+
+    def get_metadata(self, extension_name):
+        """Get metadata of an extension.
+        :raises ExtensionParseError: if the extension description file could not be parsed.
+        :raises KeyError: if there is no description file for the extension.
+        """
+        if extension_name in self.parse_errors:
+            raise self.parse_errors[extension_name]
+        return self.metadata[extension_name]
+
+    def read_file(self, extension_name):
+        """Get the content (bytes) of the description file of an extension.
+        The content that was kept when the index was built is released, as each file is checked once.
+        Files that were not parsed (their metadata is loaded from the cache) are read now.
+        """
+        file_content = self.file_contents.pop(extension_name, None)
+        if file_content is None:
+            with open(os.path.join(self.extension_descriptions_folder, f"{extension_name}.json"), 'rb') as f:
+                file_content = f.read()
+        return file_content
+
+    def _read_cache(self):
+        if not self.cache_file_path:
+            return {}
         try:
-            extension_description = parse_json(f)
-        except ExtensionParseError as exc:
-            print(exc)
-            continue
-        available_extensions.append(extension_name)
-        if 'build_dependencies' not in extension_description:
-            continue
-        dependencies = extension_description['build_dependencies']
-        for dependency in dependencies:
+            with open(self.cache_file_path, encoding="utf-8") as cache_file:
+                cache = json.load(cache_file)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        if (cache.get("version") != self.CACHE_VERSION
+                or cache.get("folder") != os.path.abspath(self.extension_descriptions_folder)):
+            return {}
+        return cache.get("files", {})
+
+    def _write_cache(self, cached_files):
+        os.makedirs(os.path.dirname(self.cache_file_path), exist_ok=True)
+        with open(self.cache_file_path + ".tmp", "w", encoding="utf-8") as cache_file:
+            json.dump({
+                "version": self.CACHE_VERSION,
+                "folder": os.path.abspath(self.extension_descriptions_folder),
+                "files": cached_files,
+                }, cache_file)
+        os.replace(self.cache_file_path + ".tmp", self.cache_file_path)
+
+    def _load(self):
+        previously_cached_files = self._read_cache()
+        cached_files = {}
+        with os.scandir(self.extension_descriptions_folder) as entries:
+            json_file_entries = sorted(
+                (entry for entry in entries if entry.name.endswith(".json") and entry.is_file()),
+                key=lambda entry: entry.name)
+        for entry in json_file_entries:
+            extension_name = os.path.splitext(entry.name)[0]
+            file_stat = entry.stat()
+            cached_file = previously_cached_files.get(entry.name)
+            if (not cached_file or cached_file.get("mtime_ns") != file_stat.st_mtime_ns
+                    or cached_file.get("size") != file_stat.st_size):
+                cached_file = {"mtime_ns": file_stat.st_mtime_ns, "size": file_stat.st_size}
+                with open(entry.path, 'rb') as f:
+                    file_content = f.read()
+                if self.keep_file_contents:
+                    self.file_contents[extension_name] = file_content
+                try:
+                    cached_file["metadata"] = parse_json(entry.path, file_content)
+                except ExtensionParseError as exc:
+                    cached_file["parse_error"] = exc.details
+                self.parsed_files_count += 1
+            cached_files[entry.name] = cached_file
+            if "parse_error" in cached_file:
+                self.parse_errors[extension_name] = ExtensionParseError(extension_name, cached_file["parse_error"])
+            else:
+                self.add_extension(extension_name, cached_file["metadata"])
+        if self.cache_file_path and cached_files != previously_cached_files:
+            self._write_cache(cached_files)
+
+    def add_extension(self, extension_name, metadata):
+        self.metadata[extension_name] = metadata
+        for dependency in metadata.get("build_dependencies") or []:
             if not dependency:
                 continue
-            if dependency in required_extensions:
-                required_extensions[dependency].append(extension_name)
-            else:
-                required_extensions[dependency] = [extension_name]
+            self.dependents.setdefault(dependency, []).append(extension_name)
+        category = metadata.get("category", "")
+        if category:
+            self.categories.setdefault(category, []).append(extension_name)
+
+
+def check_dependencies(directory, catalog_index=None):
+    """Check that all extensions required by ``build_dependencies`` exist and there are no circular dependencies.
+    :param catalog_index: :class:`CatalogIndex` of ``directory``. It is created if not specified.
+    """
+    if catalog_index is None:
+        catalog_index = CatalogIndex(directory)
+    for exc in catalog_index.parse_errors.values():
+        print(exc)
 
-    print(f"Checked dependency between {len(available_extensions)} extensions.\n")
+    print(f"Checked dependency between {len(catalog_index.metadata)} extensions.\n")
     errors_found = []
-    for extension in required_extensions:
-        if extension in available_extensions:
+    for extension, required_by in catalog_index.dependents.items():
+        if extension in catalog_index.metadata:
             # required extension is found
             continue
-        required_by_extensions = ', '.join(required_extensions[extension])
+        required_by_extensions = ', '.join(required_by)
         errors_found.append(f"'{extension}' extension is not found. It is required by extension: {required_by_extensions}.")
+    for cycle in DependencyGraph.from_metadata(catalog_index.metadata).cycles():
+        errors_found.append(f"{format_cycle(cycle)}.")
     if errors_found:
         raise ExtensionDependencyError(errors_found)
 
 
-def print_categories(directory):
-    import os
-    extensions_for_categories = {}  # for each category it contains a list of extensions
-    for filename in os.listdir(directory):
-        f = os.path.join(directory, filename)
-        if not os.path.isfile(f) or not filename.endswith(".json"):
-            continue
-        extension_name, extension = os.path.splitext(os.path.basename(filename))
-        if extension != ".json":
-            continue
+def print_categories(directory, catalog_index=None):
+    """Print categories of all extensions.
+    :param catalog_index: :class:`CatalogIndex` of ``directory``. It is created if not specified.
+    """
+    if catalog_index is None:
+        catalog_index = CatalogIndex(directory)
+    for exc in catalog_index.parse_errors.values():
+        print(exc)
+    extensions_for_categories = catalog_index.categories  # for each category it contains a list of extensions
+    print(f"[\n{'\n'.join(f'    "{category}",' for category in sorted(extensions_for_categories.keys()))}\n]")
+
+
+class ThreadOutputRouter(io.TextIOBase):
+    """Text stream that redirects writes of the current thread into a private buffer.
+
+    Checks report their progress using plain ``print()`` calls. When several extensions are
+    checked in parallel, this router is installed as ``sys.stdout`` so that the output of each
+    extension can be collected separately and printed in a deterministic order.
+    """
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            return self._stream.write(text)
+        return buffer.write(text)
+
+    def flush(self):
+        if getattr(self._local, "buffer", None) is None:
+            self._stream.flush()
+
+    @contextmanager
+    def capture(self):
+        """Collect all output written by the current thread while the context is active."""
+        buffer = io.StringIO()
+        self._local.buffer = buffer
         try:
-            extension_description = parse_json(f)
+            yield buffer
+        finally:
+            self._local.buffer = None
+
+
+def checker_version():
+    """Get a hash of the code and schemas that determine check results."""
+    scripts_folder = Path(__file__).resolve().parent
+    checker_files = [Path(__file__).resolve()] + [
+        scripts_folder / module_file_name
+        for module_file_name in ("check_results.py", "folder_size.py", "github_metadata.py", "repository_cache.py")]
+    schemas_folder = Path(SCHEMAS_FOLDER)
+    if schemas_folder.is_dir():
+        checker_files += sorted(schemas_folder.glob("*.json"))
+    version_hash = hashlib.sha256()
+    for checker_file in checker_files:
+        version_hash.update(checker_file.name.encode("utf-8"))
+        version_hash.update(hashlib.sha256(checker_file.read_bytes()).digest())
+    return version_hash.hexdigest()[:16]
+
+
+# Version of the checks. Results stored by a different version of this script, the modules that implement
+# the checks, or the schemas are not reused.
+CHECKER_VERSION = checker_version()
+
+
+class ValidationResultStore:
+    """Stores the reports of extensions that passed all checks, to skip checking them again.
+
+    Results are keyed by a hash of the description file content, the commit SHA that ``scm_revision`` referred to
+    at the time of the check, and :data:`CHECKER_VERSION`. Therefore an extension is checked again if its
+    description file changes, its repository branch moves to a new commit, or the checks change.
+    Some checks depend on external state (such as repository topics and image URLs), so results are
+    only reused for ``max_age`` seconds. Failed checks are never stored, so that fixes are always picked up.
+
+    :param cache_dir: Folder where the results are stored between runs.
+    """
+    CACHE_FILENAME = "validation-results.json"
+    CACHE_VERSION = 2
+    DEFAULT_MAX_AGE = 7 * 24 * 60 * 60
+
+    def __init__(self, cache_dir, max_age=DEFAULT_MAX_AGE):
+        self.cache_file_path = os.path.join(cache_dir, self.CACHE_FILENAME)
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.reused_count = 0
+        self.results = self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_file_path, encoding="utf-8") as cache_file:
+                cache = json.load(cache_file)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        if cache.get("version") != self.CACHE_VERSION:
+            return {}
+        now = time.time()
+        return {key: result for key, result in cache.get("results", {}).items()
+                if now - result.get("checked", 0) < self.max_age}
+
+    def save(self):
+        with self._lock:
+            cache = {"version": self.CACHE_VERSION, "results": dict(self.results)}
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_file_path)), exist_ok=True)
+        with open(self.cache_file_path + ".tmp", "w", encoding="utf-8") as cache_file:
+            json.dump(cache, cache_file, indent=1)
+        os.replace(self.cache_file_path + ".tmp", self.cache_file_path)
+
+    @staticmethod
+    def result_key(description_file_content, commit_sha):
+        """Get the key of the validation result of a description file (bytes) at a repository commit."""
+        key_hash = hashlib.sha256()
+        for part in (CHECKER_VERSION.encode("utf-8"), commit_sha.encode("utf-8"), description_file_content):
+            key_hash.update(hashlib.sha256(part).digest())
+        return key_hash.hexdigest()
+
+    def get(self, key):
+        """Get the stored result (dictionary with ``report`` and ``checks`` keys), or None if it is not available."""
+        with self._lock:
+            result = self.results.get(key)
+            if result is not None:
+                self.reused_count += 1
+            return result
+
+    def put(self, key, extension_result, report):
+        """Store the Markdown report and the check results (:class:`check_results.ExtensionResult`) of an extension."""
+        with self._lock:
+            self.results[key] = {
+                "extension_name": extension_result.extension_name,
+                "commit_sha": extension_result.commit_sha,
+                "report": report,
+                "checks": [check_result.to_dict() for check_result in extension_result.checks],
+                "checked": time.time(),
+                }
+
+
+class RepositoryCheckCache:
+    """Stores results of checks that only depend on the content of the extension repository at a commit.
+
+    Results of checks marked with :func:`repository_content_check` are keyed by commit SHA, check name,
+    extension name and :data:`CHECKER_VERSION`. If the results of all these checks are available for a commit
+    then the repository does not need to be cloned. Failed checks are never stored, because they may be fixed
+    without a new commit (for example, an icon URL that was not accessible).
+
+    :param cache_dir: Folder where the results are stored between runs.
+    """
+    CACHE_FILENAME = "repository-checks.json"
+    CACHE_VERSION = 2
+
+    def __init__(self, cache_dir):
+        self.cache_file_path = os.path.join(cache_dir, self.CACHE_FILENAME)
+        self._lock = threading.Lock()
+        self.reused_count = 0
+        self.results = self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_file_path, encoding="utf-8") as cache_file:
+                cache = json.load(cache_file)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        if cache.get("version") != self.CACHE_VERSION:
+            return {}
+        return {key: result for key, result in cache.get("results", {}).items() if result.get("success")}
+
+    def save(self):
+        with self._lock:
+            cache = {"version": self.CACHE_VERSION, "results": dict(self.results)}
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_file_path)), exist_ok=True)
+        with open(self.cache_file_path + ".tmp", "w", encoding="utf-8") as cache_file:
+            json.dump(cache, cache_file, indent=1)
+        os.replace(self.cache_file_path + ".tmp", self.cache_file_path)
+
+    @staticmethod
+    def result_key(commit_sha, check_name, extension_name):
+        return hashlib.sha256(json.dumps([CHECKER_VERSION, commit_sha, check_name, extension_name]).encode("utf-8")).hexdigest()
+
+    def get(self, commit_sha, check_name, extension_name):
+        """Get the stored :class:`check_results.CheckResult`, or None if it is not available."""
+        with self._lock:
+            result = self.results.get(self.result_key(commit_sha, check_name, extension_name))
+            if result is None:
+                return None
+            self.reused_count += 1
+            return CheckResult.from_dict(result["result"], reused=True)
+
+    def put(self, commit_sha, extension_name, check_result):
+        """Store the result of a check (:class:`check_results.CheckResult`). Failed results are not stored."""
+        if not check_result.success:
+            return
+        with self._lock:
+            self.results[self.result_key(commit_sha, check_result.name, extension_name)] = {
+                "success": check_result.success,
+                "result": check_result.to_dict(),
+                "checked": time.time(),
+                }
+
+
+class CheckSettings:
+    """Settings shared by all extension checks of a validation run.
+
+    :param repository_cache: Optional :class:`RepositoryCache` used for cloning extension repositories.
+    :param clone_filter: Optional git partial clone filter (such as ``blob:none``) used when cloning repositories.
+    :param sparse_checkout: If True then only the repository files that checks declare with :func:`repository_files`
+      are checked out.
+    :param schema_store: :class:`SchemaStore` used for validating extension description files.
+      A new store is created if not specified.
+    :param catalog_index: Optional :class:`CatalogIndex` that provides already parsed extension metadata.
+    :param image_url_validator: :class:`ImageUrlValidator` shared by all checks, for connection reuse and
+      limiting the number of concurrent requests. A new validator is created when it is first used, if not specified.
+    :param github_metadata: :class:`GitHubMetadataFetcher` shared by all checks. A new fetcher is created
+      when it is first used, if not specified.
+    :param result_store: Optional :class:`ValidationResultStore`. If specified then extensions that passed all
+      checks earlier, with the same description file and repository commit, are not checked again.
+    :param ref_resolver: :class:`git_refs.GitRefResolver` used for getting the commit SHA of ``scm_revision``,
+      if a result store or repository check cache is specified. A new resolver is created if not specified.
+    :param repository_check_cache: Optional :class:`RepositoryCheckCache`. If specified then results of
+      repository content checks are reused for the same commit, and the repository is not cloned if possible.
+    :param profiler: :class:`run_profile.RunProfiler` that records timing and counters of each check.
+      A new profiler is created if not specified.
+    """
+    def __init__(self, repository_cache=None, clone_filter=None, sparse_checkout=False, schema_store=None,
+                 catalog_index=None, image_url_validator=None, github_metadata=None, result_store=None,
+                 ref_resolver=None, repository_check_cache=None, profiler=None):
+        self.repository_cache = repository_cache
+        self.clone_filter = clone_filter
+        self.sparse_checkout = sparse_checkout
+        self.schema_store = schema_store if schema_store is not None else SchemaStore()
+        self.catalog_index = catalog_index
+        self._image_url_validator = image_url_validator
+        self._github_metadata = github_metadata
+        self._lock = threading.Lock()
+        self.result_store = result_store
+        self.ref_resolver = ref_resolver if ref_resolver is not None else GitRefResolver()
+        self.repository_check_cache = repository_check_cache
+        self.profiler = profiler if profiler is not None else RunProfiler()
+
+    @property
+    def image_url_validator(self):
+        # Created when first used, as checks that do not access the network do not need it
+        with self._lock:
+            if self._image_url_validator is None and requests:
+                self._image_url_validator = ImageUrlValidator()
+            return self._image_url_validator
+
+    @property
+    def github_metadata(self):
+        with self._lock:
+            if self._github_metadata is None and requests:
+                self._github_metadata = GitHubMetadataFetcher()
+            return self._github_metadata
+
+
+class ExtensionCheckRun:
+    """Checks of one extension description file, split into stages that can run in different threads.
+
+    :meth:`prepare` parses the description file and clones the repository (network-bound),
+    :meth:`run_checks` runs the remaining checks, and :meth:`cleanup` removes the cloned repository.
+    Each stage prints its part of the report, in this order. Results of the checks are collected
+    in :attr:`result` (:class:`check_results.ExtensionResult`).
+
+    :param file_path: Path of the extension description file (.json), relative to the extension descriptions folder.
+    :param settings: Optional :class:`CheckSettings` of the validation run.
+    """
+
+    def __init__(self, file_path, extension_descriptions_folder, settings=None):
+        self.file_path = file_path
+        self.extension_descriptions_folder = extension_descriptions_folder
+        self.settings = settings or CheckSettings()
+        self.extension_name = os.path.splitext(os.path.basename(file_path))[0]
+        self.metadata = None
+        self.commit_sha = None
+        self.result_key = None
+        self.cloned_repository_folder = None
+        self.result = ExtensionResult(self.extension_name, file_path)
+        self.finished = False  # no more checks need to be run
+        self.report = io.StringIO()
+        self._checks = []
+        self._stored_check_results = {}
+        self._repository_cloned = False
+
+    @property
+    def success(self):
+        return self.result.success
+
+    def prepare(self):
+        """Parse the description file, look up stored results and clone the repository."""
+        settings = self.settings
+        extension_name = self.extension_name
+        file_path = self.file_path
+
+        print(f"## Extension: {extension_name}")
+
+        # Log the description file content for convenience
+        use_catalog_index = settings.catalog_index is not None and os.path.dirname(file_path) in ('', '.')
+        if use_catalog_index:
+            description_file_bytes = settings.catalog_index.read_file(extension_name)
+        else:
+            with open(file_path, 'rb') as f:
+                description_file_bytes = f.read()
+        description_file_content = description_file_bytes.decode('utf-8', errors='ignore')
+        print(f"Extension description file content:\n```\n{description_file_content}\n```\n")
+
+        try:
+            if use_catalog_index:
+                self.metadata = settings.catalog_index.get_metadata(extension_name)
+            else:
+                self.metadata = parse_json(file_path)
+        except ExtensionParseError as exc:
+            print(f"- :x: Failed to parse extension description file: {exc}")
+            self.result.add(CheckResult("parse_json", "Parse extension description file", STATUS_FAILED, str(exc)))
+            self.finished = True
+            return
+
+        # Get the commit that will be checked, if results may be reused. If it is unknown then the repository
+        # is cloned at scm_revision and results are not reused.
+        if settings.result_store is not None or settings.repository_check_cache is not None:
+            try:
+                self.commit_sha = settings.ref_resolver.resolve(
+                    self.metadata["scm_url"], self.metadata.get("scm_revision") or "")
+            except (GitRefResolveError, KeyError, TypeError, AttributeError):
+                self.commit_sha = None
+        commit_sha = self.commit_sha
+        self.result.commit_sha = commit_sha
+
+        if settings.result_store is not None and commit_sha:
+            self.result_key = ValidationResultStore.result_key(description_file_bytes, commit_sha)
+            stored_result = settings.result_store.get(self.result_key)
+            if stored_result is not None:
+                with settings.profiler.span("stored_result", extension_name, category="cache") as span:
+                    add_counter("cache_hits")
+                    span.success = True
+                checked_time = datetime.fromtimestamp(stored_result["checked"]).strftime("%Y-%m-%d %H:%M")
+                print(f"All checks passed for this description file and commit {commit_sha} on {checked_time}, "
+                      "results are reused:\n")
+                print(stored_result["report"], end="")
+                self.result.reused = True
+                for stored_check_result in stored_result["checks"]:
+                    self.result.add(CheckResult.from_dict(stored_check_result, reused=True))
+                self.finished = True
+                return
+
+        cloned_repository_folder = tempfile.mkdtemp(prefix=f"extension_check_{extension_name}_")
+        self.cloned_repository_folder = cloned_repository_folder
+
+        clone_kwargs = {"cloned_repository_folder": cloned_repository_folder, "settings": settings, "commit_sha": commit_sha}
+        self._checks = [
+            ("Clone repository", check_clone_repository, clone_kwargs),
+            ("Check repository size", check_repository_size, {"cloned_repository_folder": cloned_repository_folder}),
+            ("Check JSON schema", check_json_schema, {"settings": settings}),
+            ("Check JSON file format", check_json_file_format, {"extension_file_path": file_path, "extension_file_content": description_file_bytes}),
+            ("Check extension name", check_extension_name, {}),
+            ("Check category", check_category, {}),
+            ("Check git repository name", check_git_repository_name, {}),
+            ("Check git repository topics", check_git_repository_topics, {"settings": settings}),
+            ("Check SCM URL syntax", check_scm_url_syntax, {}),
+            ("Check CMakeLists.txt content", check_cmakelists_content, {"cloned_repository_folder": cloned_repository_folder, "settings": settings}),
+            ("Check license file", check_license_file, {"cloned_repository_folder": cloned_repository_folder}),
+            ]
+        if settings.sparse_checkout:
+            # Only check out files that are read by the checks
+            clone_kwargs["sparse_paths"] = sorted(set(
+                path for _, check, _ in self._checks for path in getattr(check, "repository_files", [])))
+
+        # Results of repository content checks that are already known for this commit
+        repository_check_cache = settings.repository_check_cache if commit_sha else None
+        if repository_check_cache:
+            for _, check, _ in self._checks:
+                if getattr(check, "repository_content_check", False):
+                    stored_check_result = repository_check_cache.get(commit_sha, check.__name__, extension_name)
+                    if stored_check_result is not None:
+                        self._stored_check_results[check.__name__] = stored_check_result
+
+        # The clone is the first check
+        self._run_check(*self._checks[0])
+        if self.result.commit_sha is None and self._repository_cloned:
+            self.result.commit_sha = repository_head_sha(cloned_repository_folder)
+
+    def run_checks(self):
+        """Run all checks after the clone. :meth:`prepare` must be called before."""
+        if self.finished:
+            return
+        for check_description, check, check_kwargs in self._checks[1:]:
+            self._run_check(check_description, check, check_kwargs)
+        self.finished = True
+        if self.success and self.result_key is not None:
+            self.settings.result_store.put(self.result_key, self.result, self.report.getvalue())
+
+    def _run_check(self, check_description, check, check_kwargs):
+        repository_check_cache = self.settings.repository_check_cache if self.commit_sha else None
+        skip_clone = all(
+            check.__name__ in self._stored_check_results
+            for _, check, _ in self._checks if getattr(check, "repository_content_check", False))
+        span_attributes = {}
+        if check is check_clone_repository and isinstance(self.metadata.get("scm_url"), str):
+            span_attributes["host"] = urlparse.urlsplit(self.metadata["scm_url"]).netloc.lower()
+        with self.settings.profiler.span(check.__name__, self.extension_name, **span_attributes) as span:
+            if check is check_clone_repository and skip_clone:
+                check_result = CheckResult(
+                    check.__name__, check_description, STATUS_SKIPPED,
+                    f"results of repository checks are reused for commit {self.commit_sha}")
+                span.attributes["skipped"] = True
+            elif check.__name__ in self._stored_check_results:
+                check_result = self._stored_check_results[check.__name__]
+                add_counter("cache_hits")
+            else:
+                try:
+                    report = check(self.extension_name, self.metadata, **check_kwargs)
+                    check_result = CheckResult.passed(check.__name__, check_description, report)
+                except ExtensionCheckError as exc:
+                    check_result = CheckResult(check.__name__, check_description, STATUS_FAILED, str(exc))
+                except ExtensionCheckSkipped as exc:
+                    check_result = CheckResult(
+                        check.__name__, check_description, STATUS_SKIPPED, str(exc), output=exc.output)
+                if check is check_clone_repository:
+                    self._repository_cloned = check_result.success
+            span.success = check_result.success
+        if not check_result.reused:
+            check_result.duration = span.duration
+            if (repository_check_cache and self._repository_cloned and check is not check_clone_repository
+                    and getattr(check, "repository_content_check", False)):
+                repository_check_cache.put(self.commit_sha, self.extension_name, check_result)
+        self.result.add(check_result)
+        check_report = render_markdown_check(check_result)
+        print(check_report, end="")
+        self.report.write(check_report)
+
+    def cleanup(self):
+        """Remove the cloned repository.
+        :return: False if the folder could not be removed.
+        """
+        if not self.cloned_repository_folder:
+            return True
+        with self.settings.profiler.span("cleanup", self.extension_name, category="cleanup") as span:
+            success_cleanup = safe_cleanup_directory(self.cloned_repository_folder)
+            span.success = success_cleanup
+        if not success_cleanup:
+            print(f"Note: Temporary directory may still exist: {self.cloned_repository_folder}")
+        return success_cleanup
+
+
+def check_extension_description_file(file_path, extension_descriptions_folder, settings=None):
+    """Run all checks on an extension description file and print the results.
+    :param file_path: Path of the extension description file (.json), relative to the extension descriptions folder.
+    :param settings: Optional :class:`CheckSettings` of the validation run.
+    :return: True if all checks passed.
+    """
+    extension_check = ExtensionCheckRun(file_path, extension_descriptions_folder, settings)
+    try:
+        extension_check.prepare()
+        extension_check.run_checks()
+    finally:
+        extension_check.cleanup()
+    return extension_check.success
+
+
+class BackgroundCleanup:
+    """Removes folders in a background thread, so that slow removals (with retries) do not delay the checks.
+
+    Output of the removals (warnings) is collected and can be printed at the end using :meth:`close`.
+    """
+
+    def __init__(self, output_router=None):
+        self._output_router = output_router
+        self._queue = queue.Queue()
+        self._output = io.StringIO()
+        self._thread = threading.Thread(target=self._run, name="BackgroundCleanup", daemon=True)
+        self._thread.start()
+
+    def submit(self, extension_check):
+        """Schedule the cleanup of an :class:`ExtensionCheckRun`."""
+        self._queue.put(extension_check)
+
+    def _run(self):
+        while True:
+            extension_check = self._queue.get()
+            if extension_check is None:
+                break
+            if self._output_router:
+                with self._output_router.capture() as buffer:
+                    extension_check.cleanup()
+                self._output.write(buffer.getvalue())
+            else:
+                extension_check.cleanup()
+
+    def close(self):
+        """Wait until all scheduled folders are removed.
+        :return: Output of the removals.
+        """
+        self._queue.put(None)
+        self._thread.join()
+        return self._output.getvalue()
+
+
+def check_extension_description_files(file_paths, extension_descriptions_folder, jobs=1, settings=None, prefetch=2):
+    """Check extension description files and print the results in the order of ``file_paths``.
+
+    Extensions are processed in a pipeline, so that network-bound and CPU-bound work overlap:
+
+    - prepare stage: description files are parsed and repositories are cloned, up to ``prefetch`` extensions
+      ahead of the check stage (in addition to the extensions that are being checked),
+    - check stage: ``jobs`` worker threads run the checks,
+    - cleanup stage: cloned repositories are removed in a background thread.
+
+    The output of each extension is collected in a buffer and printed as soon as all preceding extensions are
+    reported, therefore the report is identical to the one produced by a sequential run
+    (except warnings about folders that could not be removed, which are printed at the end).
+
+    :return: List of :class:`check_results.ExtensionResult`, in the order of ``file_paths``.
+    """
+    if not file_paths:
+        return []
+    jobs = max(jobs, 1)
+    original_stdout = sys.stdout
+    router = ThreadOutputRouter(original_stdout)
+    cleaner = BackgroundCleanup(router)
+    # Limits the number of extensions in the pipeline (and the number of cloned repositories on disk)
+    pipeline_slots = threading.BoundedSemaphore(jobs + prefetch)
+    stop_requested = threading.Event()
+    check_futures = queue.Queue()
+
+    def prepare(file_path):
+        with router.capture() as buffer:
+            extension_check = ExtensionCheckRun(file_path, extension_descriptions_folder, settings)
+            try:
+                extension_check.prepare()
+                return extension_check, buffer.getvalue(), None
+            except Exception as exc:
+                return extension_check, buffer.getvalue(), exc
+
+    def check(prepare_future):
+        extension_check, output, exc = prepare_future.result()
+        try:
+            if exc is None and not stop_requested.is_set():
+                with router.capture() as buffer:
+                    try:
+                        extension_check.run_checks()
+                    except Exception as check_exc:
+                        exc = check_exc
+                output += buffer.getvalue()
+        finally:
+            cleaner.submit(extension_check)
+            pipeline_slots.release()
+        return extension_check.result, output, exc
+
+    prepare_executor = concurrent.futures.ThreadPoolExecutor(max_workers=jobs + prefetch, thread_name_prefix="prepare")
+    check_executor = concurrent.futures.ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="check")
+
+    def feed():
+        for file_path in file_paths:
+            pipeline_slots.acquire()
+            if stop_requested.is_set():
+                pipeline_slots.release()
+                break
+            prepare_future = prepare_executor.submit(prepare, file_path)
+            check_futures.put(check_executor.submit(check, prepare_future))
+        check_futures.put(None)
+
+    results = []
+    sys.stdout = router
+    feeder = threading.Thread(target=feed, name="PipelineFeeder", daemon=True)
+    feeder.start()
+    try:
+        for file_path in file_paths:
+            check_future = check_futures.get()
+            if check_future is None:
+                break
+            extension_result, output, exc = check_future.result()
+            original_stdout.write(output)
+            original_stdout.flush()
+            if exc is not None:
+                # Unexpected error, stop processing like a sequential run would
+                raise exc
+            results.append(extension_result)
+    finally:
+        stop_requested.set()
+        feeder.join()
+        # Let the remaining (already started) stages finish, so that their cloned repositories are removed
+        while True:
+            check_future = check_futures.get()
+            if check_future is None:
+                break
+            check_future.result()
+        check_executor.shutdown()
+        prepare_executor.shutdown()
+        sys.stdout = original_stdout
+        original_stdout.write(cleaner.close())
+
+    return results
+
+
+def check_extension_metadata_files(file_paths, extension_descriptions_folder, settings=None):
+    """Run the checks that need neither a clone of the extension repository nor network access.
+
+    Each description file is read only once, the same content is used for parsing and for all the checks.
+    If the catalog index of ``settings`` is available then the metadata and file content are taken from there.
+    Only failed and skipped checks are reported, to keep the output short when the whole index is checked.
+    :param file_paths: Paths of extension description files (.json), relative to the extension descriptions folder.
+    :return: List of :class:`check_results.ExtensionResult`, in the order of ``file_paths``.
+    """
+    settings = settings or CheckSettings(schema_store=SchemaStore(offline=True))
+    catalog_index = settings.catalog_index
+    extension_results = []
+    for file_path in file_paths:
+        extension_name = os.path.splitext(os.path.basename(file_path))[0]
+        extension_result = ExtensionResult(extension_name, file_path)
+        extension_results.append(extension_result)
+        full_path = os.path.join(extension_descriptions_folder, file_path)
+        try:
+            if catalog_index is not None and os.path.dirname(file_path) in ('', '.'):
+                extension_file_content = catalog_index.read_file(extension_name)
+                metadata = catalog_index.get_metadata(extension_name)
+            else:
+                with open(full_path, 'rb') as f:
+                    extension_file_content = f.read()
+                metadata = parse_json(full_path, extension_file_content)
         except ExtensionParseError as exc:
-            print(exc)
+            print(f"- :x: `{extension_name}`: Failed to parse extension description file: {exc}")
+            extension_result.add(CheckResult("parse_json", "Parse extension description file", STATUS_FAILED, str(exc)))
             continue
-        category = extension_description.get("category", "")
-        if not category:
+
+        extension_metadata_checks = [
+            ("Check JSON schema", check_json_schema, {"settings": settings}),
+            ("Check JSON file format", check_json_file_format, {"extension_file_path": full_path, "extension_file_content": extension_file_content}),
+            ("Check extension name", check_extension_name, {}),
+            ("Check category", check_category, {}),
+            ("Check git repository name", check_git_repository_name, {}),
+            ("Check SCM URL syntax", check_scm_url_syntax, {}),
+            ]
+        for check_description, check, check_kwargs in extension_metadata_checks:
+            start_time = time.perf_counter()
+            try:
+                report = check(extension_name, metadata, **check_kwargs)
+                check_result = CheckResult.passed(check.__name__, check_description, report)
+            except ExtensionCheckError as exc:
+                print(f"- :x: `{extension_name}`: {check_description} failed: {exc}")
+                check_result = CheckResult(check.__name__, check_description, STATUS_FAILED, str(exc))
+            except ExtensionCheckSkipped as exc:
+                print(f"- :warning: `{extension_name}`: {check_description} skipped, {exc}")
+                check_result = CheckResult(
+                    check.__name__, check_description, STATUS_SKIPPED, str(exc), output=exc.output)
+            check_result.duration = time.perf_counter() - start_time
+            extension_result.add(check_result)
+
+    return extension_results
+
+
+def add_dependent_extension_file_paths(file_paths, catalog_index):
+    """Add description files of all extensions that directly or indirectly depend on the specified extensions.
+    Changes in an extension may break extensions that depend on it, therefore they need to be checked, too.
+    :return: List of file paths.
+    """
+    graph = DependencyGraph.from_metadata(catalog_index.metadata)
+    extension_names = [os.path.splitext(os.path.basename(file_path))[0] for file_path in file_paths]
+    dependent_extension_names = [extension_name for extension_name in graph.transitive_dependents(extension_names)
+                                 if extension_name not in extension_names]
+    if dependent_extension_names:
+        print(f"Dependent extensions are checked, too: {', '.join(dependent_extension_names)}\n")
+    return file_paths + [f"{extension_name}.json" for extension_name in dependent_extension_names]
+
+
+def prefetch_github_metadata(github_metadata, file_paths, catalog_index):
+    """Retrieve metadata of the GitHub repositories of all the extensions in a few batched requests.
+
+    Errors are ignored here, they are reported by the checks that need the metadata.
+    """
+    scm_urls = []
+    for file_path in file_paths:
+        try:
+            scm_url = catalog_index.get_metadata(os.path.splitext(file_path)[0])["scm_url"]
+        except (ExtensionParseError, KeyError):
             continue
-        if extensions_for_categories.get(category) is None:
-            extensions_for_categories[category] = []
-        extensions_for_categories[category].append(extension_name)
-    print(f"[\n{'\n'.join(f'    "{category}",' for category in sorted(extensions_for_categories.keys()))}\n]")
+        if isinstance(scm_url, str):
+            scm_urls.append(scm_url)
+    try:
+        github_metadata.prefetch(scm_urls)
+    except GitHubMetadataError as exc:
+        print(f"Warning: Failed to get GitHub repository metadata: {exc}", file=sys.stderr)
+
+
+def prefetch_commit_shas(ref_resolver, file_paths, catalog_index):
+    """Resolve ``scm_revision`` of all the extensions to commit SHAs, in parallel."""
+    url_revisions = []
+    for file_path in file_paths:
+        try:
+            metadata = catalog_index.get_metadata(os.path.splitext(file_path)[0])
+        except (ExtensionParseError, KeyError):
+            continue
+        if isinstance(metadata.get("scm_url"), str) and isinstance(metadata.get("scm_revision", ""), str):
+            url_revisions.append((metadata["scm_url"], metadata.get("scm_revision") or ""))
+    ref_resolver.prefetch(url_revisions)
+
+
+def run_dependency_check(extension_descriptions_folder, catalog_index):
+    """Check dependencies between all extensions of the catalog and print the report.
+    :return: :class:`check_results.CheckResult`
+    """
+    print("## Extension dependencies")
+    start_time = time.perf_counter()
+    try:
+        check_dependencies(extension_descriptions_folder, catalog_index)
+        print(":white_check_mark: Dependency check completed successfully")
+        check_result = CheckResult("check_dependencies", "Dependency check", STATUS_PASSED)
+    except ExtensionDependencyError as exc:
+        print(f":x: Dependency check failed: {exc}")
+        check_result = CheckResult("check_dependencies", "Dependency check", STATUS_FAILED, str(exc))
+    check_result.duration = time.perf_counter() - start_time
+    return check_result
+
+
+def write_result_files(extension_results, run_checks, json_lines_path=None, junit_xml_path=None):
+    """Write check results in the requested machine-readable formats."""
+    if json_lines_path:
+        write_json_lines(extension_results, json_lines_path, run_checks)
+    if junit_xml_path:
+        write_junit_xml(extension_results, junit_xml_path, run_checks)
+
+
+def list_extension_description_files(extension_descriptions_folder):
+    """Get names of all extension description files (.json) in the folder, using a single directory scan."""
+    with os.scandir(extension_descriptions_folder) as entries:
+        return sorted(entry.name for entry in entries if entry.name.endswith(".json") and entry.is_file())
 
 
 def main():
@@ -577,20 +1848,84 @@ def main():
     parser.add_argument("extension_description_files", nargs='*', help="Extension JSON files to validate")
     parser.add_argument("--print-categories", action='store_true',
                         help="Print categories of extensions in the specified folder and quit.")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of extensions to check in parallel (default: 1). The report is printed in input order.")
+    parser.add_argument("--prefetch", type=int, default=2,
+                        help="Number of extensions whose repository is cloned ahead of the checks (default: 2).")
+    parser.add_argument("--repository-cache-dir",
+                        help="Folder for keeping mirrors of extension repositories between runs. "
+                        "If not specified then repositories are cloned from scratch.")
+    parser.add_argument("--repository-cache-size-mb", type=int, default=DEFAULT_CACHE_SIZE_MB,
+                        help=f"Disk budget of the repository cache in MB (default: {DEFAULT_CACHE_SIZE_MB}). "
+                        "Least recently used mirrors are removed when it is exceeded.")
+    parser.add_argument("--clone-filter",
+                        help="Partial clone filter used when cloning repositories, such as 'blob:none' or 'blob:limit=1m'.")
+    parser.add_argument("--sparse-checkout", action='store_true',
+                        help="Only check out the repository files that are read by the checks.")
+    parser.add_argument("--url-cache-ttl", type=float, default=ImageUrlValidator.DEFAULT_CACHE_TTL / 3600,
+                        help="Time (in hours) after which cached image URL check results are checked again. "
+                        "URLs that refer to a specific commit are never checked again. Requires --cache-dir.")
+    parser.add_argument("--cache-dir",
+                        help="Folder for caching data (such as downloaded JSON schemas, parsed description files, "
+                        "and results of extensions that passed all checks) between runs.")
+    parser.add_argument("--recheck", action='store_true',
+                        help="Check all extensions and clone their repositories, even if they were already checked "
+                        "with the same description file or repository commit in an earlier run.")
+    parser.add_argument("--offline", "--metadata-only", dest="metadata_only", action='store_true',
+                        help="Only run checks that require neither cloning the repository nor network access. "
+                        "If no files are specified then all extension description files in the folder are checked.")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="Write duration and counters (HTTP requests, downloaded bytes, cache hits) of each check "
+                        "of each extension to this file, in JSON format or CSV format if the file name ends with .csv.")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Write duration of each check in Chrome trace event format to this file. "
+                        "It can be viewed in chrome://tracing or https://ui.perfetto.dev.")
+    parser.add_argument("--results-jsonl", metavar="FILE",
+                        help="Write the result of each check to this file in JSON Lines format (one JSON object per check).")
+    parser.add_argument("--junit-xml", metavar="FILE",
+                        help="Write check results to this file in JUnit XML format (one test case per check).")
+    parser.add_argument("--include-dependents", action='store_true',
+                        help="Also check all extensions that directly or indirectly depend on the specified extensions.")
     args = parser.parse_args()
 
     extension_descriptions_folder = "."
 
+    # Parse all extension description files once, for all checks and reports
+    catalog_index = CatalogIndex(extension_descriptions_folder, cache_dir=args.cache_dir,
+                                 keep_file_contents=not args.print_categories)
+
     if args.print_categories:
-        print_categories(extension_descriptions_folder)
+        print_categories(extension_descriptions_folder, catalog_index)
         return 0
 
+    if args.metadata_only:
+        file_paths = args.extension_description_files or list_extension_description_files(extension_descriptions_folder)
+        extension_file_paths = [file_path for file_path in file_paths
+                                if os.path.splitext(file_path)[1] == '.json' and os.path.dirname(file_path) in ('', '.')
+                                and os.path.isfile(os.path.join(extension_descriptions_folder, file_path))]
+        print("# Check extension description files (metadata only)\n")
+        if args.include_dependents:
+            extension_file_paths = add_dependent_extension_file_paths(extension_file_paths, catalog_index)
+        settings = CheckSettings(schema_store=SchemaStore(cache_dir=args.cache_dir, offline=True), catalog_index=catalog_index)
+        extension_results = check_extension_metadata_files(extension_file_paths, extension_descriptions_folder, settings)
+        failed_extensions = [extension_result.extension_name for extension_result in extension_results
+                             if not extension_result.success]
+        success = not failed_extensions
+        print(f"\nChecked {len(extension_file_paths)} extension description files.")
+        if failed_extensions:
+            print(f"- :x: Checks failed for {len(failed_extensions)} extensions: {', '.join(failed_extensions)}")
+        else:
+            print(":white_check_mark: All checks completed successfully")
+        dependency_check_result = run_dependency_check(extension_descriptions_folder, catalog_index)
+        success = success and dependency_check_result.success
+        write_result_files(extension_results, [dependency_check_result], args.results_jsonl, args.junit_xml)
+        return 0 if success else 1
+
     print("# Check extension description files\n")
 
     success = True
 
-    failed_extensions = set()
-    found_extensions = []
+    extension_file_paths = []
     for file_path in args.extension_description_files:
 
         # Get extension name and desctiption file path
@@ -605,69 +1940,82 @@ def main():
         if not os.path.isfile(full_path):
             # file does not exist, ignore it
             continue
-        extension_name = os.path.splitext(os.path.basename(file_path))[0]
+        extension_file_paths.append(file_path)
+
+    if args.include_dependents:
+        extension_file_paths = add_dependent_extension_file_paths(extension_file_paths, catalog_index)
+
+    repository_cache = None
+    if args.repository_cache_dir:
+        repository_cache = RepositoryCache(args.repository_cache_dir, args.repository_cache_size_mb)
+    profiler = RunProfiler()
+    ref_resolver = GitRefResolver(max_workers=max(args.jobs, 8))
+    result_store = None
+    repository_check_cache = None
+    if args.cache_dir and not args.recheck:
+        result_store = ValidationResultStore(args.cache_dir)
+        repository_check_cache = RepositoryCheckCache(args.cache_dir)
+        # Checked commits of all extensions are resolved at once. They are only needed for reusing results.
+        with profiler.span("prefetch_commit_shas", category="prefetch"):
+            prefetch_commit_shas(ref_resolver, extension_file_paths, catalog_index)
+
+    image_url_validator = None
+    github_metadata = None
+    if requests:
+        image_url_validator = ImageUrlValidator(cache_dir=args.cache_dir, cache_ttl=args.url_cache_ttl * 3600)
+        github_metadata = GitHubMetadataFetcher(cache_dir=args.cache_dir)
+        with profiler.span("prefetch_github_metadata", category="prefetch"):
+            prefetch_github_metadata(github_metadata, extension_file_paths, catalog_index)
+    settings = CheckSettings(
+        repository_cache=repository_cache, clone_filter=args.clone_filter, sparse_checkout=args.sparse_checkout,
+        schema_store=SchemaStore(cache_dir=args.cache_dir), catalog_index=catalog_index,
+        image_url_validator=image_url_validator, github_metadata=github_metadata, result_store=result_store,
+        ref_resolver=ref_resolver, repository_check_cache=repository_check_cache, profiler=profiler)
+
+    failed_extensions = []
+    found_extensions = []
+    extension_results = check_extension_description_files(
+        extension_file_paths, extension_descriptions_folder, jobs=args.jobs, settings=settings, prefetch=max(args.prefetch, 0))
+    for extension_result in extension_results:
+        extension_name = extension_result.extension_name
         found_extensions.append(extension_name)
-
-        print(f"## Extension: {extension_name}")
-
-        # Log the description file content for convenience
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            description_file_content = f.read()
-        print(f"Extension description file content:\n```\n{description_file_content}\n```\n")
-
-        try:
-            metadata = parse_json(file_path)
-        except ExtensionParseError as exc:
-            print(f"- :x: Failed to parse extension description file: {exc}")
+        if not extension_result.success:
             success = False
-            failed_extensions.add(extension_name)
-            continue
-
-        cloned_repository_folder = tempfile.mkdtemp(prefix=f"extension_check_{extension_name}_")
-
-        extension_description_checks = [
-            ("Clone repository", check_clone_repository, {"cloned_repository_folder": cloned_repository_folder}),
-            ("Check repository size", check_repository_size, {"cloned_repository_folder": cloned_repository_folder}),
-            ("Check JSON schema", check_json_schema, {}),
-            ("Check JSON file format", check_json_file_format, {"extension_file_path": file_path}),
-            ("Check extension name", check_extension_name, {}),
-            ("Check category", check_category, {}),
-            ("Check git repository name", check_git_repository_name, {}),
-            ("Check git repository topics", check_git_repository_topics, {}),
-            ("Check SCM URL syntax", check_scm_url_syntax, {}),
-            ("Check CMakeLists.txt content", check_cmakelists_content, {"cloned_repository_folder": cloned_repository_folder}),
-            ("Check license file", check_license_file, {"cloned_repository_folder": cloned_repository_folder}),
-            ]
-        for check_description, check, check_kwargs in extension_description_checks:
-            try:
-                details = check(extension_name, metadata, **check_kwargs)
-                print(f"- :white_check_mark: {check_description} completed successfully")
-                if details:
-                    print(details)
-            except ExtensionCheckError as exc:
-                print(f"- :x: {check_description} failed: {exc}")
-                failed_extensions.add(extension_name)
-                success = False
-
-        # Clean up temporary directory
-        if cloned_repository_folder:
-            success_cleanup = safe_cleanup_directory(cloned_repository_folder)
-            if not success_cleanup:
-                print(f"Note: Temporary directory may still exist: {cloned_repository_folder}")
+            if extension_name not in failed_extensions:
+                failed_extensions.append(extension_name)
 
     if len(found_extensions) > 1:
         print("## Extensions test summary")
         print(f"Checked {len(found_extensions)} extension description files.")
         if failed_extensions:
             print(f"- :x: Checks failed for {len(failed_extensions)} extensions: {', '.join(failed_extensions)}")
-
-    try:
-        print("## Extension dependencies")
-        check_dependencies(extension_descriptions_folder)
-        print(":white_check_mark: Dependency check completed successfully")
-    except ExtensionDependencyError as exc:
-        print(f":x: Dependency check failed: {exc}")
-        success = False
+        if result_store:
+            print(f"- Results of {result_store.reused_count} unchanged extensions are reused from earlier runs.")
+        if repository_check_cache:
+            print(f"- Results of {repository_check_cache.reused_count} repository checks are reused from earlier runs.")
+        if image_url_validator and args.cache_dir:
+            print(f"- Image URL check cache: {image_url_validator.cache_statistics()}")
+
+    if result_store:
+        result_store.save()
+    if repository_check_cache:
+        repository_check_cache.save()
+    if image_url_validator:
+        image_url_validator.save_cache()
+    if github_metadata:
+        github_metadata.save_cache()
+
+    if repository_cache:
+        repository_cache.evict()
+
+    if args.profile:
+        profiler.write_profile(args.profile)
+    if args.trace:
+        profiler.write_chrome_trace(args.trace)
+
+    dependency_check_result = run_dependency_check(extension_descriptions_folder, catalog_index)
+    success = success and dependency_check_result.success
+    write_result_files(extension_results, [dependency_check_result], args.results_jsonl, args.junit_xml)
 
     return 0 if success else 1
 
@@ -864,5 +2212,4 @@ ACCEPTED_EXTENSION_CATEGORIES = [
 ]
 
 if __name__ == "__main__":
-    import sys
     sys.exit(main())
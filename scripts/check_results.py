@@ -0,0 +1,187 @@
+"""
+Results of extension description file checks, and renderers for Markdown, JSON Lines and JUnit XML.
+
+All checks of a validation run feed :class:`CheckResult` objects into an :class:`ExtensionResult` for each
+extension. Checks of the whole catalog (such as the dependency check) are :class:`CheckResult` objects
+without an extension. The Markdown report (that is posted as a pull request comment) is rendered
+from the same results as the machine-readable outputs:
+
+- JSON Lines: one JSON object per check, with ``extension``, ``check``, ``description``, ``status``,
+  ``message``, ``output``, ``details``, ``duration`` and ``reused`` keys. Convenient for aggregating and diffing runs.
+- JUnit XML: one test suite per extension, one test case per check. Can be displayed by CI systems.
+"""
+
+import json
+import xml.etree.ElementTree as ET
+
+STATUS_PASSED = "passed"
+STATUS_FAILED = "failed"
+STATUS_SKIPPED = "skipped"
+
+
+class CheckReport:
+    """Information that a passed check returns for the report (Markdown).
+
+    :param output: Reported before the result line of the check, such as the list of validated URLs.
+    :param details: Reported after the result line of the check, such as the content of a file.
+    """
+
+    def __init__(self, output=None, details=None):
+        self.output = output
+        self.details = details
+
+
+class CheckResult:
+    """Result of a single check.
+
+    :param name: Name of the check, such as ``check_json_schema``.
+    :param description: Human-readable name of the check, such as ``Check JSON schema``.
+    :param status: :data:`STATUS_PASSED`, :data:`STATUS_FAILED` or :data:`STATUS_SKIPPED`.
+    :param message: Error message of failed checks, reason of skipped checks.
+    :param details: Additional information reported by the check after its result line (Markdown).
+    :param duration: Time (in seconds) that the check took.
+    :param reused: True if the result is reused from an earlier run.
+    :param output: Information reported by the check before its result line (Markdown).
+    """
+
+    def __init__(self, name, description, status, message=None, details=None, duration=None, reused=False,
+                 output=None):
+        self.name = name
+        self.description = description
+        self.status = status
+        self.message = message
+        self.details = details
+        self.duration = duration
+        self.reused = reused
+        self.output = output
+
+    @classmethod
+    def passed(cls, name, description, report=None):
+        """Get the result of a passed check from the value that the check returned:
+        details text, or a :class:`CheckReport`.
+        """
+        if isinstance(report, CheckReport):
+            return cls(name, description, STATUS_PASSED, details=report.details or None, output=report.output or None)
+        return cls(name, description, STATUS_PASSED, details=report or None)
+
+    @property
+    def success(self):
+        return self.status != STATUS_FAILED
+
+    def to_dict(self):
+        return {
+            "check": self.name,
+            "description": self.description,
+            "status": self.status,
+            "message": self.message,
+            "output": self.output,
+            "details": self.details,
+            "duration": round(self.duration, 6) if self.duration is not None else None,
+            "reused": self.reused,
+            }
+
+    @classmethod
+    def from_dict(cls, result, reused=False):
+        return cls(result["check"], result["description"], result["status"], result.get("message"),
+                   result.get("details"), result.get("duration"), reused=reused or result.get("reused", False),
+                   output=result.get("output"))
+
+
+class ExtensionResult:
+    """Results of all checks of an extension description file.
+
+    :param extension_name: Name of the extension.
+    :param file_path: Path of the extension description file.
+    """
+
+    def __init__(self, extension_name, file_path=None):
+        self.extension_name = extension_name
+        self.file_path = file_path
+        self.commit_sha = None
+        self.reused = False  # all results are reused from an earlier run
+        self.checks = []
+
+    @property
+    def success(self):
+        return all(check.success for check in self.checks)
+
+    @property
+    def duration(self):
+        return sum(check.duration or 0.0 for check in self.checks)
+
+    def add(self, check_result):
+        self.checks.append(check_result)
+        return check_result
+
+
+def render_markdown_check(check_result):
+    """Get the report line(s) of a check, as printed in the Markdown report.
+
+    Checks skipped with an output that explains the skip are reported as completed, the skipped status
+    is only recorded in the JSON Lines and JUnit XML outputs.
+    """
+    report = check_result.output or ""
+    if check_result.status == STATUS_FAILED:
+        return report + f"- :x: {check_result.description} failed: {check_result.message}\n"
+    if check_result.status == STATUS_SKIPPED and not check_result.output:
+        return report + f"- :warning: {check_result.description} skipped, {check_result.message}\n"
+    report += f"- :white_check_mark: {check_result.description} completed successfully\n"
+    if check_result.details:
+        report += f"{check_result.details}\n"
+    return report
+
+
+def write_json_lines(extension_results, file_path, run_checks=()):
+    """Write one JSON object per check to a file.
+    :param run_checks: Results of checks that are not specific to an extension (``extension`` is null).
+    """
+    with open(file_path, "w", encoding="utf-8") as results_file:
+        for extension_result in extension_results:
+            for check_result in extension_result.checks:
+                record = {"extension": extension_result.extension_name, "commit_sha": extension_result.commit_sha}
+                record.update(check_result.to_dict())
+                results_file.write(json.dumps(record) + "\n")
+        for check_result in run_checks:
+            record = {"extension": None, "commit_sha": None}
+            record.update(check_result.to_dict())
+            results_file.write(json.dumps(record) + "\n")
+
+
+def _junit_test_suite(parent, name, check_results):
+    test_suite = ET.SubElement(parent, "testsuite", {
+        "name": name,
+        "tests": str(len(check_results)),
+        "failures": str(sum(1 for check_result in check_results if check_result.status == STATUS_FAILED)),
+        "skipped": str(sum(1 for check_result in check_results if check_result.status == STATUS_SKIPPED)),
+        "time": f"{sum(check_result.duration or 0.0 for check_result in check_results):.3f}",
+        })
+    for check_result in check_results:
+        test_case = ET.SubElement(test_suite, "testcase", {
+            "classname": name,
+            "name": check_result.description,
+            "time": f"{check_result.duration or 0.0:.3f}",
+            })
+        if check_result.status == STATUS_FAILED:
+            ET.SubElement(test_case, "failure", {"message": check_result.message or ""}).text = check_result.message
+        elif check_result.status == STATUS_SKIPPED:
+            ET.SubElement(test_case, "skipped", {"message": check_result.message or ""})
+        if check_result.output or check_result.details:
+            ET.SubElement(test_case, "system-out").text = (check_result.output or "") + (check_result.details or "")
+    return test_suite
+
+
+def write_junit_xml(extension_results, file_path, run_checks=(), run_name="Extension catalog"):
+    """Write results in JUnit XML format: a test suite for each extension, a test case for each check.
+    :param run_checks: Results of checks that are not specific to an extension, written to the ``run_name`` suite.
+    """
+    test_suites = ET.Element("testsuites", {"name": "Extension description file checks"})
+    for extension_result in extension_results:
+        _junit_test_suite(test_suites, extension_result.extension_name, extension_result.checks)
+    if run_checks:
+        _junit_test_suite(test_suites, run_name, list(run_checks))
+    all_suites = test_suites.findall("testsuite")
+    for attribute in ("tests", "failures", "skipped"):
+        test_suites.set(attribute, str(sum(int(test_suite.get(attribute)) for test_suite in all_suites)))
+    tree = ET.ElementTree(test_suites)
+    ET.indent(tree)
+    tree.write(file_path, encoding="utf-8", xml_declaration=True)
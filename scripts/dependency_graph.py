@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+
+"""
+Build dependency graph of Slicer extensions.
+
+The graph is built from the ``build_dependencies`` field of extension description files. It can report
+circular dependencies, compute the order in which extensions can be built (grouped into waves of extensions
+that can be built in parallel), and find all extensions that are affected by a change of an extension.
+
+Examples::
+
+    # Print extensions in build waves
+    python scripts/dependency_graph.py --build-waves
+
+    # Print all extensions that directly or indirectly depend on PyTorch or NNUNet
+    python scripts/dependency_graph.py --dependents PyTorch.json NNUNet
+"""
+
+import argparse
+import json
+import os
+import sys
+
+
+class DependencyCycleError(RuntimeError):
+    """Exception raised when extensions depend on each other, directly or indirectly.
+    """
+    def __init__(self, cycles):
+        self.cycles = cycles
+
+    def __str__(self):
+        return "\n".join(format_cycle(cycle) for cycle in self.cycles)
+
+
+def format_cycle(cycle):
+    return f"Circular build dependency between extensions: {', '.join(cycle)}"
+
+
+class DependencyGraph:
+    """Directed graph of extension build dependencies, stored as adjacency lists.
+
+    Nodes are extension names. An edge points from an extension to each extension listed in its
+    ``build_dependencies``. Dependencies that are not extensions of the graph are kept separately
+    (see :meth:`missing_dependencies`) and are ignored for ordering.
+    """
+
+    def __init__(self):
+        self.dependencies = {}  # extension name -> list of extensions it requires
+        self.dependents = {}  # extension name -> list of extensions that require it
+
+    @classmethod
+    def from_metadata(cls, metadata_by_extension_name):
+        """Create graph from a dictionary of extension name -> extension metadata."""
+        graph = cls()
+        for extension_name in sorted(metadata_by_extension_name):
+            metadata = metadata_by_extension_name[extension_name]
+            graph.add_extension(extension_name, metadata.get("build_dependencies") or [])
+        return graph
+
+    @classmethod
+    def from_folder(cls, extension_descriptions_folder):
+        """Create graph from all extension description files (.json) in a folder.
+        Files that cannot be parsed are ignored.
+        """
+        metadata_by_extension_name = {}
+        with os.scandir(extension_descriptions_folder) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".json") or not entry.is_file():
+                    continue
+                try:
+                    with open(entry.path, encoding="utf-8") as input_file:
+                        metadata_by_extension_name[os.path.splitext(entry.name)[0]] = json.load(input_file)
+                except (OSError, json.JSONDecodeError) as exc:
+                    print(f"Failed to parse '{entry.path}': {exc}", file=sys.stderr)
+        return cls.from_metadata(metadata_by_extension_name)
+
+    def add_extension(self, extension_name, dependencies):
+        self.dependencies.setdefault(extension_name, [])
+        self.dependents.setdefault(extension_name, [])
+        for dependency in dependencies:
+            if not dependency or dependency in self.dependencies[extension_name]:
+                continue
+            self.dependencies[extension_name].append(dependency)
+            self.dependents.setdefault(dependency, []).append(extension_name)
+
+    def extension_names(self):
+        return sorted(self.dependencies)
+
+    def missing_dependencies(self):
+        """Get dictionary of required extension name -> list of extensions that require it,
+        for required extensions that are not in the graph.
+        """
+        return {
+            dependency: required_by
+            for dependency, required_by in self.dependents.items()
+            if dependency not in self.dependencies
+            }
+
+    def _known_dependencies(self, extension_name):
+        return [dependency for dependency in self.dependencies[extension_name] if dependency in self.dependencies]
+
+    def strongly_connected_components(self):
+        """Get strongly connected components of the graph using Tarjan's algorithm.
+
+        The algorithm is implemented iteratively, so that long dependency chains do not hit the recursion limit.
+        :return: List of components (each is a list of extension names). A component always appears after
+          all components that it depends on.
+        """
+        index_counter = 0
+        indices = {}
+        lowlinks = {}
+        stack = []
+        on_stack = set()
+        components = []
+
+        for root in self.extension_names():
+            if root in indices:
+                continue
+            # Each work item is (node, iterator over its dependencies)
+            indices[root] = lowlinks[root] = index_counter
+            index_counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(self._known_dependencies(root)))]
+            while work:
+                node, dependencies = work[-1]
+                for dependency in dependencies:
+                    if dependency not in indices:
+                        indices[dependency] = lowlinks[dependency] = index_counter
+                        index_counter += 1
+                        stack.append(dependency)
+                        on_stack.add(dependency)
+                        work.append((dependency, iter(self._known_dependencies(dependency))))
+                        break
+                    if dependency in on_stack:
+                        lowlinks[node] = min(lowlinks[node], indices[dependency])
+                else:
+                    # All dependencies of the node are processed
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlinks[parent] = min(lowlinks[parent], lowlinks[node])
+                    if lowlinks[node] == indices[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.remove(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        components.append(sorted(component))
+        return components
+
+    def cycles(self):
+        """Get list of circular dependencies. Each cycle is a list of extension names."""
+        return [
+            component for component in self.strongly_connected_components()
+            if len(component) > 1 or component[0] in self.dependencies[component[0]]
+            ]
+
+    def build_waves(self):
+        """Get extensions grouped into build waves.
+
+        Each extension is placed in the first wave after all of its dependencies, therefore extensions
+        within the same wave do not depend on each other and can be built in parallel.
+        :return: List of waves, each wave is a sorted list of extension names.
+        :raises DependencyCycleError: if there are circular dependencies.
+        """
+        cycles = self.cycles()
+        if cycles:
+            raise DependencyCycleError(cycles)
+        wave_index = {}
+        # Components are ordered so that dependencies always come first
+        for [extension_name] in self.strongly_connected_components():
+            wave_index[extension_name] = max(
+                (wave_index[dependency] + 1 for dependency in self._known_dependencies(extension_name)), default=0)
+        waves = [[] for _ in range(max(wave_index.values(), default=-1) + 1)]
+        for extension_name in sorted(wave_index):
+            waves[wave_index[extension_name]].append(extension_name)
+        return waves
+
+    def transitive_dependents(self, extension_names):
+        """Get all extensions that directly or indirectly depend on any of the specified extensions.
+        :return: Sorted list of extension names, not including the specified extensions
+          (unless they depend on each other).
+        """
+        found = set()
+        to_visit = list(extension_names)
+        while to_visit:
+            extension_name = to_visit.pop()
+            for dependent in self.dependents.get(extension_name, []):
+                if dependent not in found:
+                    found.add(dependent)
+                    to_visit.append(dependent)
+        return sorted(found)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Analyze build dependencies of extensions.')
+    parser.add_argument("--build-waves", action='store_true',
+                        help="Print extensions grouped into waves that can be built in parallel.")
+    parser.add_argument("--dependents", nargs='+', metavar="EXTENSION",
+                        help="Print all extensions that directly or indirectly depend on the specified extensions "
+                        "(extension names or description file names).")
+    parser.add_argument("--json", action='store_true', help="Print results in JSON format.")
+    args = parser.parse_args()
+
+    extension_descriptions_folder = "."
+    graph = DependencyGraph.from_folder(extension_descriptions_folder)
+
+    results = {}
+    success = True
+
+    cycles = graph.cycles()
+    if cycles:
+        results["cycles"] = cycles
+        success = False
+
+    if args.build_waves and not cycles:
+        results["build_waves"] = graph.build_waves()
+
+    if args.dependents:
+        changed_extensions = [os.path.splitext(os.path.basename(name))[0] for name in args.dependents]
+        results["dependents"] = graph.transitive_dependents(changed_extensions)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for cycle in results.get("cycles", []):
+            print(f":x: {format_cycle(cycle)}")
+        for wave_index, wave in enumerate(results.get("build_waves", [])):
+            print(f"Wave {wave_index + 1}: {', '.join(wave)}")
+        if "dependents" in results:
+            print("\n".join(results["dependents"]))
+
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
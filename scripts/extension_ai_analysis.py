@@ -5,16 +5,19 @@ Python 3.x CLI for AI analysis of Slicer extensions.
 """
 
 import argparse
+import concurrent.futures
 import json
 import os
-import requests
 import stat
+import sys
 import tempfile
 import textwrap
 import time
-import subprocess
 import shutil
 
+from analysis_context import VENDORED_FOLDER_PATTERNS, AnalyzedFile, pack_files, select_files
+from inference_client import CHARACTERS_PER_TOKEN, AnswerCache, InferenceClient, estimate_tokens
+from repository_cache import DEFAULT_CACHE_SIZE_MB, RepositoryCache, clone_revision
 
 # Get inference server configuration from environment variables
 INFERENCE_URL = os.getenv("INFERENCE_URL")
@@ -27,8 +30,14 @@ INFERENCE_API_KEY = os.getenv("INFERENCE_API_KEY")
 if not INFERENCE_API_KEY:
     raise ValueError("INFERENCE_API_KEY environment variable is not set. Please set it before running the script.")
 
-INFERENCE_RESPONSE_PER_MINUTE_LIMIT = 10 #  slow down to not exceed token per minute (tpm) limit
+INFERENCE_RESPONSE_PER_MINUTE_LIMIT = int(os.getenv("INFERENCE_RESPONSE_PER_MINUTE_LIMIT", "10"))
+INFERENCE_TOKENS_PER_MINUTE_LIMIT = int(os.getenv("INFERENCE_TOKENS_PER_MINUTE_LIMIT", "0"))  # 0 means not limited
+INFERENCE_MAX_CONCURRENT_REQUESTS = 4
 INFERENCE_MAX_CHARACTERS = 400000  # max characters in all files provided to the model, approximately 100k tokens
+INFERENCE_MAX_CONTEXT_TOKENS = estimate_tokens("x" * INFERENCE_MAX_CHARACTERS)
+INFERENCE_MAX_FILE_TOKENS = INFERENCE_MAX_CONTEXT_TOKENS // 2  # larger files are not analyzed
+# Larger source files are skipped, larger documentation files are truncated, without reading the whole file
+INFERENCE_MAX_FILE_BYTES = INFERENCE_MAX_FILE_TOKENS * CHARACTERS_PER_TOKEN
 
 QUESTIONS = [
     ["Is there a EXTENSION_DESCRIPTION variable in the CMakeLists.txt file that describes what the extension does in a few sentences that can be understood by a person knowledgeable in medical image computing?", ["cmake"]],
@@ -44,6 +53,9 @@ QUESTIONS = [
     ["Does it store large amount of downloaded content on local disk other than installing Python packages? Does it provide a way for the user to remove that content?", ["source"]],
 ]
 
+# Files read by collect_analyzed_files (gitignore patterns), used for sparse checkout
+ANALYZED_FILE_PATTERNS = ["*.py", "*.md", "/CMakeLists.txt"]
+
 def parse_json(extension_file_path):
     """Parse a Slicer extension description file.
     :param extension_file_path: Path to a Slicer extension description file (.json).
@@ -89,8 +101,12 @@ def safe_cleanup_directory(directory_path, max_attempts=3):
             print(f"Warning: Error cleaning up directory: {directory_path}\n{e}")
 
 
-def clone_repository(metadata, cloned_repository_folder):
-    """Clone a git repository to a temporary directory."""
+def clone_repository(metadata, cloned_repository_folder, repository_cache=None, sparse_checkout=False):
+    """Clone a git repository to a temporary directory.
+    If a ``repository_cache`` is provided then the working copy is created from a local mirror of the repository,
+    otherwise only the requested revision is downloaded.
+    If ``sparse_checkout`` is enabled then only the files used by :func:`collect_analyzed_files` are checked out.
+    """
     scm_url = metadata.get("scm_url")
     scm_revision = metadata.get("scm_revision")
 
@@ -98,27 +114,26 @@ def clone_repository(metadata, cloned_repository_folder):
     if scm_revision:
         print(f"Repository revision: {scm_revision}")
 
-    if scm_revision:
-        subprocess.run(
-            ['git', 'clone', scm_url, cloned_repository_folder],
-            check=True, capture_output=True, text=True, timeout=300)
-        subprocess.run(
-            ['git', 'checkout', scm_revision],
-            cwd=cloned_repository_folder,
-            check=True, capture_output=True, text=True, timeout=300)
+    sparse_paths = ANALYZED_FILE_PATTERNS if sparse_checkout else None
+    if repository_cache:
+        repository_cache.checkout(scm_url, scm_revision, cloned_repository_folder, sparse_paths=sparse_paths)
     else:
-        subprocess.run(
-            ['git', 'clone', '--depth', '1', scm_url, cloned_repository_folder],
-            check=True, capture_output=True, text=True, timeout=600)
+        clone_revision(scm_url, scm_revision, cloned_repository_folder, sparse_paths=sparse_paths)
+
 
+def collect_analyzed_files(folder, max_file_bytes=INFERENCE_MAX_FILE_BYTES, truncated_categories=("doc", "cmake")):
+    """Find files to analyze in a folder, recursively: .py (source), .md (doc), and top-level CMakeLists.txt (cmake).
 
-def collect_analyzed_files(folder):
-    """Load all .py files in a folder, recursively.
-    returns a dict of categories (doc, source, cmake), each containing a dict of filename->content"""
-    found_files = { "doc": {}, "source": {}, "cmake": {} }
+    Files are not read, only their size is checked: files larger than ``max_file_bytes`` are skipped, except
+    in ``truncated_categories``, where only the beginning of the file is analyzed. Vendored folders
+    (such as ``node_modules``) are not searched.
+    :return: Generator of :class:`analysis_context.AnalyzedFile`.
+    """
     for root, dirs, files in os.walk(folder):
-        for filename in files:
+        dirs[:] = sorted(dirname for dirname in dirs if dirname.lower() not in VENDORED_FOLDER_PATTERNS and dirname != ".git")
+        for filename in sorted(files):
             fullpath = os.path.join(root, filename)
+            # get relative path to folder, in linux-style
             relative_path = os.path.relpath(fullpath, start=folder).replace("\\", "/")
             category = None
             if filename.endswith(".py"):
@@ -129,123 +144,249 @@ def collect_analyzed_files(folder):
                 category = "cmake"
             if category is None:
                 continue
-            with open(fullpath, "r", encoding="utf-8") as f:
-                # get relative path to folder, in linux-style
-                found_files[category][relative_path] = f.read()
-    return found_files
-
-def ask_question(system_msg, question):
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {INFERENCE_API_KEY}",
-        "HTTP-Referer": "slicer.org", # Optional. Site URL for rankings on openrouter.ai.
-        "X-Title": "3D Slicer", # Optional. Site title for rankings on openrouter.ai.
-    }
-
-    messages = [
-        {"role": "system", "content": system_msg},
-        {"role": "user", "content": question}
-    ]
-
-    data = {
-        "messages": messages,
-        "model": INFERENCE_MODEL,
-        "max_tokens": None,
-        "temperature": 1,
-        "top_p": 0.9,
-        "stream": False
-    }
-
-    response = requests.post(INFERENCE_URL, headers=headers, json=data)
-
-    # wait according to response per minute limit
-    delay = 60 / INFERENCE_RESPONSE_PER_MINUTE_LIMIT
-    import time
-    time.sleep(delay)
-
-    try:
-        answer = response.json()["choices"][0]["message"]["content"]
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        print(f"Request data: {data}", file=sys.stderr)
-        print(f"Response status code: {response.status_code}", file=sys.stderr)
-        print(f"Response content: {response.text}", file=sys.stderr)
-        raise RuntimeError(f"Error or unexpected response: {response.json()["error"]["message"]}")
+            try:
+                file_stat = os.stat(fullpath)
+            except OSError:
+                continue
+            if not stat.S_ISREG(file_stat.st_mode):
+                continue
+            if file_stat.st_size > max_file_bytes and category not in truncated_categories:
+                print(f"Skipped {relative_path} (larger than {max_file_bytes} bytes)", file=sys.stderr)
+                continue
+            yield AnalyzedFile(fullpath, relative_path, category, file_stat.st_size, max_bytes=max_file_bytes)
 
-    return answer
+ROLE_DESCRIPTION = \
+    "You are a quality control expert that checks community-contributed files that contain code and documentation." \
+    " Do not talk about things in general, only strictly about the content provided."
 
 
-def analyze_extension(extension_name, metadata, cloned_repository_folder):
+def build_file_content_batches(files, categories):
+    """Concatenate files of the categories relevant for a question.
+    The context of each query is limited, therefore if there are too many/too large input files in the relevant categories,
+    then they are split into batches. Files are ranked by relevance and packed into as few batches as possible,
+    vendored, generated and very large files are skipped (see :mod:`analysis_context`).
+    :return: List of :class:`analysis_context.FileBatch`. Empty if there are no relevant files.
+    """
+    ranked_files, skipped_files = select_files(files, categories, max_file_tokens=INFERENCE_MAX_FILE_TOKENS)
+    for relative_path, reason in skipped_files:
+        print(f"Skipped {relative_path} ({reason})", file=sys.stderr)
+    if not ranked_files:
+        return []
+    max_batch_tokens = INFERENCE_MAX_CONTEXT_TOKENS - estimate_tokens(file_content_system_message(""))
+    return pack_files(ranked_files, max_batch_tokens)
+
+
+def file_content_system_message(file_content):
+    system_msg = ROLE_DESCRIPTION
+    system_msg += " Relevant files of the extension repository are provided below."
+    system_msg += " Each file is delimited by lines with '=== FILE: filename ===' and '=== END FILE: filename ==='.\n"
+    system_msg += file_content
+    return system_msg
+
+
+def batch_system_message(file_batch):
+    """Get a function that returns the system message for a batch of files.
+    Files are read only when the request is sent, so that only the batches of in-progress requests are in memory.
+    """
+    return lambda: file_content_system_message(file_batch.read())
 
-    files = collect_analyzed_files(cloned_repository_folder)
 
-    for index, [question, categories] in enumerate(QUESTIONS):
+def answer_question(client, question, file_content_batches):
+    """Ask a question about each batch of files (concurrently), and summarize the answers if there are multiple batches.
+    :return: Answer text.
+    """
+    answer_futures = [client.submit(batch_system_message(file_batch), question) for file_batch in file_content_batches]
+    answers = []
+    for answer_future in answer_futures:
+        try:
+            answers.append(answer_future.result())
+        except Exception as e:
+            answers = [f"Error or unexpected response: {e}"]
+            break
 
-        print("\n------------------------------------------------------")
-        print(f"Question {index+1}: {question}")
-        print("------------------------------------------------------")
+    if len(answers) == 1:
+        return answers[0]
 
-        file_content_batches = [""]
+    # Multiple batches of files were used to answer this question, generate a summary
+    return summarize_answers(client, answers)
 
-        # Add files of the categories relevant for the question
-        # The context of each query is limited, therefore if there are too many/too large input files in the relevant categories,
-        # then we split them into batches, ask the question for each batch, and then generate a summary of the answers.
-        for category in categories:
-            files_in_category = files.get(category, {})
-            for filename in files_in_category:
-                next_file = f"\n=== FILE: {filename} ===\n" + files_in_category[filename] + f"\n=== END FILE: {filename} ===\n"
-                if (not file_content_batches[-1].strip()) or (len(file_content_batches[-1]) + len(next_file) < INFERENCE_MAX_CHARACTERS):
-                    # We can add this file to the current batch
-                    file_content_batches[-1] += next_file
-                else:
-                    # Start a new batch
-                    file_content_batches.append(next_file)
 
-        if not file_content_batches[0].strip():
-            print("No relevant files found for this question.")
-            continue
+def summary_question(answers):
+    question = "The answer to the question is spread over multiple parts. Please summarize the answer in a concise way, combining all relevant information from the different parts. " \
+        "Here are the different parts of the answer:\n\n"
+    for part_index, part in enumerate(answers):
+        question += f"--- PART {part_index+1} ---\n{part}\n"
+    return question
 
-        role_description = \
-            "You are a quality control expert that checks community-contributed files that contain code and documentation." \
-            " Do not talk about things in general, only strictly about the content provided."
 
-        answers = []
+def summarize_answers(client, answers):
+    # Sent from the worker pool of the client, so that the summary counts toward the concurrent request limit
+    try:
+        return client.submit(ROLE_DESCRIPTION, summary_question(answers)).result()
+    except Exception as e:
+        return f"Error or unexpected response: {e}"
 
-        for batch_index, file_content in enumerate(file_content_batches):
 
-            system_msg = role_description
-            system_msg += " Relevant files of the extension repository are provided below."
-            system_msg += " Each file is delimited by lines with '=== FILE: filename ===' and '=== END FILE: filename ==='.\n"
-            system_msg += file_content
+def group_questions(questions):
+    """Group questions that use the same file categories, so that they can be asked together.
+    :return: List of (categories, list of question indices), in the order of first occurrence.
+    """
+    groups = {}
+    for index, (question, categories) in enumerate(questions):
+        groups.setdefault(tuple(categories), []).append(index)
+    return [(list(categories), indices) for categories, indices in groups.items()]
+
+
+def grouped_question(questions_by_id):
+    """Get a prompt that asks multiple questions at once and requests the answers in JSON format."""
+    prompt = "Answer each of the following questions separately, as if it was asked alone." \
+        " Respond with a single JSON object and nothing else, in the format" \
+        ' {"answers": {"<question id>": "<answer>", ...}}, with an answer for each question id.\n\n'
+    for question_id, question in questions_by_id.items():
+        prompt += f'"{question_id}": {question}\n'
+    return prompt
+
+
+def parse_grouped_answers(answer, question_ids):
+    """Get answers of each question from a response to :func:`grouped_question`.
+    :return: Dictionary of question id -> answer text, only for questions that are answered.
+    :raises ValueError: if the response does not contain a JSON object in the expected format.
+    """
+    # The object may be wrapped in a Markdown code block or surrounded by text
+    start = answer.find("{")
+    end = answer.rfind("}")
+    if start < 0 or end < start:
+        raise ValueError("no JSON object found in the response")
+    answers = json.loads(answer[start:end + 1]).get("answers")
+    if not isinstance(answers, dict):
+        raise ValueError("'answers' object is not found in the response")
+    return {question_id: str(answers[question_id]).strip() for question_id in question_ids
+            if isinstance(answers.get(question_id), (str, int, float, bool))}
+
+
+def answer_question_group(client, questions, file_content_batches):
+    """Ask several questions about the same files in one request per batch of files.
+    Questions that are missing from a response, or all questions if the response cannot be parsed,
+    are asked separately for that batch.
+    :return: List of answers, one for each question.
+    """
+    questions_by_id = {f"q{index+1}": question for index, question in enumerate(questions)}
+    system_msgs = [batch_system_message(file_batch) for file_batch in file_content_batches]
+    grouped_answer_futures = [client.submit(system_msg, grouped_question(questions_by_id)) for system_msg in system_msgs]
 
+    # answers_by_batch[batch index][question id] is an answer text or a future of an answer that is asked separately
+    answers_by_batch = []
+    for system_msg, grouped_answer_future in zip(system_msgs, grouped_answer_futures):
+        try:
+            grouped_answer = grouped_answer_future.result()
+        except Exception as e:
+            return [f"Error or unexpected response: {e}"] * len(questions)
+        try:
+            batch_answers = parse_grouped_answers(grouped_answer, questions_by_id)
+        except ValueError as e:
+            print(f"Failed to parse answers of grouped questions, asking them separately: {e}", file=sys.stderr)
+            batch_answers = {}
+        for question_id, question in questions_by_id.items():
+            if question_id not in batch_answers:
+                batch_answers[question_id] = client.submit(system_msg, question)
+        answers_by_batch.append(batch_answers)
+
+    question_answers = []
+    for question_id in questions_by_id:
+        answers = []
+        for batch_answers in answers_by_batch:
+            answer = batch_answers[question_id]
             try:
-                answer = ask_question(system_msg, question)
-                answers.append(answer)
+                answers.append(answer.result() if isinstance(answer, concurrent.futures.Future) else answer)
             except Exception as e:
                 answers = [f"Error or unexpected response: {e}"]
                 break
+        question_answers.append(answers)
+
+    # Summarize the answers of questions that were asked about multiple batches of files, concurrently
+    summary_futures = [client.submit(ROLE_DESCRIPTION, summary_question(answers)) if len(answers) > 1 else None
+                       for answers in question_answers]
+    results = []
+    for answers, summary_future in zip(question_answers, summary_futures):
+        if summary_future is None:
+            results.append(answers[0])
+            continue
+        try:
+            results.append(summary_future.result())
+        except Exception as e:
+            results.append(f"Error or unexpected response: {e}")
+    return results
 
-        if len(answers) == 1:
-            print(answers[0])
-        else:
-            # Multiple batches of files were used to answer this question, generate a summary
-            system_msg = role_description
-            question = "The answer to the question is spread over multiple parts. Please summarize the answer in a concise way, combining all relevant information from the different parts. " \
-                "Here are the different parts of the answer:\n\n"
-            for part_index, part in enumerate(answers):
-                question += f"--- PART {part_index+1} ---\n{part}\n"
-            try:
-                answer = ask_question(system_msg, question)
-            except Exception as e:
-                answer = f"Error or unexpected response: {e}"
-            print(answer)
+
+def analyze_extension(extension_name, metadata, cloned_repository_folder, client, group=False):
+    """Ask all questions about the extension and print the answers.
+    All questions (and all batches of files) are sent at once, the ``client`` limits the number of concurrent requests
+    and the request rate. Answers are printed in the order of :data:`QUESTIONS`.
+    If ``group`` is enabled then questions that use the same file categories are asked together,
+    so that the files are sent only once for all of them (see :func:`answer_question_group`).
+    """
+
+    # Only metadata of the files is collected here, contents are read when they are needed
+    files = list(collect_analyzed_files(cloned_repository_folder))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(QUESTIONS)) as question_executor:
+        # For each question: (future of the answers of its group, index of the question in the group)
+        answer_futures = [None] * len(QUESTIONS)
+        question_groups = group_questions(QUESTIONS) if group else [
+            (categories, [index]) for index, (question, categories) in enumerate(QUESTIONS)]
+        batches_by_categories = {}
+        for categories, question_indices in question_groups:
+            if tuple(categories) not in batches_by_categories:
+                batches_by_categories[tuple(categories)] = build_file_content_batches(files, categories)
+            file_content_batches = batches_by_categories[tuple(categories)]
+            if not file_content_batches:
+                continue
+            questions = [QUESTIONS[index][0] for index in question_indices]
+            if len(questions) == 1:
+                group_answers_future = question_executor.submit(
+                    lambda question, batches: [answer_question(client, question, batches)], questions[0], file_content_batches)
+            else:
+                group_answers_future = question_executor.submit(answer_question_group, client, questions, file_content_batches)
+            for position, index in enumerate(question_indices):
+                answer_futures[index] = (group_answers_future, position)
+
+        for index, ([question, categories], answer_future) in enumerate(zip(QUESTIONS, answer_futures)):
+
+            print("\n------------------------------------------------------")
+            print(f"Question {index+1}: {question}")
+            print("------------------------------------------------------")
+
+            if answer_future is None:
+                print("No relevant files found for this question.")
+                continue
+
+            group_answers_future, position = answer_future
+            print(group_answers_future.result()[position])
 
 
 def main():
     parser = argparse.ArgumentParser(
         description='AI analysis of extensions.')
     parser.add_argument("extension_description_files", nargs='*', help="Extension JSON files to validate")
+    parser.add_argument("--repository-cache-dir",
+                        help="Folder for keeping mirrors of extension repositories between runs. "
+                        "If not specified then repositories are cloned from scratch.")
+    parser.add_argument("--repository-cache-size-mb", type=int, default=DEFAULT_CACHE_SIZE_MB,
+                        help=f"Disk budget of the repository cache in MB (default: {DEFAULT_CACHE_SIZE_MB}).")
+    parser.add_argument("--sparse-checkout", action='store_true',
+                        help="Only check out the repository files that are analyzed (Python, Markdown, top-level CMakeLists.txt).")
+    parser.add_argument("-j", "--jobs", type=int, default=INFERENCE_MAX_CONCURRENT_REQUESTS,
+                        help=f"Maximum number of concurrent inference requests (default: {INFERENCE_MAX_CONCURRENT_REQUESTS}).")
+    parser.add_argument("--requests-per-minute", type=float, default=INFERENCE_RESPONSE_PER_MINUTE_LIMIT,
+                        help=f"Maximum number of inference requests per minute (default: {INFERENCE_RESPONSE_PER_MINUTE_LIMIT}).")
+    parser.add_argument("--tokens-per-minute", type=int, default=INFERENCE_TOKENS_PER_MINUTE_LIMIT,
+                        help="Maximum number of tokens (prompt and completion) per minute. Not limited if 0 (default).")
+    parser.add_argument("--cache-dir",
+                        help="Folder for caching answers between runs. A question is not asked again if the model "
+                        "and the analyzed files did not change.")
+    parser.add_argument("--group-questions", action='store_true',
+                        help="Ask questions that use the same files (for example, all questions about the source code) "
+                        "in a single request and parse the answers from a JSON response. Uses much fewer input tokens.")
     args = parser.parse_args()
 
     extension_descriptions_folder = "."
@@ -254,35 +395,53 @@ def main():
 
     success = True
 
-    for file_path in args.extension_description_files:
+    repository_cache = None
+    if args.repository_cache_dir:
+        repository_cache = RepositoryCache(args.repository_cache_dir, args.repository_cache_size_mb)
 
-        # Get extension name and desctiption file path
-        file_extension = os.path.splitext(file_path)[1]
-        if file_extension != '.json':
-            # not an extension description file, ignore it
-            continue
-        full_path = os.path.join(extension_descriptions_folder, file_path)
-        if not os.path.isfile(full_path):
-            # not a file in the extensions descriptions folder, ignore it
-            continue
-        extension_name = os.path.splitext(os.path.basename(file_path))[0]
+    answer_cache = AnswerCache(args.cache_dir) if args.cache_dir else None
+    client = InferenceClient(
+        INFERENCE_URL, INFERENCE_MODEL, INFERENCE_API_KEY, requests_per_minute=args.requests_per_minute,
+        tokens_per_minute=args.tokens_per_minute or None, max_workers=max(args.jobs, 1), answer_cache=answer_cache)
 
-        print(f"Extension: {extension_name}")
-        print("=====================================================")
+    # Answers that were received are saved even if the analysis of an extension fails
+    try:
+        for file_path in args.extension_description_files:
 
-        metadata = parse_json(file_path)
-        cloned_repository_folder = tempfile.mkdtemp(prefix=f"extension_check_{extension_name}_")
+            # Get extension name and desctiption file path
+            file_extension = os.path.splitext(file_path)[1]
+            if file_extension != '.json':
+                # not an extension description file, ignore it
+                continue
+            full_path = os.path.join(extension_descriptions_folder, file_path)
+            if not os.path.isfile(full_path):
+                # not a file in the extensions descriptions folder, ignore it
+                continue
+            extension_name = os.path.splitext(os.path.basename(file_path))[0]
 
-        try:
-            clone_repository(metadata, cloned_repository_folder)
-            analyze_extension(extension_name, metadata, cloned_repository_folder)
-        finally:
-            # Clean up temporary directory
-            success_cleanup = safe_cleanup_directory(cloned_repository_folder)
+            print(f"Extension: {extension_name}")
+            print("=====================================================")
+
+            metadata = parse_json(file_path)
+            cloned_repository_folder = tempfile.mkdtemp(prefix=f"extension_check_{extension_name}_")
+
+            try:
+                clone_repository(metadata, cloned_repository_folder, repository_cache, args.sparse_checkout)
+                analyze_extension(extension_name, metadata, cloned_repository_folder, client, group=args.group_questions)
+            finally:
+                # Clean up temporary directory
+                success_cleanup = safe_cleanup_directory(cloned_repository_folder)
+
+            print("\n=====================================================\n")
+    finally:
+        client.close()
+        if answer_cache:
+            answer_cache.save()
+        print(f"Inference: {client.statistics()}", file=sys.stderr)
 
-        print("\n=====================================================\n")
+    if repository_cache:
+        repository_cache.evict()
 
 
 if __name__ == "__main__":
-    import sys
     main()
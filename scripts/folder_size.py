@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+
+"""
+Compute the size of a folder tree quickly, with an optional size limit.
+
+:func:`scan_folder_size` walks the tree with ``os.scandir``, so file types are known from the directory listing
+and each file is stat-ed only once. Scanning stops as soon as the size limit is exceeded, and the largest files
+and folders found so far are reported. Size of the ``.git`` folder is reported separately from the working tree.
+
+Run this script with ``--benchmark`` to compare it with a ``Path.rglob`` based implementation
+on a synthetic tree::
+
+    python scripts/folder_size.py --benchmark --file-count 100000
+"""
+
+import argparse
+import heapq
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+class FolderSizeScan:
+    """Result of :func:`scan_folder_size`, or of a listing of files that is collected with :meth:`add_file`.
+
+    ``total_bytes`` is the sum of ``working_tree_bytes`` and ``git_bytes``. If ``limit_exceeded`` is True
+    then scanning was stopped early and sizes are lower bounds.
+    """
+
+    def __init__(self):
+        self.working_tree_bytes = 0
+        self.git_bytes = 0
+        self.file_count = 0
+        self.limit_exceeded = False
+        self._largest_files = []  # min-heap of (size, path)
+        self._directory_bytes = {}  # relative folder path -> size of files directly in the folder
+
+    @property
+    def total_bytes(self):
+        return self.working_tree_bytes + self.git_bytes
+
+    def add_file(self, relative_path, size, in_git=False, largest_count=5):
+        """Add a file of ``size`` bytes. ``relative_path`` uses ``/`` separators."""
+        self.file_count += 1
+        if in_git:
+            self.git_bytes += size
+        else:
+            self.working_tree_bytes += size
+        if len(self._largest_files) < largest_count:
+            heapq.heappush(self._largest_files, (size, relative_path))
+        elif size > self._largest_files[0][0]:
+            heapq.heapreplace(self._largest_files, (size, relative_path))
+        directory = relative_path.rpartition("/")[0]
+        self._directory_bytes[directory] = self._directory_bytes.get(directory, 0) + size
+
+    def largest_files(self):
+        """Get list of ``(size, relative path)`` of the largest files, largest first."""
+        return sorted(self._largest_files, reverse=True)
+
+    def largest_directories(self, count=5):
+        """Get list of ``(size, relative path)`` of the largest folders (including subfolders), largest first."""
+        cumulative_bytes = {}
+        for directory, size in self._directory_bytes.items():
+            while directory:
+                cumulative_bytes[directory] = cumulative_bytes.get(directory, 0) + size
+                directory = os.path.dirname(directory)
+        return heapq.nlargest(count, ((size, directory) for directory, size in cumulative_bytes.items()))
+
+    def summary(self, count=5):
+        """Get human-readable list of the largest files and folders."""
+        lines = []
+        largest_files = self.largest_files()[:count]
+        if largest_files:
+            lines.append("Largest files:")
+            lines.extend(f"  - {path}: {size / (1024 * 1024):.1f} MB" for size, path in largest_files)
+        largest_directories = self.largest_directories(count)
+        if largest_directories:
+            lines.append("Largest folders:")
+            lines.extend(f"  - {path}/: {size / (1024 * 1024):.1f} MB" for size, path in largest_directories)
+        return "\n".join(lines)
+
+
+def scan_folder_size(folder, limit_bytes=None, include_git=True, largest_count=5):
+    """Compute total size of regular files in a folder tree. Symbolic links are not followed.
+
+    :param folder: Root folder, typically a repository working copy.
+    :param limit_bytes: If specified then scanning stops as soon as the total size exceeds this value.
+    :param include_git: If False then the ``.git`` folder (or file) in the root folder is skipped.
+    :param largest_count: Number of largest files that are recorded.
+    :return: :class:`FolderSizeScan`
+    """
+    scan = FolderSizeScan()
+    # Stack of (absolute path, relative path, is in .git folder)
+    folders_to_scan = [(os.fspath(folder), "", False)]
+    while folders_to_scan:
+        folder_path, relative_folder_path, in_git = folders_to_scan.pop()
+        try:
+            entries = os.scandir(folder_path)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                relative_path = f"{relative_folder_path}/{entry.name}" if relative_folder_path else entry.name
+                entry_in_git = in_git or (not relative_folder_path and entry.name == ".git")
+                if entry_in_git and not include_git:
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        folders_to_scan.append((entry.path, relative_path, entry_in_git))
+                        continue
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    size = entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    continue
+                scan.add_file(relative_path, size, entry_in_git, largest_count)
+                if limit_bytes is not None and scan.total_bytes > limit_bytes:
+                    scan.limit_exceeded = True
+                    break
+        if scan.limit_exceeded:
+            break
+    return scan
+
+
+def _rglob_folder_size(folder):
+    """Reference implementation, for benchmarking."""
+    return sum(f.stat().st_size for f in Path(folder).rglob('*') if f.is_file())
+
+
+def _create_synthetic_tree(folder, file_count, files_per_folder=100, file_size=64):
+    content = b"x" * file_size
+    for index in range(file_count):
+        subfolder = os.path.join(folder, f"d{index // (files_per_folder * 10)}", f"d{index // files_per_folder}")
+        if index % files_per_folder == 0:
+            os.makedirs(subfolder, exist_ok=True)
+        with open(os.path.join(subfolder, f"f{index}.txt"), "wb") as f:
+            f.write(content)
+
+
+def benchmark(file_count, repeat=3):
+    folder = tempfile.mkdtemp(prefix="folder_size_benchmark_")
+    try:
+        print(f"Creating {file_count} files in {folder}")
+        _create_synthetic_tree(folder, file_count)
+        timings = {}
+        limit_bytes = file_count * 64 // 10
+        for name, function in [
+                ("Path.rglob", lambda: _rglob_folder_size(folder)),
+                ("scan_folder_size", lambda: scan_folder_size(folder).total_bytes),
+                ("scan_folder_size, 10% limit", lambda: scan_folder_size(folder, limit_bytes=limit_bytes).total_bytes)]:
+            best_time = None
+            for _ in range(repeat):
+                start_time = time.perf_counter()
+                total_bytes = function()
+                elapsed_time = time.perf_counter() - start_time
+                best_time = elapsed_time if best_time is None else min(best_time, elapsed_time)
+            timings[name] = best_time
+            print(f"{name:30s} {best_time * 1000:8.1f} ms  ({total_bytes} bytes)")
+        print(f"Speedup: {timings['Path.rglob'] / timings['scan_folder_size']:.1f}x")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute size of a folder tree.")
+    parser.add_argument("folder", nargs="?", default=".", help="Folder to scan.")
+    parser.add_argument("--limit-mb", type=float, help="Stop scanning when the size exceeds this limit.")
+    parser.add_argument("--benchmark", action="store_true", help="Run benchmark on a synthetic folder tree.")
+    parser.add_argument("--file-count", type=int, default=100000, help="Number of files in the benchmark tree.")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.file_count)
+        return 0
+
+    limit_bytes = int(args.limit_mb * 1024 * 1024) if args.limit_mb is not None else None
+    scan = scan_folder_size(args.folder, limit_bytes=limit_bytes)
+    print(f"{'More than ' if scan.limit_exceeded else ''}{scan.total_bytes / (1024 * 1024):.1f} MB in {scan.file_count} files "
+          f"(working tree: {scan.working_tree_bytes / (1024 * 1024):.1f} MB, .git: {scan.git_bytes / (1024 * 1024):.1f} MB)")
+    print(scan.summary())
+    return 1 if scan.limit_exceeded else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
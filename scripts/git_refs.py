@@ -0,0 +1,151 @@
+"""
+Resolve branch and tag names of git repositories to commit SHAs using ``git ls-remote``.
+
+``git ls-remote`` works with any git server (GitHub, GitLab, Bitbucket, self-hosted or local repositories),
+does not use any API quota, and can look up many refs of a repository in a single call.
+
+Example::
+
+    resolver = GitRefResolver()
+    resolver.prefetch([("https://github.com/Slicer/SlicerHeart.git", "main"), ("https://gitlab.com/a/b.git", "v1.0")])
+    sha = resolver.resolve("https://github.com/Slicer/SlicerHeart.git", "main")
+"""
+
+import concurrent.futures
+import os
+import re
+import subprocess
+import threading
+
+from run_profile import add_counter, bind_span
+
+
+COMMIT_SHA_PATTERN = re.compile(r"^[0-9a-fA-F]{40}$")
+
+
+class GitRefResolveError(RuntimeError):
+    """Exception raised when a revision of a repository cannot be resolved to a commit SHA."""
+    pass
+
+
+def is_commit_sha(revision):
+    """Return True if ``revision`` is a full commit SHA (not a branch or tag name)."""
+    return bool(revision) and COMMIT_SHA_PATTERN.match(revision) is not None
+
+
+def ls_remote(scm_url, patterns=(), timeout=60):
+    """Get refs of a remote repository.
+
+    :param patterns: Optional list of ref patterns (for example ``main`` matches ``refs/heads/main``
+      and ``refs/tags/main``). All refs are returned if not specified.
+    :return: Dictionary of ref name -> commit SHA. Annotated tags are also listed with ``^{}`` suffix
+      (pointing to the tagged commit) if the pattern matches it.
+    :raises GitRefResolveError: if the repository is not accessible.
+    """
+    # Never wait for credentials, for example when the repository does not exist on GitHub
+    env = dict(os.environ, GIT_TERMINAL_PROMPT="0")
+    try:
+        result = subprocess.run(
+            ['git', 'ls-remote', scm_url] + list(patterns),
+            check=True, capture_output=True, text=True, timeout=timeout, env=env)
+    except subprocess.CalledProcessError as exc:
+        raise GitRefResolveError(f"Failed to list refs of {scm_url}: {exc.stderr.strip()}")
+    except subprocess.TimeoutExpired:
+        raise GitRefResolveError(f"Failed to list refs of {scm_url}: timed out after {timeout} seconds")
+    refs = {}
+    for line in result.stdout.splitlines():
+        sha, _, ref = line.partition("\t")
+        if ref:
+            refs[ref] = sha
+    return refs
+
+
+def select_ref(refs, revision):
+    """Get the commit SHA that ``revision`` refers to from the output of :func:`ls_remote`.
+
+    Branches take precedence over tags (same as in ``git checkout``). Empty revision means the default branch.
+    :return: Commit SHA or None if ``revision`` was not found.
+    """
+    if not revision:
+        candidates = ["HEAD"]
+    else:
+        candidates = [f"refs/heads/{revision}", f"refs/tags/{revision}^{{}}", f"refs/tags/{revision}", revision]
+    for candidate in candidates:
+        if candidate in refs:
+            return refs[candidate]
+    return None
+
+
+class GitRefResolver:
+    """Resolves revisions of remote repositories to commit SHAs, with a per-run cache.
+
+    :meth:`prefetch` resolves revisions of many repositories concurrently, using a single ``git ls-remote``
+    call for all revisions of the same repository. Results (including errors) are cached, therefore later
+    :meth:`resolve` calls do not access the network.
+
+    :param max_workers: Maximum number of ``git ls-remote`` processes that run in parallel.
+    """
+
+    def __init__(self, max_workers=16, timeout=60):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._resolved = {}  # (scm_url, revision) -> commit SHA or GitRefResolveError
+        self.ls_remote_count = 0
+
+    def _resolve_repository(self, scm_url, revisions):
+        patterns = set()
+        for revision in revisions:
+            patterns.update([revision, f"{revision}^{{}}"] if revision else ["HEAD"])
+        add_counter("git_ls_remote")
+        try:
+            refs = ls_remote(scm_url, sorted(patterns), timeout=self.timeout)
+        except GitRefResolveError as exc:
+            refs = None
+            error = exc
+        with self._lock:
+            self.ls_remote_count += 1
+            for revision in revisions:
+                if refs is None:
+                    self._resolved[(scm_url, revision)] = error
+                    continue
+                sha = select_ref(refs, revision)
+                self._resolved[(scm_url, revision)] = sha if sha else GitRefResolveError(
+                    f"Revision '{revision}' was not found in {scm_url}")
+
+    def prefetch(self, url_revisions):
+        """Resolve many revisions concurrently.
+
+        Full commit SHAs and already resolved revisions are skipped.
+        :param url_revisions: Iterable of ``(scm_url, revision)`` tuples.
+        """
+        revisions_by_url = {}
+        with self._lock:
+            for scm_url, revision in url_revisions:
+                if is_commit_sha(revision) or (scm_url, revision) in self._resolved:
+                    continue
+                revisions_by_url.setdefault(scm_url, set()).add(revision)
+        if not revisions_by_url:
+            return
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(bind_span(self._resolve_repository), scm_url, sorted(revisions))
+                       for scm_url, revisions in revisions_by_url.items()]
+            for future in futures:
+                future.result()
+
+    def resolve(self, scm_url, revision):
+        """Get the commit SHA of ``revision`` (branch or tag name, or empty for the default branch).
+
+        :raises GitRefResolveError: if the repository is not accessible or the revision is not found.
+        """
+        if is_commit_sha(revision):
+            return revision.lower()
+        with self._lock:
+            result = self._resolved.get((scm_url, revision))
+        if result is None:
+            self._resolve_repository(scm_url, [revision])
+            with self._lock:
+                result = self._resolved[(scm_url, revision)]
+        if isinstance(result, GitRefResolveError):
+            raise result
+        return result
@@ -0,0 +1,271 @@
+"""
+Get metadata of many GitHub repositories with few API requests.
+
+:class:`GitHubMetadataFetcher` queries up to 100 repositories in a single GitHub GraphQL request and returns
+topics, default branch, HEAD commit SHA of the default branch, size and archived status of each repository.
+The GraphQL API requires authentication, therefore a token must be set in the ``GITHUB_TOKEN`` environment
+variable (or passed to the fetcher). Without a token, the REST API is used, one request per repository
+(without the HEAD commit SHA), which is only suitable for checking a few repositories.
+
+Results are cached in memory and, if ``cache_dir`` is specified, on disk. ``X-RateLimit-*`` response headers are
+honored: when the rate limit is exhausted, the fetcher waits until the limit is reset (if that is
+within ``max_rate_limit_wait`` seconds) instead of sending requests that would fail.
+
+Example::
+
+    fetcher = GitHubMetadataFetcher(cache_dir="/tmp/slicer-extensions-cache")
+    fetcher.prefetch(["https://github.com/Slicer/SlicerHeart.git", "https://github.com/SlicerIGT/SlicerIGT.git"])
+    print(fetcher.get_repository_metadata("https://github.com/Slicer/SlicerHeart.git")["topics"])
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import urllib.parse as urlparse
+
+try:
+    import requests
+except ImportError:
+    requests = None
+
+from run_profile import add_counter
+
+
+GITHUB_API_URL = "https://api.github.com"
+
+# Maximum number of repositories that are queried in one GraphQL request
+MAX_REPOSITORIES_PER_QUERY = 100
+
+REPOSITORY_FIELDS = """
+    nameWithOwner
+    isArchived
+    diskUsage
+    defaultBranchRef { name target { oid } }
+    repositoryTopics(first: 100) { nodes { topic { name } } }
+"""
+
+
+class GitHubMetadataError(RuntimeError):
+    """Exception raised when repository metadata cannot be retrieved from GitHub."""
+
+
+def parse_github_repository(scm_url):
+    """Get ``(owner, repository name)`` from a GitHub repository URL.
+    :return: Tuple of owner and repository name, or None if the URL does not refer to a GitHub repository.
+    """
+    parsed_url = urlparse.urlsplit(scm_url)
+    if parsed_url.netloc.lower() != "github.com":
+        return None
+    path_parts = parsed_url.path.split("/")
+    owner = path_parts[1] if len(path_parts) > 1 else ""
+    repo = os.path.splitext(path_parts[-1])[0]
+    return owner, repo
+
+
+def repository_key(owner, repo):
+    """Repository names are case insensitive on GitHub."""
+    return f"{owner}/{repo}".lower()
+
+
+class GitHubMetadataFetcher:
+    """Fetches and caches metadata of GitHub repositories.
+
+    :param token: GitHub access token. Default is the value of the ``GITHUB_TOKEN`` environment variable.
+    :param cache_dir: Optional folder where retrieved metadata is stored between runs.
+    :param cache_ttl: Time (in seconds) after which metadata stored in ``cache_dir`` is retrieved again.
+    :param max_rate_limit_wait: Maximum time (in seconds) to wait for the API rate limit to reset.
+    :param api_url: Base URL of the GitHub API (``/graphql`` and ``/repos/...`` endpoints are used).
+    """
+    CACHE_FILENAME = "github-metadata.json"
+    CACHE_VERSION = 1
+    DEFAULT_CACHE_TTL = 60 * 60
+
+    def __init__(self, token=None, cache_dir=None, cache_ttl=DEFAULT_CACHE_TTL, max_rate_limit_wait=300,
+                 api_url=GITHUB_API_URL, timeout=30, max_retries=3):
+        self.token = token if token is not None else os.environ.get("GITHUB_TOKEN")
+        self.cache_file_path = os.path.join(cache_dir, self.CACHE_FILENAME) if cache_dir else None
+        self.cache_ttl = cache_ttl
+        self.max_rate_limit_wait = max_rate_limit_wait
+        self.api_url = api_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        self.session.headers["Accept"] = "application/vnd.github+json"
+        if self.token:
+            self.session.headers["Authorization"] = f"bearer {self.token}"
+        # Requests are serialized, so that the rate limit information is always up-to-date
+        self._request_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.rate_limit_remaining = None
+        self.rate_limit_reset = None
+        self.requests_count = 0
+        self.repositories = self._load_cache()
+
+    def _load_cache(self):
+        if not self.cache_file_path:
+            return {}
+        try:
+            with open(self.cache_file_path, encoding="utf-8") as cache_file:
+                cache = json.load(cache_file)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        if cache.get("version") != self.CACHE_VERSION:
+            return {}
+        now = time.time()
+        return {key: info for key, info in cache.get("repositories", {}).items()
+                if now - info.get("fetched", 0) < self.cache_ttl}
+
+    def save_cache(self):
+        """Save retrieved repository metadata to the cache file."""
+        if not self.cache_file_path:
+            return
+        with self._lock:
+            cache = {"version": self.CACHE_VERSION, "repositories": dict(self.repositories)}
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_file_path)), exist_ok=True)
+        with open(self.cache_file_path + ".tmp", "w", encoding="utf-8") as cache_file:
+            json.dump(cache, cache_file, indent=1)
+        os.replace(self.cache_file_path + ".tmp", self.cache_file_path)
+
+    def prefetch(self, scm_urls):
+        """Retrieve metadata of all GitHub repositories in ``scm_urls`` that are not cached yet.
+
+        Non-GitHub URLs are ignored. With a token, repositories are queried in batches
+        of :data:`MAX_REPOSITORIES_PER_QUERY`.
+        :raises GitHubMetadataError: if the metadata could not be retrieved.
+        """
+        repositories = {}
+        for scm_url in scm_urls:
+            owner_repo = parse_github_repository(scm_url)
+            if owner_repo is None:
+                continue
+            key = repository_key(*owner_repo)
+            with self._lock:
+                if key in self.repositories:
+                    continue
+            repositories[key] = owner_repo
+        repositories = list(repositories.values())
+        if not self.token:
+            for owner, repo in repositories:
+                self._fetch_rest(owner, repo)
+            return
+        for batch_start in range(0, len(repositories), MAX_REPOSITORIES_PER_QUERY):
+            self._fetch_graphql(repositories[batch_start:batch_start + MAX_REPOSITORIES_PER_QUERY])
+
+    def get_repository_metadata(self, scm_url):
+        """Get metadata of a GitHub repository. It is retrieved if it is not cached yet.
+        :return: Dictionary with ``name_with_owner``, ``topics``, ``default_branch``, ``head_sha``, ``size_kb``
+          and ``archived`` keys. None if the repository does not exist or ``scm_url`` is not a GitHub URL.
+        :raises GitHubMetadataError: if the metadata could not be retrieved.
+        """
+        owner_repo = parse_github_repository(scm_url)
+        if owner_repo is None:
+            return None
+        key = repository_key(*owner_repo)
+        with self._lock:
+            if key in self.repositories:
+                add_counter("cache_hits")
+                return self.repositories[key]["metadata"]
+        self.prefetch([scm_url])
+        with self._lock:
+            return self.repositories[key]["metadata"]
+
+    def _store(self, owner, repo, metadata):
+        with self._lock:
+            self.repositories[repository_key(owner, repo)] = {"metadata": metadata, "fetched": time.time()}
+
+    def _fetch_graphql(self, repositories):
+        query = "query {\n" + "".join(
+            f"  r{index}: repository(owner: {json.dumps(owner)}, name: {json.dumps(repo)}) {{{REPOSITORY_FIELDS}  }}\n"
+            for index, (owner, repo) in enumerate(repositories)) + "}\n"
+        response = self._request("post", f"{self.api_url}/graphql", json={"query": query})
+        result = response.json()
+        data = result.get("data") or {}
+        for index, (owner, repo) in enumerate(repositories):
+            repository = data.get(f"r{index}")
+            if repository is None:
+                # Missing repositories are reported as NOT_FOUND errors, any other error fails the whole batch
+                errors = [error for error in result.get("errors", []) if error.get("path") == [f"r{index}"]]
+                if any(error.get("type") != "NOT_FOUND" for error in errors) or (not errors and result.get("errors")):
+                    raise GitHubMetadataError(
+                        f"Failed to get metadata of {owner}/{repo}: {errors or result.get('errors')}")
+                self._store(owner, repo, None)
+                continue
+            default_branch = repository.get("defaultBranchRef") or {}
+            self._store(owner, repo, {
+                "name_with_owner": repository["nameWithOwner"],
+                "topics": [node["topic"]["name"] for node in repository["repositoryTopics"]["nodes"]],
+                "default_branch": default_branch.get("name"),
+                "head_sha": (default_branch.get("target") or {}).get("oid"),
+                "size_kb": repository.get("diskUsage"),
+                "archived": repository.get("isArchived"),
+                })
+
+    def _fetch_rest(self, owner, repo):
+        response = self._request("get", f"{self.api_url}/repos/{owner}/{repo}", allowed_status_codes=[404])
+        if response.status_code == 404:
+            self._store(owner, repo, None)
+            return
+        repository = response.json()
+        self._store(owner, repo, {
+            "name_with_owner": repository["full_name"],
+            "topics": repository.get("topics", []),
+            "default_branch": repository.get("default_branch"),
+            "head_sha": None,
+            "size_kb": repository.get("size"),
+            "archived": repository.get("archived"),
+            })
+
+    def _wait_for_rate_limit(self):
+        if self.rate_limit_remaining is None or self.rate_limit_remaining > 0:
+            return
+        wait_time = self.rate_limit_reset - time.time() + 1
+        if wait_time <= 0:
+            return
+        if wait_time > self.max_rate_limit_wait:
+            raise GitHubMetadataError(
+                f"GitHub API rate limit exceeded, it will be reset in {wait_time:.0f} seconds."
+                " Set GITHUB_TOKEN environment variable to increase the rate limit.")
+        print(f"GitHub API rate limit exceeded, waiting {wait_time:.0f} seconds", file=sys.stderr)
+        time.sleep(wait_time)
+
+    def _update_rate_limit(self, response):
+        if "X-RateLimit-Remaining" in response.headers:
+            self.rate_limit_remaining = int(response.headers["X-RateLimit-Remaining"])
+        if "X-RateLimit-Reset" in response.headers:
+            self.rate_limit_reset = int(response.headers["X-RateLimit-Reset"])
+
+    def _request(self, method, url, allowed_status_codes=(), **kwargs):
+        with self._request_lock:
+            for attempt in range(self.max_retries + 1):
+                self._wait_for_rate_limit()
+                try:
+                    response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+                except requests.RequestException as exc:
+                    if attempt == self.max_retries:
+                        raise GitHubMetadataError(f"Failed to get information from {url}: {exc}") from exc
+                    time.sleep(2 ** attempt)
+                    continue
+                self.requests_count += 1
+                add_counter("http_requests")
+                add_counter("bytes_downloaded", len(response.content))
+                self._update_rate_limit(response)
+                if response.ok or response.status_code in allowed_status_codes:
+                    return response
+                if response.status_code in (403, 429) and self.rate_limit_remaining == 0:
+                    # Primary rate limit exceeded, wait for the reset
+                    continue
+                if response.status_code in (403, 429) and "Retry-After" in response.headers:
+                    # Secondary rate limit exceeded
+                    retry_after = int(response.headers["Retry-After"])
+                    if retry_after > self.max_rate_limit_wait:
+                        break
+                    time.sleep(retry_after)
+                    continue
+                if response.status_code >= 500 and attempt < self.max_retries:
+                    time.sleep(2 ** attempt)
+                    continue
+                break
+        raise GitHubMetadataError(
+            f"Failed to get information from {url}: Error {response.status_code}: {response.text}")
@@ -0,0 +1,297 @@
+"""
+Client for OpenAI-compatible chat completion endpoints, with rate limiting and retries.
+
+:class:`InferenceClient` sends requests from a pool of worker threads, so that many questions can be asked
+concurrently. The request rate is governed by token buckets, one for requests per minute and (optionally)
+one for tokens per minute. The number of tokens of a request is estimated before it is sent, and the bucket
+is corrected with the actual ``usage`` reported in the response. Requests that fail with HTTP 429
+or 5xx are retried with exponential backoff (honoring ``Retry-After``).
+
+If an :class:`AnswerCache` is specified then answers are stored, keyed by the model, the system message (that contains
+the analyzed file contents) and the question, so that asking the same question about the same files again
+does not send a request.
+
+Example::
+
+    client = InferenceClient(url, model, api_key, requests_per_minute=10, tokens_per_minute=200000)
+    futures = [client.submit(system_msg, question) for question in questions]
+    answers = [future.result() for future in futures]
+"""
+
+import concurrent.futures
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+import requests
+
+# Average number of characters per token, used for estimating the size of requests
+CHARACTERS_PER_TOKEN = 4
+
+# Expected size of an answer, reserved from the tokens per minute budget until the actual usage is known
+ESTIMATED_COMPLETION_TOKENS = 1000
+
+
+def estimate_tokens(text):
+    """Estimate the number of tokens of a text, without a model-specific tokenizer."""
+    return len(text) // CHARACTERS_PER_TOKEN + 1
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter.
+
+    The bucket holds at most ``capacity`` tokens (default: one minute worth of tokens)
+    and it is refilled continuously at ``rate_per_minute``.
+
+    :param rate_per_minute: Number of tokens added to the bucket per minute.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1):
+        """Wait until ``amount`` tokens are available and take them.
+        :return: Time spent waiting, in seconds.
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                wait_time = (amount - self.tokens) / self.rate
+            time.sleep(wait_time)
+            waited += wait_time
+
+    def adjust(self, amount):
+        """Take ``amount`` more tokens (or give back tokens if negative), without waiting.
+        The bucket may go below zero, which delays subsequent requests.
+        """
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class AnswerCache:
+    """Persistent cache of answers, keyed by the model, the system message and the question.
+
+    :param cache_dir: Folder where the answers are stored between runs.
+    """
+    CACHE_FILENAME = "ai-answers.json"
+    CACHE_VERSION = 1
+
+    def __init__(self, cache_dir):
+        self.cache_file_path = os.path.join(cache_dir, self.CACHE_FILENAME)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.saved_tokens = 0
+        self.answers = self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_file_path, encoding="utf-8") as cache_file:
+                cache = json.load(cache_file)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        if cache.get("version") != self.CACHE_VERSION:
+            return {}
+        return cache.get("answers", {})
+
+    def save(self):
+        with self._lock:
+            cache = {"version": self.CACHE_VERSION, "answers": dict(self.answers)}
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_file_path)), exist_ok=True)
+        with open(self.cache_file_path + ".tmp", "w", encoding="utf-8") as cache_file:
+            json.dump(cache, cache_file, indent=1)
+        os.replace(self.cache_file_path + ".tmp", self.cache_file_path)
+
+    @staticmethod
+    def answer_key(model, system_msg, question):
+        key_hash = hashlib.sha256()
+        for part in (model, system_msg, question):
+            key_hash.update(hashlib.sha256(part.encode("utf-8")).digest())
+        return key_hash.hexdigest()
+
+    def get(self, key):
+        """Get the stored answer, or None if it is not available."""
+        with self._lock:
+            entry = self.answers.get(key)
+            if entry is None:
+                return None
+            self.hits += 1
+            self.saved_tokens += entry.get("total_tokens", 0)
+            return entry["answer"]
+
+    def put(self, key, answer, total_tokens):
+        with self._lock:
+            self.answers[key] = {"answer": answer, "total_tokens": total_tokens, "created": time.time()}
+
+    def statistics(self):
+        return f"{self.hits} requests and {self.saved_tokens} tokens saved by the answer cache"
+
+
+class InferenceClient:
+    """Sends chat completion requests concurrently, within request and token rate limits.
+
+    :param url: Chat completions endpoint URL.
+    :param model: Model name.
+    :param api_key: API key, sent as a bearer token.
+    :param requests_per_minute: Maximum number of requests per minute.
+    :param tokens_per_minute: Maximum number of tokens (prompt and completion) per minute. Not limited if None.
+    :param max_workers: Maximum number of concurrent requests.
+    :param max_retries: Number of retries of requests that failed with HTTP 429, 5xx, or a connection error.
+    :param answer_cache: Optional :class:`AnswerCache`. Answers found in the cache are returned without a request.
+    """
+
+    def __init__(self, url, model, api_key, requests_per_minute=10, tokens_per_minute=None, max_workers=4,
+                 max_retries=5, timeout=600, max_backoff=120, answer_cache=None):
+        self.url = url
+        self.answer_cache = answer_cache
+        self.model = model
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}",
+            "HTTP-Referer": "slicer.org",  # Optional. Site URL for rankings on openrouter.ai.
+            "X-Title": "3D Slicer",  # Optional. Site title for rankings on openrouter.ai.
+            })
+        # Requests are spaced evenly, a burst of requests could exceed the limit in a sliding one-minute window
+        self.request_limiter = TokenBucket(requests_per_minute, capacity=1)
+        self.token_limiter = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self.requests_count = 0
+        self.retries_count = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.rate_limit_wait_time = 0.0
+
+    def submit(self, system_msg, question):
+        """Ask a question in a worker thread.
+        :param system_msg: System message, or a function that returns the system message. A function can be used
+          to create large messages only when the request is sent, to limit memory usage.
+        :return: Future of the answer.
+        """
+        return self.executor.submit(self.ask, system_msg, question)
+
+    def close(self):
+        self.executor.shutdown()
+
+    def statistics(self):
+        statistics = (f"{self.requests_count} requests ({self.retries_count} retries), "
+                      f"{self.prompt_tokens} prompt tokens, {self.completion_tokens} completion tokens, "
+                      f"waited {self.rate_limit_wait_time:.0f} s for rate limits")
+        if self.answer_cache:
+            statistics += f", {self.answer_cache.statistics()}"
+        return statistics
+
+    def _backoff_time(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        return min(2 ** attempt, self.max_backoff) * (0.5 + random.random())
+
+    def ask(self, system_msg, question):
+        """Ask a question and wait for the answer.
+        :return: Answer text.
+        :raises RuntimeError: if no valid answer is received.
+        """
+        if callable(system_msg):
+            system_msg = system_msg()
+        cache_key = None
+        if self.answer_cache:
+            cache_key = AnswerCache.answer_key(self.model, system_msg, question)
+            answer = self.answer_cache.get(cache_key)
+            if answer is not None:
+                return answer
+
+        data = {
+            "messages": [
+                {"role": "system", "content": system_msg},
+                {"role": "user", "content": question}
+                ],
+            "model": self.model,
+            "max_tokens": None,
+            "temperature": 1,
+            "top_p": 0.9,
+            "stream": False
+            }
+        estimated_tokens = estimate_tokens(system_msg) + estimate_tokens(question) + ESTIMATED_COMPLETION_TOKENS
+
+        for attempt in range(self.max_retries + 1):
+            wait_time = self.request_limiter.acquire()
+            if self.token_limiter:
+                wait_time += self.token_limiter.acquire(estimated_tokens)
+            with self._lock:
+                self.rate_limit_wait_time += wait_time
+                self.requests_count += 1
+                if attempt:
+                    self.retries_count += 1
+            try:
+                response = self.session.post(self.url, json=data, timeout=self.timeout)
+            except requests.RequestException as exc:
+                if self.token_limiter:
+                    self.token_limiter.adjust(-estimated_tokens)
+                if attempt == self.max_retries:
+                    raise RuntimeError(f"Error or unexpected response: {exc}") from exc
+                time.sleep(self._backoff_time(attempt))
+                continue
+
+            if response.status_code == 429 or response.status_code >= 500:
+                # Rejected requests do not use the token budget
+                if self.token_limiter:
+                    self.token_limiter.adjust(-estimated_tokens)
+                if attempt < self.max_retries:
+                    time.sleep(self._backoff_time(attempt, response))
+                    continue
+
+            try:
+                result = response.json()
+            except ValueError:
+                result = None
+            if not isinstance(result, dict):
+                result = {}
+            usage = result.get("usage") or {}
+            with self._lock:
+                self.prompt_tokens += usage.get("prompt_tokens", 0)
+                self.completion_tokens += usage.get("completion_tokens", 0)
+            if self.token_limiter and response.ok:
+                used_tokens = usage.get("total_tokens")
+                if used_tokens is not None:
+                    self.token_limiter.adjust(used_tokens - estimated_tokens)
+
+            try:
+                answer = result["choices"][0]["message"]["content"]
+            except (KeyError, IndexError, TypeError):
+                print(f"Response status code: {response.status_code}", file=sys.stderr)
+                print(f"Response content: {response.text}", file=sys.stderr)
+                error = result.get("error") if isinstance(result, dict) else None
+                message = error.get("message") if isinstance(error, dict) else f"Error {response.status_code}: {response.text}"
+                raise RuntimeError(f"Error or unexpected response: {message}")
+            if cache_key and isinstance(answer, str):
+                self.answer_cache.put(cache_key, answer, usage.get("total_tokens", estimated_tokens))
+            return answer
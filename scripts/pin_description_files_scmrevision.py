@@ -1,13 +1,23 @@
 """
 Python 3.x CLI for pinning extension description files.
+
+Branch and tag names in ``scm_revision`` (``scmrevision`` in legacy .s4ext files) are replaced by the SHA
+of the commit they currently refer to. Revisions are resolved using ``git ls-remote``, which works for
+repositories hosted anywhere, or optionally using the GitHub REST API.
 """
 
+import argparse
+import concurrent.futures
 import glob
 import json
 import os
 import sys
+import threading
+import time
 from urllib.parse import urlparse
-from urllib.request import urlopen, HTTPError, Request
+
+from git_refs import GitRefResolveError, GitRefResolver, is_commit_sha
+from update_description_files import FieldChange, update_description_file
 
 
 def parse_s4ext(ext_file_path):
@@ -84,37 +94,177 @@ def update_s4ext(ext_file_path, metadata=None):
         return False
 
 
-def _gh_request(path, headers=None):
+def parse_json_description(ext_file_path):
+    """Parse a Slicer extension description file in JSON format.
+
+    :param ext_file_path: Path to a Slicer extension description file (.json).
+    :return: Dictionary of extension metadata.
+    """
     try:
-        # GitHub throttles down requests without a personal access token
-        # Request yours under GitHub "Settings / Developer settings / Personal access tokens"
-        token = os.environ.get("GITHUB_TOKEN", None)
-
-        if headers is None:
-            headers = {}
-        if "Authorization" not in headers and token is not None:
-            headers["Authorization"] = f"token {token}"
-
-        url = f"https://api.github.com/{path}"
-        request = Request(url, headers=headers)
-        response = urlopen(request)
-        return json.loads(response.read())
-
-    except HTTPError as exc:
-        error_msg = exc.read().decode("utf-8")
-        print(f"Failed to retrieve information from GitHub using {url}")
-        print(f"GitHub API Response: {error_msg}")
+        with open(ext_file_path, encoding="utf-8") as ext_file:
+            return json.load(ext_file)
+
+    except FileNotFoundError:
+        print(f"Failed to parse {ext_file_path}: File not found")
         return None
 
     except Exception as exc:
-        print(f"An error occurred: {exc}")
+        print(f"An error occurred while parsing {ext_file_path}: {exc}")
         return None
 
 
-def parse_scmurl(scmurl):
+def update_json_scm_revision(ext_file_path, scm_revision):
+    """Update ``scm_revision`` in a Slicer extension description file in JSON format.
+
+    Formatting of the file is preserved (see :func:`update_description_files.update_description_file`).
+    :param ext_file_path: Path to a Slicer extension description file (.json).
+    :return: True if the file was updated without error.
+    """
+    try:
+        update_description_file(ext_file_path, [FieldChange("scm_revision", scm_revision)])
+        return True
+
+    except FileNotFoundError:
+        print(f"Failed to update {ext_file_path}: File not found")
+        return False
+
+    except Exception as exc:
+        print(f"An error occurred while updating {ext_file_path}: {exc}")
+        return False
+
+
+class GitHubRequestError(RuntimeError):
+    """Exception raised when information could not be retrieved from GitHub."""
+    pass
+
+
+class GitHubSession:
+    """HTTP session for GitHub REST API requests, shared by all worker threads.
+
+    Connections are kept alive and reused. Requests are paced using the ``X-RateLimit-Remaining`` and
+    ``X-RateLimit-Reset`` response headers, so that the remaining quota is spread until the reset time
+    instead of being exhausted. Requests rejected by primary or secondary rate limits (403/429) are retried
+    with exponential backoff (or after the time requested in the ``Retry-After`` header).
+
+    :param token: GitHub access token. Default is the value of the ``GITHUB_TOKEN`` environment variable.
+    :param max_workers: Number of threads that use the session (size of the connection pool).
+    :param max_retries: Number of times a failed request is retried.
+    :param max_wait: Maximum time (in seconds) to wait before retrying a request.
+    """
+
+    def __init__(self, token=None, max_workers=8, max_retries=5, max_wait=300, api_url="https://api.github.com"):
+        # Only required for the GitHub API, pinning with git ls-remote works without it
+        import requests
+
+        # GitHub throttles down requests without a personal access token
+        # Request yours under GitHub "Settings / Developer settings / Personal access tokens"
+        token = token if token is not None else os.environ.get("GITHUB_TOKEN", None)
+        self.api_url = api_url.rstrip("/")
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Accept"] = "application/vnd.github+json"
+        if token:
+            self.session.headers["Authorization"] = f"token {token}"
+        self._lock = threading.Lock()
+        self.rate_limit_remaining = None
+        self.rate_limit_reset = None
+        self._next_request_time = 0
+
+    def _pace(self):
+        """Wait before sending a request so that the remaining quota lasts until the rate limit reset."""
+        with self._lock:
+            now = time.time()
+            delay = 0
+            if self.rate_limit_remaining is not None and self.rate_limit_reset is not None:
+                time_to_reset = self.rate_limit_reset - now
+                if time_to_reset > 0:
+                    if self.rate_limit_remaining <= 0:
+                        delay = time_to_reset + 1
+                    elif self.rate_limit_remaining < self.max_workers:
+                        # Running low, space out requests evenly until the reset
+                        delay = max(self._next_request_time - now, 0)
+                        self._next_request_time = max(self._next_request_time, now) + time_to_reset / self.rate_limit_remaining
+                        self.rate_limit_remaining -= 1
+        if delay > self.max_wait:
+            raise GitHubRequestError(f"GitHub API rate limit exceeded, it will be reset in {delay:.0f} seconds")
+        if delay > 0:
+            time.sleep(delay)
+
+    def _update_rate_limit(self, response):
+        with self._lock:
+            if "X-RateLimit-Remaining" in response.headers:
+                self.rate_limit_remaining = int(response.headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Reset" in response.headers:
+                self.rate_limit_reset = int(response.headers["X-RateLimit-Reset"])
+
+    def _retry_delay(self, response, attempt):
+        if response is not None and "Retry-After" in response.headers:
+            return int(response.headers["Retry-After"])
+        if response is not None and response.headers.get("X-RateLimit-Remaining") == "0":
+            return max(int(response.headers.get("X-RateLimit-Reset", 0)) - time.time() + 1, 0)
+        return 2 ** attempt
+
+    def get_json(self, path):
+        """Send a GET request to the GitHub API and return the decoded JSON response.
+
+        :param path: API path, such as ``repos/{owner}/{repo}/commits/{branch}``.
+        :raises GitHubRequestError: if the information could not be retrieved.
+        """
+        import requests
+
+        url = f"{self.api_url}/{path}"
+        for attempt in range(self.max_retries + 1):
+            self._pace()
+            response = None
+            try:
+                response = self.session.get(url, timeout=30)
+            except requests.RequestException as exc:
+                error_msg = str(exc)
+            else:
+                self._update_rate_limit(response)
+                if response.ok:
+                    return response.json()
+                error_msg = response.text
+                if response.status_code not in (403, 429) and response.status_code < 500:
+                    break
+            if attempt == self.max_retries:
+                break
+            delay = self._retry_delay(response, attempt)
+            if delay > self.max_wait:
+                break
+            time.sleep(delay)
+        raise GitHubRequestError(
+            f"Failed to retrieve information from GitHub using {url}\nGitHub API Response: {error_msg}")
+
+    def resolve(self, scm_url, revision):
+        """Get the SHA of the commit that ``revision`` refers to, using the GitHub API.
+
+        If ``revision`` is empty then the default branch of the repository is resolved.
+        :return: Commit SHA, or None if the repository is not hosted on GitHub.
+        :raises GitHubRequestError: if the information could not be retrieved.
+        """
+        result = parse_scmurl(scm_url, log=lambda *args: None)
+        if result is None or "github.com" not in result[0]:
+            return None
+        _, owner, repo = result
+        try:
+            if not revision:
+                revision = self.get_json(f"repos/{owner}/{repo}")["default_branch"]
+            return self.get_json(f"repos/{owner}/{repo}/commits/{revision}")["sha"]
+        except (KeyError, TypeError) as exc:
+            raise GitHubRequestError(f"Unexpected GitHub API response for {owner}/{repo} revision '{revision}': {exc!r}")
+
+
+def parse_scmurl(scmurl, log=print):
     """Parse Source Control URL and return host, owner and repo.
 
     :param url: Source Control URL.
+    :param log: Function used for printing messages.
     :return: tuple ``(host, owner, repo)`` or None if the URL can not be parsed.
     """
     try:
@@ -138,7 +288,7 @@ def parse_scmurl(scmurl):
         return (result.netloc, owner, repo)
 
     except Exception as exc:
-        print(f"An error occurred while parsing {scmurl}: {exc}")
+        log(f"An error occurred while parsing {scmurl}: {exc}")
         return None
 
 
@@ -149,92 +299,188 @@ class ExtensionProcessingError(RuntimeError):
     pass
 
 
-def pin_s4ext(ext_file_path):
-    """Update ``ext_file_path`` pinning scmrevision to the latest commit associated with
-    the corresponding branch.
+def pin_description_file(ext_file_path, resolver=None, dry_run=False, log=print):
+    """Update ``ext_file_path`` pinning scm revision to the latest commit associated with
+    the corresponding branch or tag.
+
+    Both JSON (``scm_url``, ``scm_revision``) and legacy s4ext (``scmurl``, ``scmrevision``) description
+    files are supported. Revisions that are already full commit SHAs are not changed.
 
     :param ext_file_path: Path to a Slicer extension description file.
-    :return: True if the file was pinned.
+    :param resolver: :class:`git_refs.GitRefResolver` or :class:`GitHubSession` used for getting commit SHAs.
+      A new :class:`git_refs.GitRefResolver` is created if not specified.
+    :param dry_run: If True then the planned change is printed but the file is not modified.
+    :param log: Function used for printing messages.
+    :return: True if the file was pinned (or would be pinned, in dry run mode).
     :raises ExtensionProcessingError: if there was an error processing the decription file.
     """
-    metadata = parse_s4ext(ext_file_path)
+    is_json = os.path.splitext(ext_file_path)[1] == ".json"
+    if is_json:
+        metadata = parse_json_description(ext_file_path)
+        scmurl_key, scmrevision_key = "scm_url", "scm_revision"
+    else:
+        metadata = parse_s4ext(ext_file_path)
+        scmurl_key, scmrevision_key = "scmurl", "scmrevision"
     if metadata is None:
         raise ExtensionProcessingError(ext_file_path)
 
-    scmurl = metadata["scmurl"]
-    scmrevision = metadata["scmrevision"]
+    scmurl = metadata.get(scmurl_key)
+    scmrevision = metadata.get(scmrevision_key) or ""
 
-    print("Parsed metadata:")
-    print(f" - scmurl      : {scmurl}")
-    print(f" - scmrevision : {scmrevision}")
+    log("Parsed metadata:")
+    log(f" - scmurl      : {scmurl}")
+    log(f" - scmrevision : {scmrevision}")
 
-    result = parse_scmurl(scmurl)
-    if result is None:
+    if not scmurl:
         raise ExtensionProcessingError(ext_file_path)
 
-    host, owner, repo = result
-    print(f" - host        : {host}")
-    print(f" - owner       : {owner}")
-    print(f" - repo        : {repo}")
+    if resolver is None:
+        resolver = GitRefResolver()
+    if isinstance(resolver, GitHubSession):
+        # The GitHub API needs the repository owner and name. git ls-remote accepts any git URL or local path.
+        result = parse_scmurl(scmurl, log=log)
+        if result is None:
+            raise ExtensionProcessingError(ext_file_path)
+        host, owner, repo = result
+        log(f" - host        : {host}")
+        log(f" - owner       : {owner}")
+        log(f" - repo        : {repo}")
 
-    if "github.com" not in host:
-        return
+    if is_commit_sha(scmrevision):
+        return False
 
-    updated_metadata = {}
+    try:
+        git_sha = resolver.resolve(scmurl, scmrevision)
+    except (GitRefResolveError, GitHubRequestError) as exc:
+        log(str(exc))
+        raise ExtensionProcessingError(ext_file_path)
+    if git_sha is None:
+        # Repository is not supported by the resolver
+        return False
 
-    pinned = False
+    log("Pinning scmrevision to latest commit:")
+    log(f" - branch       : {scmrevision}")
+    log(f" - latest commit: {git_sha}")
 
-    if scmrevision == "master":
-        branch = scmrevision
+    if dry_run:
+        log(f"Planned change: scmrevision {scmrevision} -> {git_sha}")
+        return True
 
-        # Use GitHub API to get the latest commit
-        commit_info = _gh_request(f"repos/{owner}/{repo}/commits/{branch}")
-        if commit_info is None:
-            raise ExtensionProcessingError(ext_file_path)
-        git_sha = commit_info["sha"]
-        updated_metadata["scmrevision"] = git_sha
+    if is_json:
+        updated = update_json_scm_revision(ext_file_path, git_sha)
+    else:
+        updated = update_s4ext(ext_file_path, {"scmrevision": git_sha})
+    if not updated:
+        raise ExtensionProcessingError(ext_file_path)
 
-        print("Pinning scmrevision to latest commit:")
-        print(f" - branch       : {branch}")
-        print(f" - latest commit: {git_sha}")
+    return True
 
-        pinned = True
 
-    if not update_s4ext(ext_file_path, updated_metadata):
-        raise ExtensionProcessingError(ext_file_path)
+def _scm_url_revision(ext_file_path):
+    """Get ``(scm_url, scm_revision)`` of a description file, without printing errors."""
+    try:
+        if os.path.splitext(ext_file_path)[1] == ".json":
+            with open(ext_file_path, encoding="utf-8") as ext_file:
+                metadata = json.load(ext_file)
+            return metadata.get("scm_url"), metadata.get("scm_revision") or ""
+        metadata = {}
+        with open(ext_file_path) as ext_file:
+            for line in ext_file:
+                fields = line.strip().split(" ", 1)
+                if len(fields) == 2 and not line.startswith("#"):
+                    metadata[fields[0]] = fields[1].strip()
+        return metadata.get("scmurl"), metadata.get("scmrevision") or ""
+    except Exception:
+        return None, None
+
+
+def pin_description_files(ext_file_paths, resolver=None, jobs=8, dry_run=False):
+    """Pin extension description files in parallel and print the log of each file in input order.
+
+    If the resolver supports it, revisions of all files are resolved up front in a few batched calls.
+    :param ext_file_paths: List of paths of Slicer extension description files.
+    :param jobs: Number of files processed in parallel.
+    :return: Tuple of list of pinned files and list of files that failed to be pinned.
+    """
+    if resolver is None:
+        resolver = GitRefResolver(max_workers=jobs)
+
+    if hasattr(resolver, "prefetch"):
+        url_revisions = [_scm_url_revision(ext_file_path) for ext_file_path in ext_file_paths]
+        resolver.prefetch([(scm_url, scm_revision) for scm_url, scm_revision in url_revisions if scm_url])
+
+    def pin_with_log(ext_file_path):
+        messages = []
 
-    return pinned
+        def log(*args):
+            messages.append(" ".join(str(arg) for arg in args))
+
+        try:
+            pinned = pin_description_file(ext_file_path, resolver, dry_run=dry_run, log=log)
+            return pinned, None, messages
+        except ExtensionProcessingError as exc:
+            return False, exc, messages
+
+    pinned = []
+    failed_pinned = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        for ext_file_path, (ext_pinned, exc, messages) in zip(
+                ext_file_paths, executor.map(pin_with_log, ext_file_paths)):
+            print("")
+            print("Processing " + ext_file_path)
+            for message in messages:
+                print(message)
+            if ext_pinned:
+                pinned.append(ext_file_path)
+            if exc is not None:
+                failed_pinned.append(str(exc))
+
+    return pinned, failed_pinned
 
 
 def main():
-    # loop over all s4ext in the input directory
-    if len(sys.argv) == 1:
+    parser = argparse.ArgumentParser(
+        description="Replace branch and tag names in scm revision of extension description files with the hash "
+        "of the commit they refer to at the time script is run.")
+    parser.add_argument("description_files", nargs="*",
+                        help="List of description files (.json or .s4ext) to pin. "
+                        "Pass 'all' to pin all of the description files in the current directory.")
+    parser.add_argument("-j", "--jobs", type=int, default=8,
+                        help="Number of description files processed in parallel (default: 8).")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Print the planned scmrevision changes without modifying the files.")
+    parser.add_argument("--resolver", choices=["ls-remote", "github-api"], default="ls-remote",
+                        help="Method of getting commit hashes: 'git ls-remote' works for any git host (default), "
+                        "'github-api' uses the GitHub REST API and only pins repositories hosted on GitHub.")
+    args = parser.parse_args()
+
+    # loop over all description files in the input directory
+    if not args.description_files:
         print(
-            "Running this script will replace all occurrences of 'master' for scmrevision\n\
-          with the master hash at the time script is run for the repositories hosted on GitHub.\n\
-          To do this for all of the s4ext files in the current directory, pass 'all' as the argument.\n\
-          To replace in specific s4ext files, pass the list of files separated by spaces."
+            "Running this script will replace all branch and tag names in scmrevision\n\
+          with the corresponding commit hash at the time script is run.\n\
+          To do this for all of the description files in the current directory, pass 'all' as the argument.\n\
+          To replace in specific description files, pass the list of files separated by spaces."
         )
         sys.exit(1)
-    elif sys.argv[1] == "all":
-        s4extFileNames = glob.glob("*.s4ext")
+    elif args.description_files == ["all"]:
+        descriptionFileNames = sorted(glob.glob("*.json") + glob.glob("*.s4ext"))
     else:
-        s4extFileNames = sys.argv[1:]
+        descriptionFileNames = args.description_files
 
-    pinned = []
-    failed_pinned = []
+    if args.resolver == "github-api":
+        resolver = GitHubSession(max_workers=args.jobs)
+    else:
+        resolver = GitRefResolver(max_workers=args.jobs)
 
-    for s4extName in s4extFileNames:
-        print("")
-        print("Processing " + s4extName)
-        try:
-            if pin_s4ext(s4extName):
-                pinned.append(s4extName)
-        except ExtensionProcessingError as exc:
-            failed_pinned.append(str(exc))
+    pinned, failed_pinned = pin_description_files(
+        descriptionFileNames, resolver=resolver, jobs=args.jobs, dry_run=args.dry_run)
 
     print("")
-    print(f"Pinned {len(pinned)} of {len(s4extFileNames)} description files.")
+    if args.dry_run:
+        print(f"Would pin {len(pinned)} of {len(descriptionFileNames)} description files.")
+    else:
+        print(f"Pinned {len(pinned)} of {len(descriptionFileNames)} description files.")
 
     if len(failed_pinned) > 0:
         print("")
@@ -0,0 +1,257 @@
+"""
+Helpers for getting working copies of extension source repositories.
+
+:func:`clone_revision` downloads only the single requested commit of a repository (shallow fetch).
+Both :func:`clone_revision` and :class:`RepositoryCache` can restrict the checked out files to a list of
+patterns (sparse checkout), so that large files that are not needed for analysis are not written to disk.
+
+Cloning an extension repository repeatedly downloads the same content every time. :class:`RepositoryCache` keeps
+a bare mirror of each repository (keyed by ``scm_url``) in a local cache folder, updates it with
+``git fetch`` only, and creates working copies from it using ``git clone --shared``, which does not copy
+any objects. Mirrors that have not been used recently are evicted when the total size of the cache exceeds
+the configured disk budget.
+
+Example::
+
+    cache = RepositoryCache("/tmp/slicer-extensions-cache", max_size_mb=2000)
+    cache.checkout("https://github.com/Slicer/SlicerHeart.git", "main", "/tmp/SlicerHeart")
+    ...
+    cache.evict()
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import stat
+import subprocess
+import threading
+import time
+import urllib.parse as urlparse
+
+from folder_size import scan_folder_size
+
+
+DEFAULT_CACHE_SIZE_MB = 5000
+
+# Name of the file that stores cache information (URL, size, last use time) in each mirror folder
+MIRROR_INFO_FILENAME = "slicer-repository-cache.json"
+
+
+def _run_git(args, cwd=None, timeout=300):
+    return subprocess.run(
+        ['git'] + args, cwd=cwd,
+        check=True, capture_output=True, text=True, timeout=timeout)
+
+
+def _remove_readonly(func, path, exc_info):
+    """Error handler for Windows readonly files"""
+    try:
+        if os.path.exists(path):
+            os.chmod(path, stat.S_IWRITE)
+            func(path)
+    except Exception:
+        pass  # Ignore errors in the error handler
+
+
+def configure_sparse_checkout(repository_folder, sparse_paths):
+    """Restrict the files that are checked out in ``repository_folder`` to ``sparse_paths``.
+
+    Must be called before the revision is checked out.
+    :param sparse_paths: List of patterns in gitignore format, such as ``/CMakeLists.txt`` or ``*.py``.
+    """
+    _run_git(['config', 'core.sparseCheckout', 'true'], cwd=repository_folder)
+    info_folder = os.path.join(repository_folder, '.git', 'info')
+    os.makedirs(info_folder, exist_ok=True)
+    with open(os.path.join(info_folder, 'sparse-checkout'), 'w') as sparse_checkout_file:
+        sparse_checkout_file.write("".join(f"{path}\n" for path in sparse_paths))
+
+
+def clone_revision(scm_url, scm_revision, destination, clone_filter=None, sparse_paths=None, timeout=300):
+    """Create a working copy of ``scm_url`` at ``scm_revision`` in ``destination`` without downloading history.
+
+    If ``scm_revision`` is set (commit SHA, branch or tag name) then only that commit is fetched
+    (``git init`` + ``git fetch --depth 1 origin <scm_revision>``). If the server refuses to provide the commit
+    (for example, the revision is an abbreviated SHA) then the full repository is cloned instead.
+    If ``scm_revision`` is not set then the default branch is cloned with ``--depth 1``.
+
+    :param clone_filter: Optional partial clone filter (for example ``blob:none``). Filtered objects are
+      downloaded on demand by git when they are needed for the checkout.
+    :param sparse_paths: Optional list of patterns (gitignore format). If specified then only matching files
+      are written to the working tree, but the full tree is still available in the git object database.
+    :return: Name of the strategy that was used: ``shallow fetch``, ``full clone`` or ``shallow clone``.
+    :raises subprocess.CalledProcessError: if git failed to get the repository.
+    """
+    filter_args = [f'--filter={clone_filter}'] if clone_filter else []
+    if not scm_revision:
+        if sparse_paths is None:
+            _run_git(['clone', '--depth', '1'] + filter_args + [scm_url, destination], timeout=600)
+        else:
+            _run_git(['clone', '--depth', '1', '--no-checkout'] + filter_args + [scm_url, destination], timeout=600)
+            configure_sparse_checkout(destination, sparse_paths)
+            _run_git(['checkout', '--detach', 'HEAD'], cwd=destination, timeout=timeout)
+        return "shallow clone"
+
+    try:
+        _run_git(['init', '--quiet', destination])
+        _run_git(['remote', 'add', 'origin', scm_url], cwd=destination)
+        if clone_filter:
+            _run_git(['config', 'remote.origin.promisor', 'true'], cwd=destination)
+            _run_git(['config', 'remote.origin.partialclonefilter', clone_filter], cwd=destination)
+        if sparse_paths is not None:
+            configure_sparse_checkout(destination, sparse_paths)
+        _run_git(['fetch', '--depth', '1', '--no-tags'] + filter_args + ['origin', scm_revision],
+                 cwd=destination, timeout=timeout)
+        _run_git(['checkout', '--detach', 'FETCH_HEAD'], cwd=destination, timeout=timeout)
+        return "shallow fetch"
+    except subprocess.CalledProcessError:
+        # The server refused to fetch the revision directly, fall back to cloning the full history
+        shutil.rmtree(destination, onexc=_remove_readonly)
+
+    _run_git(['clone', '--no-checkout'] + filter_args + [scm_url, destination], timeout=timeout)
+    if sparse_paths is not None:
+        configure_sparse_checkout(destination, sparse_paths)
+    _run_git(['checkout', scm_revision], cwd=destination, timeout=timeout)
+    return "full clone"
+
+
+def _folder_size(folder):
+    return scan_folder_size(folder).total_bytes
+
+
+class RepositoryCache:
+    """Cache of bare repository mirrors with least-recently-used eviction.
+
+    :param cache_dir: Folder where the mirrors are stored. It is created if it does not exist.
+    :param max_size_mb: Disk budget of the cache. Least recently used mirrors are removed when it is exceeded.
+    """
+
+    def __init__(self, cache_dir, max_size_mb=DEFAULT_CACHE_SIZE_MB):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_size_mb = max_size_mb
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def mirror_path(self, scm_url):
+        """Return the folder of the bare mirror of ``scm_url``.
+
+        The folder name contains the repository name for readability and a hash of the URL for uniqueness.
+        """
+        normalized_url = scm_url.strip().rstrip("/")
+        repo_name = os.path.splitext(urlparse.urlsplit(normalized_url).path.split("/")[-1])[0]
+        repo_name = re.sub(r"[^A-Za-z0-9_.-]", "_", repo_name) or "repository"
+        url_hash = hashlib.sha1(normalized_url.encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"{repo_name}-{url_hash}.git")
+
+    def _lock(self, mirror_path):
+        with self._locks_lock:
+            if mirror_path not in self._locks:
+                self._locks[mirror_path] = threading.Lock()
+            return self._locks[mirror_path]
+
+    def update_mirror(self, scm_url, timeout=300):
+        """Create or update the bare mirror of ``scm_url``.
+
+        An existing mirror is only updated by ``git fetch``, therefore only new objects are downloaded.
+        :return: Path of the mirror folder.
+        :raises subprocess.CalledProcessError: if git failed to clone or fetch the repository.
+        """
+        mirror_path = self.mirror_path(scm_url)
+        with self._lock(mirror_path):
+            if os.path.isdir(mirror_path):
+                _run_git(['remote', 'set-url', 'origin', scm_url], cwd=mirror_path)
+                _run_git(['fetch', '--prune', '--tags', 'origin'], cwd=mirror_path, timeout=timeout)
+                self._update_default_branch(mirror_path, timeout=timeout)
+            else:
+                temporary_mirror_path = mirror_path + ".tmp"
+                if os.path.exists(temporary_mirror_path):
+                    # Leftover of an interrupted clone
+                    shutil.rmtree(temporary_mirror_path, onexc=_remove_readonly)
+                _run_git(['clone', '--mirror', scm_url, temporary_mirror_path], timeout=timeout)
+                os.replace(temporary_mirror_path, mirror_path)
+            self._write_mirror_info(mirror_path, scm_url)
+        return mirror_path
+
+    def _update_default_branch(self, mirror_path, timeout=300):
+        """Make HEAD of the mirror follow the default branch of the remote repository."""
+        try:
+            result = _run_git(['ls-remote', '--symref', 'origin', 'HEAD'], cwd=mirror_path, timeout=timeout)
+        except subprocess.CalledProcessError:
+            return
+        # Expected output: "ref: refs/heads/main\tHEAD"
+        for line in result.stdout.splitlines():
+            if line.startswith("ref: ") and line.endswith("\tHEAD"):
+                _run_git(['symbolic-ref', 'HEAD', line[len("ref: "):-len("\tHEAD")]], cwd=mirror_path)
+                break
+
+    def checkout(self, scm_url, scm_revision, destination, sparse_paths=None, timeout=300):
+        """Create a working copy of ``scm_url`` at ``scm_revision`` in ``destination``.
+
+        The working copy shares the objects of the mirror (``git clone --shared``), so no history
+        is copied or downloaded. If ``scm_revision`` is empty then the default branch is checked out.
+        If ``sparse_paths`` is specified then only matching files are written to the working tree
+        (see :func:`configure_sparse_checkout`).
+        The working copy must not be used after the mirror is evicted, therefore :meth:`evict` is
+        not called here but when all working copies are removed.
+        :raises subprocess.CalledProcessError: if git failed to fetch or check out the repository.
+        """
+        mirror_path = self.update_mirror(scm_url, timeout=timeout)
+        if scm_revision or sparse_paths is not None:
+            _run_git(['clone', '--shared', '--no-checkout', mirror_path, destination], timeout=timeout)
+            if sparse_paths is not None:
+                configure_sparse_checkout(destination, sparse_paths)
+            if scm_revision:
+                _run_git(['checkout', scm_revision], cwd=destination, timeout=timeout)
+            else:
+                _run_git(['checkout', '--detach', 'HEAD'], cwd=destination, timeout=timeout)
+        else:
+            _run_git(['clone', '--shared', mirror_path, destination], timeout=timeout)
+        _run_git(['remote', 'set-url', 'origin', scm_url], cwd=destination)
+
+    def _write_mirror_info(self, mirror_path, scm_url):
+        info = {
+            "scm_url": scm_url,
+            "size_bytes": _folder_size(mirror_path),
+            "last_used": time.time(),
+            }
+        with open(os.path.join(mirror_path, MIRROR_INFO_FILENAME), "w") as info_file:
+            json.dump(info, info_file)
+
+    def _read_mirror_info(self, mirror_path):
+        try:
+            with open(os.path.join(mirror_path, MIRROR_INFO_FILENAME)) as info_file:
+                return json.load(info_file)
+        except (OSError, ValueError):
+            # Unknown or corrupted mirror, consider it to be the least recently used
+            return {"size_bytes": _folder_size(mirror_path), "last_used": 0}
+
+    def mirrors(self):
+        """Return list of ``(mirror_path, info)`` tuples, least recently used first."""
+        mirrors = []
+        for filename in os.listdir(self.cache_dir):
+            mirror_path = os.path.join(self.cache_dir, filename)
+            if not filename.endswith(".git") or not os.path.isdir(mirror_path):
+                continue
+            mirrors.append((mirror_path, self._read_mirror_info(mirror_path)))
+        mirrors.sort(key=lambda mirror: mirror[1].get("last_used", 0))
+        return mirrors
+
+    def evict(self):
+        """Remove least recently used mirrors until the cache size is within the disk budget.
+
+        :return: List of removed mirror folders.
+        """
+        max_size_bytes = self.max_size_mb * 1024 * 1024
+        mirrors = self.mirrors()
+        total_size_bytes = sum(info.get("size_bytes", 0) for _, info in mirrors)
+        removed_mirrors = []
+        for mirror_path, info in mirrors:
+            if total_size_bytes <= max_size_bytes:
+                break
+            with self._lock(mirror_path):
+                shutil.rmtree(mirror_path, onexc=_remove_readonly)
+            total_size_bytes -= info.get("size_bytes", 0)
+            removed_mirrors.append(mirror_path)
+        return removed_mirrors
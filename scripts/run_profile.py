@@ -0,0 +1,188 @@
+"""
+Timing and counters of a validation run, for finding out where the time goes.
+
+:class:`RunProfiler` records a span (start time, duration, thread) for each check of each extension, and for
+run-wide steps such as prefetching repository metadata. Code that runs inside a span can increment counters
+of the span with :func:`add_counter`, without access to the profiler, for example::
+
+    profiler = RunProfiler()
+    with profiler.span("check_json_schema", extension_name="SlicerHeart"):
+        add_counter("http_requests")
+        add_counter("bytes_downloaded", len(response.content))
+    profiler.write_profile("profile.json")  # or profile.csv
+    profiler.write_chrome_trace("trace.json")  # open in chrome://tracing or https://ui.perfetto.dev
+
+Counters are tracked with a context variable, therefore work submitted to a thread pool is counted
+in the span that submitted it if the function is wrapped with :func:`bind_span`.
+"""
+
+import contextvars
+import csv
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Counters of the innermost active span, shared with the threads that the span's work is submitted to
+_active_counters = contextvars.ContextVar("active_counters", default=None)
+_counters_lock = threading.Lock()
+
+
+def add_counter(name, value=1):
+    """Increment a counter of the active span. Does nothing if no span is active."""
+    counters = _active_counters.get()
+    if counters is None:
+        return
+    with _counters_lock:
+        counters[name] = counters.get(name, 0) + value
+
+
+def bind_span(function):
+    """Get a function that runs ``function`` in the current context, so that its counters go to the active span.
+    Use this when submitting work to a thread pool.
+    """
+    context = contextvars.copy_context()
+
+    def run_in_context(*args, **kwargs):
+        # A context cannot be entered by several threads at the same time, therefore each call uses a copy
+        return context.copy().run(function, *args, **kwargs)
+    return run_in_context
+
+
+class ProfileSpan:
+    """Timing and counters of one step of the validation run."""
+
+    def __init__(self, name, extension_name, category, start, thread_name):
+        self.name = name
+        self.extension_name = extension_name
+        self.category = category
+        self.start = start  # seconds since the start of the run
+        self.duration = None
+        self.thread_name = thread_name
+        self.success = None
+        self.counters = {}
+        self.attributes = {}
+
+    def to_dict(self):
+        return {
+            "extension": self.extension_name,
+            "name": self.name,
+            "category": self.category,
+            "start": round(self.start, 6),
+            "duration": round(self.duration, 6) if self.duration is not None else None,
+            "thread": self.thread_name,
+            "success": self.success,
+            "counters": dict(self.counters),
+            "attributes": dict(self.attributes),
+            }
+
+
+class RunProfiler:
+    """Collects :class:`ProfileSpan` records of a validation run. Thread-safe."""
+
+    CSV_FIELDS = ["extension", "name", "category", "start", "duration", "thread", "success"]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._start_time = time.perf_counter()
+        self.start_timestamp = time.time()
+        self.spans = []
+
+    @contextmanager
+    def span(self, name, extension_name=None, category="check", **attributes):
+        """Record duration and counters of the code in the ``with`` block.
+
+        :param attributes: Additional information stored with the span, such as the host of a repository.
+        :return: Context manager that yields the :class:`ProfileSpan`. Its ``success`` attribute can be set
+          in the block. It is set to False if the block raises an exception.
+        """
+        start_time = time.perf_counter()
+        span = ProfileSpan(name, extension_name, category, start_time - self._start_time,
+                           threading.current_thread().name)
+        span.attributes.update(attributes)
+        token = _active_counters.set(span.counters)
+        try:
+            yield span
+        except BaseException:
+            span.success = False
+            raise
+        finally:
+            _active_counters.reset(token)
+            span.duration = time.perf_counter() - start_time
+            with self._lock:
+                self.spans.append(span)
+
+    def _sorted_spans(self):
+        with self._lock:
+            return sorted(self.spans, key=lambda span: span.start)
+
+    def summary(self):
+        """Get total time and counters grouped by check name, by extension and by repository host."""
+        groups = {"by_name": {}, "by_extension": {}, "by_host": {}}
+        for span in self._sorted_spans():
+            for group_name, key in (("by_name", span.name), ("by_extension", span.extension_name),
+                                    ("by_host", span.attributes.get("host"))):
+                if key is None:
+                    continue
+                group = groups[group_name].setdefault(key, {"count": 0, "total_time": 0.0, "max_time": 0.0, "counters": {}})
+                group["count"] += 1
+                group["total_time"] += span.duration
+                group["max_time"] = max(group["max_time"], span.duration)
+                for counter_name, value in span.counters.items():
+                    group["counters"][counter_name] = group["counters"].get(counter_name, 0) + value
+        for group in groups.values():
+            for entry in group.values():
+                entry["total_time"] = round(entry["total_time"], 6)
+                entry["max_time"] = round(entry["max_time"], 6)
+        return groups
+
+    def write_profile(self, file_path):
+        """Write all spans to a JSON file, or to a CSV file if ``file_path`` ends with ``.csv``.
+        Counters are written as ``counter.<name>`` columns in CSV files.
+        """
+        spans = self._sorted_spans()
+        if file_path.lower().endswith(".csv"):
+            counter_names = sorted({name for span in spans for name in span.counters})
+            with open(file_path, "w", newline="", encoding="utf-8") as profile_file:
+                writer = csv.writer(profile_file)
+                writer.writerow(self.CSV_FIELDS + [f"counter.{name}" for name in counter_names])
+                for span in spans:
+                    row = span.to_dict()
+                    writer.writerow([row[field] for field in self.CSV_FIELDS]
+                                    + [span.counters.get(name, "") for name in counter_names])
+            return
+        profile = {
+            "started": self.start_timestamp,
+            "total_time": round(time.perf_counter() - self._start_time, 6),
+            "spans": [span.to_dict() for span in spans],
+            "summary": self.summary(),
+            }
+        with open(file_path, "w", encoding="utf-8") as profile_file:
+            json.dump(profile, profile_file, indent=1)
+
+    def write_chrome_trace(self, file_path):
+        """Write spans in Chrome trace event format, which can be viewed in ``chrome://tracing`` or Perfetto."""
+        thread_ids = {}
+        events = []
+        for span in self._sorted_spans():
+            thread_id = thread_ids.setdefault(span.thread_name, len(thread_ids) + 1)
+            args = dict(span.attributes, **span.counters)
+            if span.extension_name:
+                args["extension"] = span.extension_name
+            if span.success is not None:
+                args["success"] = span.success
+            events.append({
+                "name": f"{span.extension_name}: {span.name}" if span.extension_name else span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": round(span.start * 1e6),
+                "dur": round(span.duration * 1e6),
+                "pid": os.getpid(),
+                "tid": thread_id,
+                "args": args,
+                })
+        events.extend({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": thread_id, "args": {"name": thread_name}}
+                      for thread_name, thread_id in thread_ids.items())
+        with open(file_path, "w", encoding="utf-8") as trace_file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file)
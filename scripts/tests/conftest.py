@@ -0,0 +1,147 @@
+"""
+Fixtures shared by the tests of the scripts: local git repositories and a local HTTP server.
+
+The tests do not access the network. Run them from the repository root with::
+
+    python -m pytest scripts/tests
+"""
+
+import os
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Scripts import their sibling modules directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_git(args, cwd=None):
+    return subprocess.run(['git'] + args, cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+class GitRepository:
+    """Bare repository with a working copy that is used for creating commits.
+
+    :param folder: Folder where the bare repository (``<name>.git``) and the working copy are created.
+    """
+
+    def __init__(self, folder, name="SlicerTest"):
+        self.path = os.path.join(folder, f"{name}.git")
+        self.url = "file://" + self.path
+        self.working_copy = os.path.join(folder, name)
+        run_git(['init', '--quiet', '--bare', '--initial-branch', 'main', self.path])
+        run_git(['clone', '--quiet', self.path, self.working_copy])
+        run_git(['checkout', '--quiet', '-B', 'main'], cwd=self.working_copy)
+
+    def commit(self, files, message="Update"):
+        """Write ``files`` (dictionary of relative path -> content), commit and push them to the bare repository.
+        :return: SHA of the new commit.
+        """
+        for relative_path, content in files.items():
+            path = os.path.join(self.working_copy, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as file:
+                file.write(content)
+        run_git(['add', '--all'], cwd=self.working_copy)
+        run_git(['commit', '--quiet', '-m', message], cwd=self.working_copy)
+        run_git(['push', '--quiet', 'origin', 'HEAD:main'], cwd=self.working_copy)
+        return run_git(['rev-parse', 'HEAD'], cwd=self.working_copy)
+
+    def tag(self, name, revision="HEAD"):
+        """Create an annotated tag and push it to the bare repository."""
+        run_git(['tag', '-a', '-m', name, name, revision], cwd=self.working_copy)
+        run_git(['push', '--quiet', 'origin', name], cwd=self.working_copy)
+
+
+@pytest.fixture
+def git_environment(monkeypatch):
+    """Run git without user and system configuration, with a fixed identity."""
+    monkeypatch.setenv("GIT_CONFIG_GLOBAL", os.devnull)
+    monkeypatch.setenv("GIT_CONFIG_NOSYSTEM", "1")
+    for variable in ("GIT_AUTHOR_NAME", "GIT_COMMITTER_NAME"):
+        monkeypatch.setenv(variable, "Test")
+    for variable in ("GIT_AUTHOR_EMAIL", "GIT_COMMITTER_EMAIL"):
+        monkeypatch.setenv(variable, "test@example.com")
+
+
+@pytest.fixture
+def git_repository(git_environment, tmp_path):
+    """Bare repository with two commits on ``main``; the first one is tagged ``v1.0``.
+
+    The SHAs of the commits are stored in the ``commits`` attribute, oldest first.
+    """
+    repository = GitRepository(str(tmp_path / "remote"))
+    repository.commits = [
+        repository.commit({"CMakeLists.txt": "project(Test)\n", "README.md": "# Test\n"}, "Initial commit"),
+        ]
+    repository.tag("v1.0")
+    repository.commits.append(repository.commit({"Test/Test.py": "print('test')\n"}, "Add module"))
+    return repository
+
+
+class Request:
+    def __init__(self, method, path, headers, body):
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.body = body
+
+
+class LocalHTTPServer:
+    """HTTP server on localhost that records requests and answers them using a response function.
+
+    :param respond: Function that gets a :class:`Request` and returns a tuple of
+      ``(status code, dictionary of headers, body bytes)``.
+    """
+
+    def __init__(self, respond):
+        self.requests = []
+        self._lock = threading.Lock()
+        server = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            def handle_request(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                request = Request(self.command, self.path, self.headers, body)
+                with server._lock:
+                    server.requests.append(request)
+                status, headers, body = respond(request)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            do_GET = do_HEAD = do_POST = handle_request
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), RequestHandler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def http_server():
+    """Factory of :class:`LocalHTTPServer` instances, which are stopped at the end of the test."""
+    servers = []
+
+    def start(respond):
+        server = LocalHTTPServer(respond)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
@@ -0,0 +1,57 @@
+import pytest
+
+from conftest import run_git
+from git_refs import GitRefResolveError, GitRefResolver, is_commit_sha
+
+
+def test_is_commit_sha():
+    assert is_commit_sha("0123456789abcdef0123456789ABCDEF01234567")
+    assert not is_commit_sha("0123456")
+    assert not is_commit_sha("main")
+    assert not is_commit_sha("")
+
+
+def test_resolve_branches_and_tags(git_repository):
+    resolver = GitRefResolver()
+    assert resolver.resolve(git_repository.url, "main") == git_repository.commits[1]
+    # Annotated tags are resolved to the tagged commit, not to the tag object
+    assert resolver.resolve(git_repository.url, "v1.0") == git_repository.commits[0]
+    # Empty revision means the default branch
+    assert resolver.resolve(git_repository.url, "") == git_repository.commits[1]
+    # Local paths are accepted as well
+    assert resolver.resolve(git_repository.path, "main") == git_repository.commits[1]
+
+
+def test_branches_take_precedence_over_tags(git_repository):
+    run_git(['branch', 'v1.0', 'main'], cwd=git_repository.working_copy)
+    run_git(['push', '--quiet', 'origin', 'refs/heads/v1.0'], cwd=git_repository.working_copy)
+    assert GitRefResolver().resolve(git_repository.url, "v1.0") == git_repository.commits[1]
+
+
+def test_commit_shas_are_not_resolved(git_repository):
+    resolver = GitRefResolver()
+    assert resolver.resolve(git_repository.url, git_repository.commits[0].upper()) == git_repository.commits[0]
+    assert resolver.ls_remote_count == 0
+
+
+def test_prefetch_lists_refs_once_per_repository(git_repository):
+    resolver = GitRefResolver()
+    resolver.prefetch([
+        (git_repository.url, "main"),
+        (git_repository.url, "v1.0"),
+        (git_repository.url, "missing"),
+        (git_repository.url, git_repository.commits[0]),
+        ])
+    assert resolver.ls_remote_count == 1
+    assert resolver.resolve(git_repository.url, "main") == git_repository.commits[1]
+    assert resolver.resolve(git_repository.url, "v1.0") == git_repository.commits[0]
+    # Errors are cached as well
+    with pytest.raises(GitRefResolveError, match="Revision 'missing' was not found"):
+        resolver.resolve(git_repository.url, "missing")
+    assert resolver.ls_remote_count == 1
+
+
+def test_inaccessible_repository(git_environment, tmp_path):
+    resolver = GitRefResolver()
+    with pytest.raises(GitRefResolveError, match="Failed to list refs"):
+        resolver.resolve("file://" + str(tmp_path / "missing.git"), "main")
@@ -0,0 +1,166 @@
+import json
+import re
+import time
+
+import pytest
+
+import github_metadata
+from github_metadata import MAX_REPOSITORIES_PER_QUERY, GitHubMetadataError, GitHubMetadataFetcher
+
+REPOSITORY_QUERY_PATTERN = re.compile(r'(r\d+): repository\(owner: "([^"]*)", name: "([^"]*)"\)')
+
+
+def graphql_repository(owner, repo):
+    return {
+        "nameWithOwner": f"{owner}/{repo}",
+        "isArchived": False,
+        "diskUsage": 100,
+        "defaultBranchRef": {"name": "main", "target": {"oid": "0" * 40}},
+        "repositoryTopics": {"nodes": [{"topic": {"name": "3d-slicer-extension"}}]},
+        }
+
+
+def graphql_response(request):
+    """Answer a GraphQL query of repositories. Repositories named ``Missing`` do not exist."""
+    data = {}
+    errors = []
+    for alias, owner, repo in REPOSITORY_QUERY_PATTERN.findall(json.loads(request.body)["query"]):
+        if repo == "Missing":
+            data[alias] = None
+            errors.append({"type": "NOT_FOUND", "path": [alias], "message": f"Could not resolve {owner}/{repo}"})
+        else:
+            data[alias] = graphql_repository(owner, repo)
+    result = {"data": data}
+    if errors:
+        result["errors"] = errors
+    return 200, {"Content-Type": "application/json"}, json.dumps(result).encode()
+
+
+def queried_repositories(request):
+    return [f"{owner}/{repo}" for _, owner, repo in REPOSITORY_QUERY_PATTERN.findall(json.loads(request.body)["query"])]
+
+
+def scm_url(owner, repo):
+    return f"https://github.com/{owner}/{repo}.git"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record waits of the fetcher instead of waiting."""
+    sleeps = []
+    monkeypatch.setattr(github_metadata.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def test_repositories_are_queried_in_batches(http_server):
+    server = http_server(graphql_response)
+    fetcher = GitHubMetadataFetcher(token="test", api_url=server.url)
+    scm_urls = [scm_url("Slicer", f"Slicer{index}") for index in range(MAX_REPOSITORIES_PER_QUERY + 50)]
+    # Repositories are only queried once, even if listed multiple times
+    fetcher.prefetch(scm_urls + scm_urls[:10])
+
+    assert [request.path for request in server.requests] == ["/graphql", "/graphql"]
+    assert server.requests[0].headers["Authorization"] == "bearer test"
+    assert [len(queried_repositories(request)) for request in server.requests] == [MAX_REPOSITORIES_PER_QUERY, 50]
+
+    metadata = fetcher.get_repository_metadata(scm_url("slicer", "slicer120"))
+    assert metadata["name_with_owner"] == "Slicer/Slicer120"
+    assert metadata["topics"] == ["3d-slicer-extension"]
+    assert metadata["head_sha"] == "0" * 40
+    # Cached repositories are not queried again
+    fetcher.prefetch(scm_urls)
+    assert len(server.requests) == 2
+
+
+def test_missing_repositories(http_server):
+    server = http_server(graphql_response)
+    fetcher = GitHubMetadataFetcher(token="test", api_url=server.url)
+    fetcher.prefetch([scm_url("Slicer", "SlicerFirst"), scm_url("Slicer", "Missing")])
+    assert fetcher.get_repository_metadata(scm_url("Slicer", "Missing")) is None
+    assert fetcher.get_repository_metadata(scm_url("Slicer", "SlicerFirst"))["default_branch"] == "main"
+    assert fetcher.get_repository_metadata("https://gitlab.com/Slicer/SlicerFirst.git") is None
+    assert len(server.requests) == 1
+
+
+def test_query_errors_fail_the_batch(http_server):
+    def respond(request):
+        result = {"data": None, "errors": [{"type": "FORBIDDEN", "message": "Resource not accessible"}]}
+        return 200, {"Content-Type": "application/json"}, json.dumps(result).encode()
+
+    server = http_server(respond)
+    fetcher = GitHubMetadataFetcher(token="test", api_url=server.url)
+    with pytest.raises(GitHubMetadataError, match="Resource not accessible"):
+        fetcher.prefetch([scm_url("Slicer", "SlicerFirst")])
+
+
+def test_wait_for_rate_limit_reset(http_server, sleeps):
+    reset_time = int(time.time()) + 30
+
+    def respond(request):
+        status, headers, body = graphql_response(request)
+        headers.update({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(reset_time)})
+        return status, headers, body
+
+    server = http_server(respond)
+    fetcher = GitHubMetadataFetcher(token="test", api_url=server.url)
+    fetcher.get_repository_metadata(scm_url("Slicer", "SlicerFirst"))
+    assert sleeps == []
+
+    # The rate limit is exhausted, the next request is sent after the reset
+    fetcher.get_repository_metadata(scm_url("Slicer", "SlicerSecond"))
+    assert len(sleeps) == 1 and 28 < sleeps[0] <= 31
+    assert len(server.requests) == 2
+
+    # Waiting longer than the allowed maximum fails without sending a request
+    fetcher.max_rate_limit_wait = 10
+    with pytest.raises(GitHubMetadataError, match="rate limit exceeded"):
+        fetcher.get_repository_metadata(scm_url("Slicer", "SlicerThird"))
+    assert len(server.requests) == 2
+
+
+def test_retry_after_rate_limit_error(http_server, sleeps):
+    responses = iter([
+        (403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(int(time.time()) + 20)}, b"rate limit"),
+        (429, {"X-RateLimit-Remaining": "4999", "Retry-After": "5"}, b"secondary rate limit"),
+        ])
+
+    def respond(request):
+        return next(responses, None) or graphql_response(request)
+
+    server = http_server(respond)
+    fetcher = GitHubMetadataFetcher(token="test", api_url=server.url)
+    assert fetcher.get_repository_metadata(scm_url("Slicer", "SlicerFirst")) is not None
+    assert len(server.requests) == 3
+    assert len(sleeps) == 2 and 18 < sleeps[0] <= 21 and sleeps[1] == 5
+
+
+def test_rest_api_without_token(http_server):
+    def respond(request):
+        if request.path == "/repos/Slicer/Missing":
+            return 404, {}, b'{"message": "Not Found"}'
+        repository = {"full_name": request.path.removeprefix("/repos/"), "topics": ["3d-slicer-extension"],
+                      "default_branch": "main", "size": 100, "archived": False}
+        return 200, {"Content-Type": "application/json"}, json.dumps(repository).encode()
+
+    server = http_server(respond)
+    fetcher = GitHubMetadataFetcher(token="", api_url=server.url)
+    fetcher.prefetch([scm_url("Slicer", "SlicerFirst"), scm_url("Slicer", "Missing")])
+    assert sorted(request.path for request in server.requests) == ["/repos/Slicer/Missing", "/repos/Slicer/SlicerFirst"]
+    assert fetcher.get_repository_metadata(scm_url("Slicer", "SlicerFirst"))["topics"] == ["3d-slicer-extension"]
+    assert fetcher.get_repository_metadata(scm_url("Slicer", "Missing")) is None
+
+
+def test_cache_is_saved_between_runs(http_server, tmp_path):
+    server = http_server(graphql_response)
+    fetcher = GitHubMetadataFetcher(token="test", api_url=server.url, cache_dir=str(tmp_path))
+    fetcher.prefetch([scm_url("Slicer", "SlicerFirst")])
+    fetcher.save_cache()
+
+    fetcher = GitHubMetadataFetcher(token="test", api_url=server.url, cache_dir=str(tmp_path))
+    assert fetcher.get_repository_metadata(scm_url("Slicer", "SlicerFirst")) is not None
+    assert len(server.requests) == 1
+
+    # Expired metadata is retrieved again
+    fetcher = GitHubMetadataFetcher(token="test", api_url=server.url, cache_dir=str(tmp_path), cache_ttl=0)
+    assert fetcher.get_repository_metadata(scm_url("Slicer", "SlicerFirst")) is not None
+    assert len(server.requests) == 2
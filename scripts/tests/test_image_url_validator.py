@@ -0,0 +1,102 @@
+import pytest
+
+from check_description_files import ExtensionCheckError, ImageUrlValidator, validate_image_url
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_CONTENT = PNG_SIGNATURE + b"\0" * 1000
+
+
+def respond(request):
+    if request.path == "/icon.png":
+        if request.headers.get("If-None-Match") == '"icon-v1"':
+            return 304, {}, b""
+        return 200, {"Content-Type": "image/png", "ETag": '"icon-v1"'}, PNG_CONTENT
+    if request.path == "/download/icon":
+        # Server that does not support HEAD and does not report the image content type
+        if request.method == "HEAD":
+            return 405, {}, b""
+        first, last = request.headers["Range"].removeprefix("bytes=").split("-")
+        return 206, {
+            "Content-Type": "application/octet-stream",
+            "Content-Range": f"bytes {first}-{last}/{len(PNG_CONTENT)}",
+            }, PNG_CONTENT[int(first):int(last) + 1]
+    if request.path == "/page.html":
+        return 200, {"Content-Type": "text/html"}, b"<html></html>"
+    return 404, {}, b""
+
+
+@pytest.fixture
+def image_server(http_server):
+    return http_server(respond)
+
+
+def test_head_request_is_used_when_conclusive(image_server):
+    validator = ImageUrlValidator()
+    assert validator.probe(f"{image_server.url}/icon.png") == ("image/png", None)
+    assert [request.method for request in image_server.requests] == ["HEAD"]
+    assert validator.cache[f"{image_server.url}/icon.png"]["size"] == len(PNG_CONTENT)
+
+
+def test_ranged_get_when_head_is_not_conclusive(image_server):
+    validator = ImageUrlValidator()
+    url = f"{image_server.url}/download/icon"
+    assert validator.probe(url) == ("application/octet-stream", "image/png")
+    assert [request.method for request in image_server.requests] == ["HEAD", "GET"]
+    assert image_server.requests[1].headers["Range"] == f"bytes=0-{ImageUrlValidator.SNIFF_BYTES - 1}"
+    assert validator.cache[url]["size"] == len(PNG_CONTENT)
+    # The URL does not have an image file extension, but the content is an image
+    validate_image_url(url, "Extension icon URL", "Test", "check_cmakelists_content", url_validator=validator)
+
+
+def test_cached_results_are_used_within_ttl(image_server):
+    validator = ImageUrlValidator()
+    url = f"{image_server.url}/icon.png"
+    validator.probe(url)
+    validator.probe(url)
+    assert len(image_server.requests) == 1
+    assert (validator.cache_hits, validator.cache_revalidations, validator.cache_misses) == (1, 0, 1)
+
+
+def test_expired_results_are_revalidated(image_server):
+    validator = ImageUrlValidator(cache_ttl=0)
+    url = f"{image_server.url}/icon.png"
+    validator.probe(url)
+    assert validator.probe(url) == ("image/png", None)
+    assert image_server.requests[1].headers["If-None-Match"] == '"icon-v1"'
+    assert (validator.cache_hits, validator.cache_revalidations, validator.cache_misses) == (0, 1, 1)
+
+
+def test_immutable_urls_are_not_checked_again():
+    validator = ImageUrlValidator(cache_ttl=0)
+    url = "https://raw.githubusercontent.com/Slicer/SlicerTest/0123456789abcdef0123456789abcdef01234567/icon.png"
+    assert validator.is_immutable_url(url)
+    assert not validator.is_immutable_url("https://raw.githubusercontent.com/Slicer/SlicerTest/main/icon.png")
+    validator.cache[url] = {"content_type": "image/png", "image_type": None, "valid": True, "immutable": True,
+                            "checked": 0}
+    assert validator.probe(url) == ("image/png", None)
+    assert validator.cache_hits == 1
+
+
+def test_invalid_images_are_not_cached(image_server):
+    validator = ImageUrlValidator()
+    url = f"{image_server.url}/page.html"
+    with pytest.raises(ExtensionCheckError, match="does not point to a valid image"):
+        validate_image_url(url, "Extension icon URL", "Test", "check_cmakelists_content", url_validator=validator)
+    assert url not in validator.cache
+    with pytest.raises(ExtensionCheckError, match="Failed to download"):
+        validate_image_url(f"{image_server.url}/missing.png", "Extension icon URL", "Test", "check_cmakelists_content",
+                           url_validator=validator)
+
+
+def test_cache_is_saved_between_runs(image_server, tmp_path):
+    validator = ImageUrlValidator(cache_dir=str(tmp_path))
+    validator.probe(f"{image_server.url}/icon.png")
+    validator.probe(f"{image_server.url}/page.html")
+    validator.save_cache()
+    requests_count = len(image_server.requests)
+
+    validator = ImageUrlValidator(cache_dir=str(tmp_path))
+    assert list(validator.cache) == [f"{image_server.url}/icon.png"]
+    validator.probe(f"{image_server.url}/icon.png")
+    assert validator.cache_hits == 1
+    assert len(image_server.requests) == requests_count
@@ -0,0 +1,139 @@
+import json
+import time
+
+import pytest
+
+from inference_client import AnswerCache, InferenceClient, TokenBucket
+
+
+def chat_response(request, total_tokens=10):
+    """Answer a chat completion request with the question that was asked."""
+    question = json.loads(request.body)["messages"][-1]["content"]
+    result = {
+        "choices": [{"message": {"role": "assistant", "content": f"Answer to: {question}"}}],
+        "usage": {"prompt_tokens": total_tokens - 2, "completion_tokens": 2, "total_tokens": total_tokens},
+        }
+    return 200, {"Content-Type": "application/json"}, json.dumps(result).encode()
+
+
+def create_client(server, **kwargs):
+    kwargs.setdefault("requests_per_minute", 6000)
+    kwargs.setdefault("max_backoff", 0)
+    return InferenceClient(f"{server.url}/chat/completions", "test-model", "test-key", **kwargs)
+
+
+def test_ask(http_server):
+    server = http_server(chat_response)
+    client = create_client(server)
+    assert client.ask("System message", "Question?") == "Answer to: Question?"
+    request = json.loads(server.requests[0].body)
+    assert request["model"] == "test-model"
+    assert request["messages"][0] == {"role": "system", "content": "System message"}
+    assert server.requests[0].headers["Authorization"] == "Bearer test-key"
+    # The system message can be created when the request is sent
+    assert client.ask(lambda: "System message", "Other question?") == "Answer to: Other question?"
+    assert (client.requests_count, client.prompt_tokens, client.completion_tokens) == (2, 16, 4)
+    client.close()
+
+
+def test_retry_rate_limited_and_failed_requests(http_server):
+    responses = iter([
+        (429, {"Retry-After": "0"}, b'{"error": {"message": "Rate limit exceeded"}}'),
+        (503, {}, b"Service unavailable"),
+        ])
+
+    def respond(request):
+        return next(responses, None) or chat_response(request)
+
+    server = http_server(respond)
+    client = create_client(server)
+    assert client.ask("System message", "Question?") == "Answer to: Question?"
+    assert (client.requests_count, client.retries_count) == (3, 2)
+
+
+def test_give_up_after_max_retries(http_server):
+    server = http_server(lambda request: (500, {}, b'{"error": {"message": "Internal error"}}'))
+    client = create_client(server, max_retries=2)
+    with pytest.raises(RuntimeError, match="Internal error"):
+        client.ask("System message", "Question?")
+    assert len(server.requests) == 3
+
+
+def test_unexpected_response_is_not_retried(http_server):
+    server = http_server(lambda request: (400, {}, b'{"error": {"message": "Invalid model"}}'))
+    client = create_client(server)
+    with pytest.raises(RuntimeError, match="Invalid model"):
+        client.ask("System message", "Question?")
+    assert len(server.requests) == 1
+
+
+def test_connection_errors_are_retried(http_server):
+    server = http_server(chat_response)
+    server.close()
+    client = create_client(server, max_retries=1)
+    with pytest.raises(RuntimeError, match="Error or unexpected response"):
+        client.ask("System message", "Question?")
+    assert (client.requests_count, client.retries_count) == (2, 1)
+
+
+def test_requests_are_spaced_by_the_request_rate(http_server):
+    server = http_server(chat_response)
+    client = create_client(server, requests_per_minute=600, max_workers=3)
+    start_time = time.monotonic()
+    futures = [client.submit("System message", f"Question {index}?") for index in range(3)]
+    assert [future.result() for future in futures] == [f"Answer to: Question {index}?" for index in range(3)]
+    # The first request is sent immediately, then one request per 0.1 seconds
+    assert time.monotonic() - start_time >= 0.18
+    assert client.rate_limit_wait_time >= 0.18
+    client.close()
+
+
+def test_token_budget_is_corrected_with_actual_usage(http_server):
+    responses = iter([(429, {"Retry-After": "0"}, b"Rate limit exceeded")])
+
+    def respond(request):
+        return next(responses, None) or chat_response(request, total_tokens=10)
+
+    server = http_server(respond)
+    client = create_client(server, tokens_per_minute=6000)
+    client.ask("System message", "Question?")
+    # The estimated size of the rejected and the sent request is given back, only the actual usage is taken
+    assert 5990 <= client.token_limiter.tokens < 6000
+
+
+def test_token_bucket():
+    bucket = TokenBucket(600, capacity=1)
+    assert bucket.acquire() == 0
+    waited = bucket.acquire()
+    assert 0.05 < waited < 0.5
+
+    bucket = TokenBucket(60)
+    assert bucket.capacity == 60
+    # Requests larger than the capacity only wait for a full bucket
+    assert bucket.acquire(1000) == 0
+    # The bucket can go below zero, which delays later requests
+    bucket.adjust(30)
+    assert bucket.tokens < -29
+    bucket.adjust(-1000)
+    assert bucket.tokens == 60
+
+
+def test_answer_cache(http_server, tmp_path):
+    server = http_server(chat_response)
+    answer_cache = AnswerCache(str(tmp_path))
+    client = create_client(server, answer_cache=answer_cache)
+    assert client.ask("System message", "Question?") == "Answer to: Question?"
+    assert client.ask("System message", "Question?") == "Answer to: Question?"
+    assert len(server.requests) == 1
+    assert (answer_cache.hits, answer_cache.saved_tokens) == (1, 10)
+    answer_cache.save()
+
+    # Answers are kept between runs, for the same model, system message and question only
+    answer_cache = AnswerCache(str(tmp_path))
+    client = create_client(server, answer_cache=answer_cache)
+    assert client.ask("System message", "Question?") == "Answer to: Question?"
+    assert len(server.requests) == 1
+    client.ask("Other system message", "Question?")
+    client.ask("System message", "Other question?")
+    assert len(server.requests) == 3
+    assert "1 requests and 10 tokens saved by the answer cache" in client.statistics()
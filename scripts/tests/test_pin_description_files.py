@@ -0,0 +1,61 @@
+import json
+
+from pin_description_files_scmrevision import pin_description_file, pin_description_files
+
+DESCRIPTION = """{
+  "$schema": "https://raw.githubusercontent.com/Slicer/Slicer/main/Schemas/slicer-extension-catalog-entry-schema-v1.0.2.json#",
+  "build_dependencies": [],
+  "category": "Examples",
+  "scm_revision": "%s",
+  "scm_url": "%s",
+  "tier": 1
+}
+"""
+
+
+def write_description(folder, name, scm_url, scm_revision):
+    path = folder / f"{name}.json"
+    path.write_text(DESCRIPTION % (scm_revision, scm_url))
+    return str(path)
+
+
+def test_pin_branch_to_commit(git_repository, tmp_path):
+    path = write_description(tmp_path, "Test", git_repository.url, "main")
+    assert pin_description_file(path, log=lambda *args: None)
+    with open(path) as description_file:
+        content = description_file.read()
+    # Only the revision is changed, formatting is kept
+    assert content == DESCRIPTION % (git_repository.commits[1], git_repository.url)
+    # Pinned revisions are not changed
+    assert not pin_description_file(path, log=lambda *args: None)
+
+
+def test_pin_dry_run(git_repository, tmp_path):
+    path = write_description(tmp_path, "Test", git_repository.url, "v1.0")
+    messages = []
+    assert pin_description_file(path, dry_run=True, log=messages.append)
+    assert f"Planned change: scmrevision v1.0 -> {git_repository.commits[0]}" in messages
+    with open(path) as description_file:
+        assert json.load(description_file)["scm_revision"] == "v1.0"
+
+
+def test_pin_s4ext(git_repository, tmp_path):
+    path = tmp_path / "Test.s4ext"
+    path.write_text(f"scm git\nscmurl {git_repository.path}\nscmrevision main\n")
+    assert pin_description_file(str(path), log=lambda *args: None)
+    assert path.read_text() == f"scm git\nscmurl {git_repository.path}\nscmrevision {git_repository.commits[1]}\n"
+
+
+def test_pin_description_files(git_repository, tmp_path, capsys):
+    paths = [
+        write_description(tmp_path, "First", git_repository.url, "main"),
+        write_description(tmp_path, "Second", git_repository.url, "missing"),
+        write_description(tmp_path, "Third", git_repository.url, ""),
+        ]
+    pinned, failed = pin_description_files(paths, jobs=2)
+    assert pinned == [paths[0], paths[2]]
+    assert failed == [paths[1]]
+    # Logs are printed in input order
+    output = capsys.readouterr().out
+    assert output.index(f"Processing {paths[0]}") < output.index(f"Processing {paths[1]}")
+    assert "Revision 'missing' was not found" in output
@@ -0,0 +1,102 @@
+import os
+
+from conftest import GitRepository, run_git
+from repository_cache import RepositoryCache, clone_revision
+
+
+def head_sha(folder):
+    return run_git(['rev-parse', 'HEAD'], cwd=folder)
+
+
+def commit_count(folder):
+    return int(run_git(['rev-list', '--count', 'HEAD'], cwd=folder))
+
+
+def test_clone_revision_fetches_only_the_requested_commit(git_repository, tmp_path):
+    destination = str(tmp_path / "clone")
+    assert clone_revision(git_repository.url, git_repository.commits[0], destination) == "shallow fetch"
+    assert head_sha(destination) == git_repository.commits[0]
+    assert commit_count(destination) == 1
+    assert not os.path.exists(os.path.join(destination, "Test", "Test.py"))
+
+
+def test_clone_revision_of_branch_and_tag(git_repository, tmp_path):
+    clone_revision(git_repository.url, "main", str(tmp_path / "branch"))
+    assert head_sha(str(tmp_path / "branch")) == git_repository.commits[1]
+    clone_revision(git_repository.url, "v1.0", str(tmp_path / "tag"))
+    assert head_sha(str(tmp_path / "tag")) == git_repository.commits[0]
+
+
+def test_clone_revision_of_default_branch(git_repository, tmp_path):
+    destination = str(tmp_path / "clone")
+    assert clone_revision(git_repository.url, "", destination) == "shallow clone"
+    assert head_sha(destination) == git_repository.commits[1]
+    assert commit_count(destination) == 1
+
+
+def test_clone_revision_falls_back_to_full_clone(git_repository, tmp_path):
+    # Abbreviated SHAs cannot be fetched directly
+    destination = str(tmp_path / "clone")
+    assert clone_revision(git_repository.url, git_repository.commits[0][:10], destination) == "full clone"
+    assert head_sha(destination) == git_repository.commits[0]
+
+
+def test_clone_revision_sparse_checkout(git_repository, tmp_path):
+    destination = str(tmp_path / "clone")
+    clone_revision(git_repository.url, "main", destination, sparse_paths=["/CMakeLists.txt"])
+    assert os.path.isfile(os.path.join(destination, "CMakeLists.txt"))
+    assert not os.path.exists(os.path.join(destination, "README.md"))
+    assert not os.path.exists(os.path.join(destination, "Test"))
+
+
+def test_checkout_from_mirror(git_repository, tmp_path):
+    cache = RepositoryCache(str(tmp_path / "cache"))
+    destination = str(tmp_path / "checkout")
+    cache.checkout(git_repository.url, "v1.0", destination)
+    assert head_sha(destination) == git_repository.commits[0]
+    # Working copies point to the original repository, not to the mirror
+    assert run_git(['remote', 'get-url', 'origin'], cwd=destination) == git_repository.url
+
+    mirrors = cache.mirrors()
+    assert [mirror_path for mirror_path, _ in mirrors] == [cache.mirror_path(git_repository.url)]
+    assert mirrors[0][1]["scm_url"] == git_repository.url
+    assert mirrors[0][1]["size_bytes"] > 0
+
+
+def test_mirror_is_updated_with_new_commits(git_repository, tmp_path):
+    cache = RepositoryCache(str(tmp_path / "cache"))
+    cache.checkout(git_repository.url, "", str(tmp_path / "first"))
+    assert head_sha(str(tmp_path / "first")) == git_repository.commits[1]
+
+    new_commit = git_repository.commit({"README.md": "# Test\n\nUpdated.\n"})
+    cache.checkout(git_repository.url, "", str(tmp_path / "second"))
+    assert head_sha(str(tmp_path / "second")) == new_commit
+    assert len(cache.mirrors()) == 1
+
+
+def test_sparse_checkout_from_mirror(git_repository, tmp_path):
+    cache = RepositoryCache(str(tmp_path / "cache"))
+    destination = str(tmp_path / "checkout")
+    cache.checkout(git_repository.url, "main", destination, sparse_paths=["/README.md"])
+    assert os.path.isfile(os.path.join(destination, "README.md"))
+    assert not os.path.exists(os.path.join(destination, "CMakeLists.txt"))
+
+
+def test_evict_least_recently_used_mirrors(git_environment, tmp_path):
+    repositories = []
+    for name in ("SlicerFirst", "SlicerSecond"):
+        repository = GitRepository(str(tmp_path / "remote"), name)
+        repository.commit({"CMakeLists.txt": f"project({name})\n"})
+        repositories.append(repository)
+    cache = RepositoryCache(str(tmp_path / "cache"))
+    for index, repository in enumerate(repositories):
+        cache.checkout(repository.url, "", str(tmp_path / f"checkout{index}"))
+
+    # Both mirrors fit in the budget
+    assert cache.evict() == []
+
+    # Only the most recently used mirror is kept
+    largest_mirror_size_bytes = max(info["size_bytes"] for _, info in cache.mirrors())
+    cache.max_size_mb = largest_mirror_size_bytes / (1024 * 1024)
+    assert cache.evict() == [cache.mirror_path(repositories[0].url)]
+    assert [mirror_path for mirror_path, _ in cache.mirrors()] == [cache.mirror_path(repositories[1].url)]
@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+
+"""
+Apply field changes to many extension description files (.json) in one pass.
+
+Extension description files are stored in a canonical format (``json.dumps(metadata, indent=2)`` followed by
+a newline), therefore changed files are written in the same format: key order, indentation and all
+unchanged lines are kept byte-for-byte. Files that are not in the canonical format are not modified,
+to avoid unintended reformatting. Files are written atomically (temporary file + rename) and only
+if their content actually changes, so running the same update again does nothing.
+
+Examples::
+
+    # Set tier of two extensions
+    python scripts/update_description_files.py SlicerHeart.json SlicerIGT.json --set tier=3
+
+    # Migrate all extensions to a new schema version
+    python scripts/update_description_files.py all \\
+      --replace '$schema' \\
+        https://raw.githubusercontent.com/Slicer/Slicer/main/Schemas/slicer-extension-catalog-entry-schema-v1.0.1.json# \\
+        https://raw.githubusercontent.com/Slicer/Slicer/main/Schemas/slicer-extension-catalog-entry-schema-v1.0.2.json#
+
+    # Apply different changes to each file, for example: {"SlicerHeart.json": {"scm_revision": "1234abcd..."}}
+    python scripts/update_description_files.py --changes-file changes.json --dry-run
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+
+
+class DescriptionFileFormatError(RuntimeError):
+    """Exception raised when a description file cannot be updated without changing its formatting."""
+    pass
+
+
+# Sentinel for changes that are applied regardless of the current value of the field
+_ANY_VALUE = object()
+
+
+class FieldChange:
+    """Change of a top-level field of an extension description.
+
+    :param key: Name of the field, such as ``scm_revision``.
+    :param value: New value of the field. New fields are added after the existing fields.
+    :param delete: If True then the field is removed.
+    :param if_value: If specified then the change is only applied if the current value of the field is equal to this.
+    """
+
+    def __init__(self, key, value=None, delete=False, if_value=_ANY_VALUE):
+        self.key = key
+        self.value = value
+        self.delete = delete
+        self.if_value = if_value
+
+    def apply(self, metadata):
+        """Apply the change to a metadata dictionary (in place).
+        :return: True if the metadata was modified.
+        """
+        if self.if_value is not _ANY_VALUE and metadata.get(self.key) != self.if_value:
+            return False
+        if self.delete:
+            if self.key not in metadata:
+                return False
+            del metadata[self.key]
+            return True
+        if self.key in metadata and metadata[self.key] == self.value and type(metadata[self.key]) is type(self.value):
+            return False
+        metadata[self.key] = self.value
+        return True
+
+    def __repr__(self):
+        if self.delete:
+            return f"delete {self.key}"
+        return f"set {self.key}={json.dumps(self.value)}"
+
+
+def format_description(metadata, ensure_ascii=True):
+    """Get the canonical content of an extension description file."""
+    return json.dumps(metadata, indent=2, ensure_ascii=ensure_ascii) + "\n"
+
+
+def _write_atomically(file_path, content):
+    folder = os.path.dirname(os.path.abspath(file_path))
+    file_descriptor, temporary_file_path = tempfile.mkstemp(
+        dir=folder, prefix=f".{os.path.basename(file_path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as temporary_file:
+            temporary_file.write(content)
+        os.chmod(temporary_file_path, os.stat(file_path).st_mode & 0o7777)
+        os.replace(temporary_file_path, file_path)
+    except BaseException:
+        os.remove(temporary_file_path)
+        raise
+
+
+def update_description_file(file_path, changes, dry_run=False):
+    """Apply field changes to an extension description file.
+
+    :param file_path: Path of the extension description file (.json).
+    :param changes: List of :class:`FieldChange` objects, applied in this order.
+    :param dry_run: If True then the file is not written.
+    :return: True if the file content is changed (or would be changed, in dry run mode).
+    :raises DescriptionFileFormatError: if the file is not in the canonical format.
+    :raises OSError, ValueError: if the file cannot be read, parsed or written.
+    """
+    with open(file_path, "rb") as description_file:
+        content = description_file.read()
+    metadata = json.loads(content.decode("utf-8"))
+    if not isinstance(metadata, dict):
+        raise DescriptionFileFormatError(f"{file_path} does not contain a JSON object")
+
+    # Preserve how non-ASCII characters are stored in the file
+    for ensure_ascii in (True, False):
+        if format_description(metadata, ensure_ascii).encode("utf-8") == content:
+            break
+    else:
+        raise DescriptionFileFormatError(
+            f"{file_path} is not formatted as json.dumps(metadata, indent=2) with LF line endings, "
+            "it is not modified to avoid reformatting")
+
+    modified = False
+    for change in changes:
+        modified = change.apply(metadata) or modified
+    if not modified:
+        return False
+
+    updated_content = format_description(metadata, ensure_ascii).encode("utf-8")
+    if updated_content == content:
+        return False
+    if not dry_run:
+        _write_atomically(file_path, updated_content)
+    return True
+
+
+def update_description_files(changes_by_file_path, dry_run=False):
+    """Apply field changes to many extension description files.
+
+    :param changes_by_file_path: Dictionary of file path -> list of :class:`FieldChange` objects.
+    :param dry_run: If True then the files are not written.
+    :return: Tuple of list of changed files and dictionary of file path -> error for files that failed to be updated.
+    """
+    changed_file_paths = []
+    errors = {}
+    for file_path, changes in changes_by_file_path.items():
+        try:
+            if update_description_file(file_path, changes, dry_run=dry_run):
+                changed_file_paths.append(file_path)
+        except (DescriptionFileFormatError, OSError, ValueError) as exc:
+            errors[file_path] = exc
+    return changed_file_paths, errors
+
+
+def parse_value(text):
+    """Parse a value specified on the command line: JSON if valid, otherwise a string."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+
+def read_changes_file(changes_file_path):
+    """Read per-file changes from a JSON file.
+
+    Expected format: ``{"Extension.json": {"field": value, ...}, ...}``. ``null`` value removes the field.
+    :return: Dictionary of file path -> list of :class:`FieldChange` objects.
+    """
+    with open(changes_file_path, encoding="utf-8") as changes_file:
+        changes = json.load(changes_file)
+    return {
+        file_path: [FieldChange(key, value, delete=value is None) for key, value in fields.items()]
+        for file_path, fields in changes.items()
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Apply field changes to extension description files, keeping their formatting.")
+    parser.add_argument("description_files", nargs="*",
+                        help="Extension description files (.json) to update. "
+                        "Pass 'all' to update all description files in the current directory.")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="Set a field. VALUE is parsed as JSON if possible (for example 3, true, [\"A\", \"B\"]), "
+                        "otherwise it is used as a string. Can be specified multiple times.")
+    parser.add_argument("--replace", action="append", nargs=3, default=[], metavar=("KEY", "OLD_VALUE", "NEW_VALUE"),
+                        help="Set a field to NEW_VALUE only in files where its current value is OLD_VALUE.")
+    parser.add_argument("--delete", action="append", default=[], metavar="KEY", help="Remove a field.")
+    parser.add_argument("--changes-file",
+                        help="JSON file that specifies changes for each file, in the format "
+                        "{\"Extension.json\": {\"field\": value}}. Fields with null value are removed.")
+    parser.add_argument("--dry-run", action="store_true", help="Print the files that would be changed without writing them.")
+    args = parser.parse_args()
+
+    changes = []
+    for assignment in args.set:
+        key, separator, value = assignment.partition("=")
+        if not separator:
+            parser.error(f"--set requires KEY=VALUE argument, got '{assignment}'")
+        changes.append(FieldChange(key, parse_value(value)))
+    for key, old_value, new_value in args.replace:
+        changes.append(FieldChange(key, parse_value(new_value), if_value=parse_value(old_value)))
+    for key in args.delete:
+        changes.append(FieldChange(key, delete=True))
+
+    if args.description_files == ["all"]:
+        file_paths = sorted(glob.glob("*.json"))
+    else:
+        file_paths = args.description_files
+
+    changes_by_file_path = {file_path: list(changes) for file_path in file_paths}
+    if args.changes_file:
+        for file_path, file_changes in read_changes_file(args.changes_file).items():
+            changes_by_file_path.setdefault(file_path, []).extend(file_changes)
+
+    if not changes_by_file_path or not any(changes_by_file_path.values()):
+        parser.error("no files or no changes are specified")
+
+    changed_file_paths, errors = update_description_files(changes_by_file_path, dry_run=args.dry_run)
+
+    for file_path in changed_file_paths:
+        print(f"{'Would update' if args.dry_run else 'Updated'} {file_path}")
+    for file_path, error in errors.items():
+        print(f"Failed to update {file_path}: {error}", file=sys.stderr)
+    print(f"{'Would update' if args.dry_run else 'Updated'} {len(changed_file_paths)} of "
+          f"{len(changes_by_file_path)} description files.")
+
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())